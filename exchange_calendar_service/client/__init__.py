@@ -0,0 +1,3 @@
+from .client import AsyncExchangeCalendarClient
+
+__all__ = ["AsyncExchangeCalendarClient"]
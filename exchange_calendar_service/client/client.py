@@ -0,0 +1,302 @@
+import asyncio
+import datetime as dt
+import time
+from collections.abc import Iterable, Mapping
+from enum import Enum
+from typing import Any
+
+import httpx
+from cachetools import LRUCache
+
+
+class _Entry:
+    """Cached response data."""
+
+    __slots__ = ("etag", "data", "fetched")
+
+    def __init__(self, etag: str | None, data: Any, fetched: float):
+        # The entity tag of the response, if any.
+        self.etag = etag
+
+        # The decoded response.
+        self.data = data
+
+        # The time the response was fetched or last revalidated, as returned by time.monotonic().
+        self.fetched = fetched
+
+
+def _to_param(value: Any) -> Any:
+    # Convert a value to a query parameter or JSON value.
+    if isinstance(value, (dt.date, dt.datetime)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [_to_param(x) for x in value]
+    return value
+
+
+def _to_params(params: Mapping[str, Any]) -> dict[str, Any]:
+    # Convert keyword arguments to query parameters, dropping those that are not set.
+    return {k: _to_param(v) for k, v in params.items() if v is not None}
+
+
+def _cache_key(path: str, params: Mapping[str, Any]) -> tuple:
+    # Canonical key for a request, independent of the order of parameters.
+    return path, tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in params.items()))
+
+
+class AsyncExchangeCalendarClient:
+    """Asynchronous client for the v1 API of the exchange calendar service.
+
+    All requests go through a single pooled HTTP connection pool. Responses to GET requests are kept in a bounded local
+    cache. Within max_age seconds after a response was fetched, the cached response is returned without contacting the
+    service. After that, the request is revalidated with If-None-Match, so that unchanged responses are not transferred
+    again. Calls to classify_day() for a single MIC that are made concurrently are collected for a short while and sent
+    to the service in a single batch request.
+
+    Results are decoded JSON and may be shared between callers via the cache, so they must not be modified.
+
+    Use as an async context manager, or call aclose() when done."""
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        max_connections: int = 10,
+        timeout: float = 10.0,
+        cache_size: int = 1024,
+        max_age: float = 1.0,
+        batch_size: int = 500,
+        batch_delay: float = 0.005,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        """
+        :param base_url: the base URL of the service, e.g. http://localhost:8080
+        :param max_connections: the maximum number of concurrent connections to the service
+        :param timeout: the timeout for requests, in seconds
+        :param cache_size: the maximum number of responses to keep in the local cache
+        :param max_age: the time during which a cached response is used without revalidation, in seconds
+        :param batch_size: the maximum number of day classifications per batch request
+        :param batch_delay: the time to wait for more day classifications before sending a batch request, in seconds
+        :param transport: the optional transport to use, e.g. for testing
+        """
+        self._client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/") + "/v1/",
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+            transport=transport,
+        )
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+
+        # Cached responses, by request.
+        self._cache: LRUCache = LRUCache(maxsize=cache_size)
+
+        # Pending day classifications for the next batch request, and the futures to resolve with the results.
+        self._batch: list[tuple[dict[str, Any], asyncio.Future]] = []
+
+        # Handle for the scheduled sending of the pending batch, if any.
+        self._batch_handle: asyncio.TimerHandle | None = None
+
+        # Batch requests in flight. Holds references so that the tasks are not garbage collected.
+        self._batch_tasks: set[asyncio.Task] = set()
+
+    async def __aenter__(self) -> "AsyncExchangeCalendarClient":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Send any pending batch, wait for all batch requests to complete, and close all connections."""
+        self._send_batch()
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+        await self._client.aclose()
+
+    async def _get(self, path: str, json: bool = True, **params) -> Any:
+        # Send a GET request, using the local cache.
+        params = _to_params(params)
+        key = _cache_key(path, params)
+        entry: _Entry | None = self._cache.get(key)
+        now = time.monotonic()
+
+        if entry is not None and now - entry.fetched < self.max_age:
+            return entry.data
+
+        headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else None
+        response = await self._client.get(path, params=params, headers=headers)
+
+        if response.status_code == 304 and entry is not None:
+            entry.fetched = now
+            return entry.data
+
+        response.raise_for_status()
+
+        data = response.json() if json else response.content
+
+        self._cache[key] = _Entry(response.headers.get("etag"), data, now)
+
+        return data
+
+    async def _post(self, path: str, body: Any) -> Any:
+        # Send a POST request.
+        response = await self._client.post(path, json=_to_param(body))
+        response.raise_for_status()
+        return response.json()
+
+    async def mics(self) -> list[str]:
+        """Return the supported MICs."""
+        return await self._get("mics")
+
+    async def mic2name(self) -> dict[str, str]:
+        """Return the names of the exchanges, by MIC."""
+        return await self._get("mic2name")
+
+    async def timezone(self, mic: str | None = None, standardise: bool = True) -> list[dict]:
+        """Return the time zone names for one or all MICs."""
+        return await self._get("timezone", mic=mic, standardise=standardise)
+
+    async def special_days(self, mic: str, year: int | None = None, tz: str | None = None) -> list[dict]:
+        """Return the special days for a MIC and year."""
+        return await self._get("special_days", mic=mic, year=year, tz=tz)
+
+    async def classify_day(self, day: dt.date, mic: str | None = None, tz: str | None = None) -> dict | list[dict]:
+        """
+        Return the classification of a day for a single MIC or all MICs combined. Classifications for a single MIC are
+        sent to the service in batches.
+
+        :param day: the day to classify
+        :param mic: the optional MIC to classify the day for, defaults to all MICs
+        :param tz: the optional name of the time zone to return special open/close times in
+        """
+        if mic is None:
+            return await self._get("classify_day", day=day, tz=tz)
+
+        query = _to_params({"day": day, "mic": mic, "tz": tz})
+        key = _cache_key("classify_days", query)
+        entry: _Entry | None = self._cache.get(key)
+        now = time.monotonic()
+
+        if entry is not None and now - entry.fetched < self.max_age:
+            return entry.data
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._batch.append((query, future))
+
+        if len(self._batch) >= self.batch_size:
+            self._send_batch()
+        elif self._batch_handle is None:
+            self._batch_handle = loop.call_later(self.batch_delay, self._send_batch)
+
+        return await future
+
+    def _send_batch(self) -> None:
+        # Send all pending day classifications in a single request in the background.
+        if self._batch_handle is not None:
+            self._batch_handle.cancel()
+            self._batch_handle = None
+
+        batch, self._batch = self._batch, []
+
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, batch: list[tuple[dict[str, Any], asyncio.Future]]) -> None:
+        try:
+            results = await self._post("classify_days", [q for q, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        now = time.monotonic()
+
+        for (query, future), result in zip(batch, results):
+            self._cache[_cache_key("classify_days", query)] = _Entry(None, result, now)
+            if not future.done():
+                future.set_result(result)
+
+    async def classify_days(self, queries: Iterable[Mapping[str, Any]]) -> list[dict]:
+        """Return the classifications for a list of queries with keys day, mic, and optionally tz."""
+        return await self._post("classify_days", list(queries))
+
+    async def next_special_days(self, day: dt.date | None = None, **params) -> tuple[list[dict], int]:
+        """Return the next/previous special days relative to a day, and a status code. See the service for the
+        supported parameters."""
+        days, status = await self._get("next_special_days", day=day, **params)
+        return days, status
+
+    async def next_business_days(self, day: dt.date | None = None, **params) -> tuple[list[dict], int]:
+        """Return the next/previous business days relative to a day, and a status code. See the service for the
+        supported parameters."""
+        days, status = await self._get("next_business_days", day=day, **params)
+        return days, status
+
+    async def combined_business_days(
+        self, mic: Iterable[str], op: str = "all", start: dt.date | None = None, end: dt.date | None = None
+    ) -> list[str]:
+        """Return the days on which all, any, or exactly one of the given MICs are open."""
+        return await self._get("combined_business_days", mic=list(mic), op=op, start=start, end=end)
+
+    async def sessions(
+        self, mic: str, start: dt.date | None = None, end: dt.date | None = None, tz: str | None = None
+    ) -> list[dict]:
+        """Return the trading sessions for a MIC and period."""
+        return await self._get("sessions", mic=mic, start=start, end=end, tz=tz)
+
+    async def open_at(self, at: Iterable[dt.datetime] | None = None, mic: Iterable[str] | None = None) -> list[dict]:
+        """Return the MICs that are in session at the given instants, defaults to now."""
+        return await self._get(
+            "open_at", at=list(at) if at is not None else None, mic=list(mic) if mic is not None else None
+        )
+
+    async def next_open_close(
+        self, at: dt.datetime | None = None, mic: Iterable[str] | None = None, tz: str | None = None
+    ) -> list[dict]:
+        """Return the next session open and close after an instant, defaults to now."""
+        return await self._get("next_open_close", at=at, mic=list(mic) if mic is not None else None, tz=tz)
+
+    async def trading_minutes(self, queries: Iterable[Mapping[str, Any]]) -> list[dict]:
+        """Return the trading minutes for a list of queries with keys mic, start, and end."""
+        return await self._post("trading_minutes", list(queries))
+
+    async def tagged_days(
+        self, tag: str, mic: Iterable[str] | None = None, start: dt.date | None = None, end: dt.date | None = None
+    ) -> list[dict]:
+        """Return the days that carry a given tag."""
+        return await self._get("tagged_days", tag=tag, mic=list(mic) if mic is not None else None, start=start, end=end)
+
+    async def batch(self, queries: Mapping[str, tuple[str, Mapping[str, Any]]]) -> dict[str, dict]:
+        """
+        Run multiple sub-queries in a single request.
+
+        :param queries: the operation name and parameters of each sub-query, by name of the sub-query
+        :return: the status code and result or error detail of each sub-query, by name of the sub-query
+        """
+        return await self._post(
+            "batch", [{"id": k, "op": op, "params": _to_params(params)} for k, (op, params) in queries.items()]
+        )
+
+    async def export(
+        self,
+        format: str = "arrow",
+        mic: Iterable[str] | None = None,
+        types: Iterable[str] | None = None,
+        year: Iterable[int] | None = None,
+    ) -> bytes:
+        """Return the special days for multiple MICs and years as an Arrow IPC stream or a Parquet file."""
+        return await self._get(
+            "export",
+            json=False,
+            format=format,
+            mic=list(mic) if mic is not None else None,
+            types=list(types) if types is not None else None,
+            year=list(year) if year is not None else None,
+        )
@@ -1,226 +1,294 @@
 import datetime as dt
 import enum
-import itertools
-from collections import OrderedDict
-from collections.abc import Iterable
+import inspect
+import json
+from collections.abc import AsyncIterator, Callable, Collection, Iterable
+from contextvars import ContextVar
 from enum import Enum
 from typing import Annotated, Any, Literal
 from typing import Union
 from zoneinfo import ZoneInfo
 
+import anyio
+import numpy as np
 import pandas as pd
-from cachetools import cached, LFUCache
-from fastapi import APIRouter, Query
-from pydantic import BaseModel, Field, Tag, Discriminator
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, validate_call
 
-from exchange_calendar_service.main.common.constants import (
-    standardised_tz_names,
-)
+from exchange_calendar_service.main.common.constants import min_year, max_year
+from exchange_calendar_service.main.common import export
 from exchange_calendar_service.main.common.context import Context
-from exchange_calendar_service.main.common.util import get_enum_key_literal_type
+from exchange_calendar_service.main.common.engine import QueryEngine
+from exchange_calendar_service.main.common.feed import ChangeFeed
+from exchange_calendar_service.main.common.index import Sessions
+from exchange_calendar_service.main.common.model import (  # noqa: F401
+    DayClassification,
+    DayClassificationMap,
+    DayClassificationWithMics,
+    DayTypeBusinessRegular,
+    DayTypeBusinessSpecial,
+    DayTypeNonBusinessRegular,
+    DayTypeNonBusinessSpecial,
+    SpecialOpenCloseDayClassification,
+    StandardDayClassification,
+    business_day_types2,
+    infer_day_classification_type,
+    parse_timezone,
+    special_day_types2,
+)
+from exchange_calendar_service.main.common.util import get_enum_key_type
+from exchange_calendar_service.main.settings import settings
 
 
 @enum.unique
-class DayTypeBusinessSpecial(str, Enum):
-    SPECIAL_CLOSE = "special close"
-    SPECIAL_OPEN = "special open"
-    WITCHING = "witching"
-    MONTHLY_EXPIRY = "monthly expiry"
-    MONTH_END = "month end"
-    MSCI_REBAL = "MSCI rebal"
+class BusinessDayOperator(str, Enum):
+    ALL = "all"
+    ANY = "any"
+    EXACTLY_ONE = "exactly_one"
 
 
 @enum.unique
-class DayTypeNonBusinessSpecial(str, Enum):
-    HOLIDAY = "holiday"
+class ExportFormat(str, Enum):
+    ARROW = "arrow"
+    PARQUET = "parquet"
 
 
-@enum.unique
-class DayTypeNonBusinessRegular(str, Enum):
-    WEEKEND = "weekend"
+class Session(BaseModel, frozen=True):
+    date: dt.date
+    open: dt.datetime
+    close: dt.datetime
+    break_start: dt.datetime | None = None
+    break_end: dt.datetime | None = None
 
 
-@enum.unique
-class DayTypeBusinessRegular(str, Enum):
-    REGULAR = "regular"
-
-
-regular_day_type = "regular"
-weekend_day_type = "weekend"
-witching_day_type = "witching"
-monthly_expiry_day_type = "monthly expiry"
-month_end_day_type = "month end"
-holiday_day_type = "holiday"
-special_open_day_type = "special open"
-special_close_day_type = "special close"
-msci_rebal_day_type = "MSCI rebal"
-special_day_types = frozenset(
-    {
-        holiday_day_type,
-        special_open_day_type,
-        special_close_day_type,
-        witching_day_type,
-        monthly_expiry_day_type,
-        month_end_day_type,
-        msci_rebal_day_type,
-    }
-)
+def check_range(start: dt.date, end: dt.date) -> None:
+    """
+    Check that the given period is within the range of supported years.
 
-# frozenset that contains all members of DayTypeBusinessSpecial and DayTypeNonBusinessSpecial.
-special_day_types2: set[Union[DayTypeBusinessSpecial, DayTypeNonBusinessSpecial]] = frozenset(
-    itertools.chain([x for x in DayTypeBusinessSpecial], [x for x in DayTypeNonBusinessSpecial])
-)
-business_day_types2: set[Union[DayTypeBusinessRegular, DayTypeBusinessSpecial]] = frozenset(
-    itertools.chain([x for x in DayTypeBusinessRegular], [x for x in DayTypeBusinessSpecial])
-)
+    :param start: the first day of the period
+    :param end: the last day of the period
+    :raises HTTPException: if the period is not within the range of supported years
+    """
+    if not (min_year <= start.year <= max_year and min_year <= end.year <= max_year):
+        raise HTTPException(
+            status_code=416,
+            detail=f"Requested range must be within the years {min_year} to {max_year}.",
+        )
 
-min_year = dt.date.today().year - 30
 
-max_year = dt.date.today().year + 30
+def format_instants(instants: np.ndarray, tz: ZoneInfo) -> np.ndarray:
+    """
+    Format instants as ISO 8601 strings in a given time zone.
 
+    :param instants: the instants in UTC, as timezone-naive datetime64 values
+    :param tz: the time zone to format the instants in
+    :return: array of formatted strings, including the UTC offset
+    """
+    local = pd.DatetimeIndex(instants).tz_localize("UTC").tz_convert(tz).tz_localize(None).values
 
-class DayTypeBusinessSpecial(str, Enum):
-    SPECIAL_CLOSE = "special close"
-    SPECIAL_OPEN = "special open"
-    WITCHING = "witching"
-    MONTHLY_EXPIRY = "monthly expiry"
-    MONTH_END = "month end"
-    MSCI_REBAL = "MSCI rebal"
+    # UTC offsets in minutes. There are only a few distinct ones, so format each of them only once.
+    offsets, inverse = np.unique((local - instants) // np.timedelta64(1, "m"), return_inverse=True)
+    offsets = np.array([f"{'-' if o < 0 else '+'}{abs(o) // 60:02d}:{abs(o) % 60:02d}" for o in offsets.tolist()])
 
+    return np.char.add(np.datetime_as_string(local, unit="s"), offsets[inverse.reshape(-1)])
 
-class DayTypeNonBusinessSpecial(str, Enum):
-    HOLIDAY = "holiday"
 
+def iter_sessions_json(sessions: Sessions, tz: ZoneInfo, chunk_size: int = 1000) -> Iterable[str]:
+    """
+    Serialize sessions into a JSON array of Session objects, in chunks.
 
-class StandardDayClassification(BaseModel, frozen=True):
-    date: dt.date
-    type: DayTypeBusinessRegular | DayTypeNonBusinessRegular | DayTypeBusinessSpecial | DayTypeNonBusinessSpecial
-    is_business_day: bool
-    name: str | None = None
+    :param sessions: the sessions to serialize
+    :param tz: the time zone to format open and close instants in
+    :param chunk_size: the number of sessions per chunk
+    :return: iterable of string fragments that form the JSON array
+    """
 
+    def format_breaks(instants: np.ndarray) -> list[str]:
+        # Quoted instants, or null for sessions without a break.
+        result = np.full(len(instants), "null", dtype=object)
+        has_break = ~np.isnat(instants)
+        if has_break.any():
+            result[has_break] = [f'"{x}"' for x in format_instants(instants[has_break], tz)]
+        return result.tolist()
+
+    yield "["
+
+    for i in range(0, len(sessions.dates), chunk_size):
+        dates = np.datetime_as_string(sessions.dates[i : i + chunk_size], unit="D")
+        opens = format_instants(sessions.opens[i : i + chunk_size], tz)
+        closes = format_instants(sessions.closes[i : i + chunk_size], tz)
+        break_starts = format_breaks(sessions.break_starts[i : i + chunk_size])
+        break_ends = format_breaks(sessions.break_ends[i : i + chunk_size])
+        yield ("," if i > 0 else "") + ",".join(
+            f'{{"date":"{d}","open":"{o}","close":"{c}","break_start":{bs},"break_end":{be}}}'
+            for d, o, c, bs, be in zip(dates, opens, closes, break_starts, break_ends)
+        )
 
-class SpecialOpenCloseDayClassification(StandardDayClassification):
-    time: dt.time = None
-    type: Literal[DayTypeBusinessSpecial.SPECIAL_OPEN, DayTypeBusinessSpecial.SPECIAL_CLOSE]
-    tz: Union[str, None] = None
+    yield "]"
 
 
-def infer_day_classification_type(v: Any):
-    # Check if value has a "time" field. If so, it's a special open/close day classification.
-    if isinstance(v, dict):
-        time = v.get("time")
-    else:
-        time = getattr(v, "time", None)
+async def iter_change_events(
+    feed: ChangeFeed,
+    get_version: Callable[[], str],
+    last_event_id: str | None = None,
+    mics: Collection[str] | None = None,
+    keepalive: float | None = None,
+) -> AsyncIterator[str]:
+    """
+    Serialize the events of a change feed as server-sent events.
+
+    Emits a "change" event for each update, a "reset" event if the subscriber cannot catch up from the given event id,
+    and a comment whenever the feed has been idle for the keep-alive interval. New subscribers first receive the current
+    event id without an event.
+
+    :param feed: the change feed
+    :param get_version: callable that returns the current version of the exchange calendars
+    :param last_event_id: the id of the last event the subscriber has seen, or None to only receive new events
+    :param mics: the optional MICs to restrict change events to, defaults to all
+    :param keepalive: the keep-alive interval in seconds, or None to never send comments
+    :return: async iterator over server-sent events
+    """
+    if last_event_id is None:
+        # Send the current event id right away, so that the subscriber can catch up on events published after this point
+        # when it reconnects, even if no event was sent in the meantime. Clients do not dispatch an event without data.
+        last_event_id = feed.last_event_id()
+        yield f"id: {last_event_id}\n\n"
+
+    async for x in feed.listen(last_event_id, keepalive):
+        if x is None:
+            yield ": keep-alive\n\n"
+            continue
+
+        seq, event = x
+
+        if event is None:
+            data = json.dumps({"version": get_version()})
+            yield f"id: {feed.event_id(seq)}\nevent: reset\ndata: {data}\n\n"
+            continue
+
+        if mics is not None:
+            event = event.model_copy(
+                update={
+                    "mics": [m for m in event.mics if m in mics],
+                    "ranges": {m: r for m, r in event.ranges.items() if m in mics},
+                }
+            )
+            if not event.mics:
+                continue
 
-    if time is not None:
-        return "special_close"
-    else:
-        return "standard"
+        yield f"id: {feed.event_id(seq)}\nevent: change\ndata: {event.model_dump_json()}\n\n"
 
 
-DayClassification = Annotated[
-    (
-        Annotated[StandardDayClassification, Tag("standard")]
-        | Annotated[SpecialOpenCloseDayClassification, Tag("special_close")]
-    ),
-    Discriminator(infer_day_classification_type),
-]
+# The query engine for the version of the calendars requested by the current request, if not the current version.
+_engine: ContextVar[QueryEngine | None] = ContextVar("engine", default=None)
 
 
-def parse_timezone(tz: Union[str, ZoneInfo, None], mic: Union[str, None]) -> ZoneInfo:
-    """
-    pytz only supports time zones in Continent/City format consistently; abbreviations, like CET
-    or IST, are only supported in some cases. Thus, if the request has specified a non-supported abbreviation, like
-    SAST, this must be converted to Africa/Johannesburg (which is supported).
+def get_engine() -> QueryEngine:
+    """Return the query engine for the version of the calendars requested by the current request."""
+    engine = _engine.get()
+    return engine if engine is not None else Context().engine
+
 
-    tz: time zone to test
-    mic: if tz is not specified, we can either default to None (if mic = None), or we can default to a time zone belonging
-    to a given mic.
+def parse_version(version: str) -> int:
     """
+    Parse a version of the calendars, as given in entity tags and change events, or just its number.
 
-    if isinstance(tz, ZoneInfo):
-        return tz
-
-    if tz is not None:
-        try:
-            # check if timezone, as entered, is supported. If so, use it.
-            tz = ZoneInfo(tz)
-        except Exception:
-            # If time zone as entered is not supported, try to convert to Continent/City.
-            candidates = [(region, tz) for region, tz in standardised_tz_names.items() if tz == tz.upper()]
-            if len(candidates) != 1:
-                # more than one match was made, so not sure
-                # which location is referred to. Use default time zone of calendar
-                tz = None
-            else:
-                tz = ZoneInfo(candidates.pop()[0])
-    if tz is None and mic:
-        calendar = Context().cache.get(mic)
-        try:
-            tz = ZoneInfo(standardised_tz_names.get(str(calendar.tz)))
-        except Exception:
-            tz = ZoneInfo(str(calendar.tz))
-    elif tz is None and mic is None:
-        tz = ZoneInfo("UTC")
-
-    return tz
-
-
-def localize_time(
-    date: dt.date,
-    time: dt.time,
-    tz_input: ZoneInfo,
-    tz_target: Union[ZoneInfo, None] = None,
-) -> dt.time:
+    :param version: the version
+    :return: the number of the version
+    :raises HTTPException: if the version is malformed or was issued by a different instance
+    """
+    token, _, number = version.rpartition("-")
+    if not number.isdigit():
+        raise HTTPException(status_code=422, detail="Malformed version.")
+    if token and token != Context().cache.token:
+        raise HTTPException(status_code=404, detail="Unknown version.")
+    return int(number)
+
+
+async def as_of(
+    as_of_version: str | None = Query(
+        default=None,
+        description="Query the calendars as of a previous version, as given in entity tags and change events.",
+    ),
+    as_of_time: dt.datetime | None = Query(
+        default=None,
+        description="Query the calendars as of a previous point in time. Naive datetimes are interpreted as UTC.",
+    ),
+) -> None:
     """
-    Localise a given time of day on a given day in a given time zone into the time of day in another given time zone.
+    Select the version of the calendars to query for the current request.
 
-    :param date: the date
-    :param time: the time of day
-    :param tz_input: the time zone of the given date/time combination
-    :param tz_target: the time zone to convert the time of day to
+    Only a limited number of previous versions is retained.
+
+    :param as_of_version: the optional version
+    :param as_of_time: the optional point in time
+    :raises HTTPException: if the version does not exist or is no longer retained
     """
-    if tz_target is None or tz_input == tz_target:
-        return time
-    else:
-        # Note to self: Use tz.localize(datetime.datetime.combine(date, time)) instead of
-        # datetime.datetime.combine(date, time, tzinfo=tz) since the latter can lead to incorrect results.
-        return dt.datetime.combine(date, time).replace(tzinfo=tz_input).astimezone(tz_target).time()
+    if as_of_version is not None and as_of_time is not None:
+        raise HTTPException(status_code=422, detail="Only one of as_of_version and as_of_time may be given.")
+
+    version = parse_version(as_of_version) if as_of_version is not None else None
+
+    try:
+        engine = get_engine().as_of(version, as_of_time)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Unknown version.")
+    except LookupError:
+        raise HTTPException(status_code=410, detail="Version is no longer retained.")
+
+    _engine.set(engine)
+
+
+async def _await(x: Any) -> Any:
+    return await x
 
 
 def get_router(exchanges_enum: type[Enum]):
     # Collection of all supported MICs.
     MICS = tuple(sorted(exchanges_enum.__members__.keys()))
 
-    # A string type that only allows supported MICs.
-    SupportedMIC = get_enum_key_literal_type(exchanges_enum)
+    # A string type that only allows supported MICs. Validated by a set lookup, regardless of the number of MICs.
+    SupportedMIC = get_enum_key_type(exchanges_enum)
 
     # Type alias for a list that can only contain supported MICs, with examples.
-    SupportedMICs = Annotated[list[SupportedMIC], Field(examples=[MICS])]
+    SupportedMICs = Annotated[list[SupportedMIC], Field(examples=[list(MICS[:3])])]
 
-    class StandardDayClassificationWithMics(StandardDayClassification):
+    class ClassifyDayQuery(BaseModel):
+        day: dt.date
+        mic: SupportedMIC
+        tz: str | None = None
+
+    class TimeZoneInfo(BaseModel):
+        mic: SupportedMIC
+        tz: str = Field(examples=["CET", "WET", "Europe/Lisbon"])
+
+    class OpenMics(BaseModel):
+        at: dt.datetime
         mics: list[SupportedMIC]
 
-    class SpecialOpenCloseDayClassificationWithMics(
-        SpecialOpenCloseDayClassification, StandardDayClassificationWithMics
-    ):
-        pass
+    class TradingMinutesQuery(BaseModel):
+        mic: SupportedMIC
+        start: dt.datetime
+        end: dt.datetime
 
-    DayClassificationWithMics = Annotated[
-        (
-            Annotated[StandardDayClassificationWithMics, Tag("standard")]
-            | Annotated[SpecialOpenCloseDayClassificationWithMics, Tag("special_close")]
-        ),
-        Discriminator(infer_day_classification_type),
-    ]
+    class TradingMinutes(TradingMinutesQuery):
+        minutes: float
 
-    class DayClassificationMap(BaseModel):
+    class TaggedDay(BaseModel):
         date: dt.date
-        classifications: list[DayClassificationWithMics]
+        mic: SupportedMIC
+        tags: list[str]
+        comment: str | None = None
 
-    class TimeZoneInfo(BaseModel):
+    class NextOpenClose(BaseModel):
         mic: SupportedMIC
-        tz: str = Field(examples=["CET", "WET", "Europe/Lisbon"])
+        is_open: bool
+        next_open: dt.datetime | None
+        next_close: dt.datetime | None
+        time_to_open: dt.timedelta | None
+        time_to_close: dt.timedelta | None
 
     router = APIRouter()
 
@@ -228,6 +296,7 @@ def get_router(exchanges_enum: type[Enum]):
         "/mics",
         tags=["Venues"],
         summary="Get a list of valid MICs that can be used with endpoints.",
+        dependencies=[Depends(as_of)],
         operation_id="api.special_days.get_valid_mics",
         responses={200: {"description": "List of valid MICs."}},
     )
@@ -241,13 +310,14 @@ def get_router(exchanges_enum: type[Enum]):
         "/mic2name",
         tags=["Venues"],
         summary="Get a mapping of MICs to exchange names.",
+        dependencies=[Depends(as_of)],
         operation_id="api.special_days.get_mic2name_mapping",
         responses={200: {"description": "Dictionary of MICs to exchange names."}},
     )
     async def get_mic2name_mapping() -> (
         Annotated[
             dict[SupportedMIC, str],
-            Field(examples=[{m: exchanges_enum[m].value for m in MICS}]),
+            Field(examples=[{m: exchanges_enum[m].value for m in MICS[:3]}]),
         ]
     ):
         return {name: value for name, value in exchanges_enum.__members__.items()}
@@ -256,6 +326,7 @@ def get_router(exchanges_enum: type[Enum]):
         "/timezone",
         tags=["Venues"],
         summary="Get the time zone name for one or all valid operating MICs.",
+        dependencies=[Depends(as_of)],
         operation_id="api.special_days.get_timezone",
         responses={
             200: {
@@ -270,22 +341,9 @@ def get_router(exchanges_enum: type[Enum]):
             }
         },
     )
-    @cached(LFUCache(2 * (len(MICS) + 1)))
     def get_timezone(mic: SupportedMIC = None, standardise: bool = True) -> list[TimeZoneInfo]:
         mics = (mic,) if mic is not None else MICS
-        result = []
-        for m in mics:
-            # get trading calendar for given mic, e.g. XETR
-            c = Context().cache.get(m)
-            # get timezone for mic in Continent/City format, e.g. Europe/Berlin
-            tz = c.tz
-            if standardise:
-                # map Continent/City tz to standard tz names, e.g. Europe/Berlin --> CET (not CEST)
-                name = standardised_tz_names.get(str(tz), None)
-                if name is not None:
-                    tz = name
-            result.append(TimeZoneInfo(mic=m, tz=str(tz)))
-        return result
+        return [TimeZoneInfo(mic=m, tz=get_engine().timezone(m, standardise)) for m in mics]
 
     @router.get(
         "/special_days",
@@ -295,6 +353,7 @@ def get_router(exchanges_enum: type[Enum]):
         "neither regular business days nor regular days where the exchange is closed, i.e. weekend "
         "days. Special days may be business days, e.g. special close days, or non-business days, e.g. "
         "holidays.",
+        dependencies=[Depends(as_of)],
         operation_id="api.special_days.get_special_days",
         responses={200: {"description": "List of special days for the given operating MIC and year."}},
     )
@@ -316,230 +375,16 @@ def get_router(exchanges_enum: type[Enum]):
             exchange
         :return: special days for the given operating MIC and year combination
         """
+        return get_engine().special_days(mic, year, tz)
 
-        # To correctly handle the case where the year is omitted, need to get the year to use here every time rather than
-        # use a default argument since those are instantiated only once when the method is created. Using a default argument
-        # would lead to use of the wrong year if the service rolls over to a new calendar year. Also, to avoid problems
-        # with caching in that area, defer to _get_special_days0() and don't wrap this method with a cache itself.
-        return _get_special_days0(mic, year if year is not None else dt.date.today().year, tz)
-
-    # Cache return values. Allow for two times the number of operating MICs.
-    @cached(LFUCache(maxsize=2 * len(MICS)))
-    def _get_special_days0(mic: SupportedMIC, year: int, tz: Union[str, None]) -> list[DayClassification]:
-        """
-        Helper method for get_special_days that gets the actual list of special days.
-
-        :param mic: the operating MIC to return the special days for
-        :param year: the year to return special days for
-        :param tz: the time zone to return special open/close times in, if set to None, use the native time zone for each
-            exchange
-        :return: special days for the given operating MIC and year combination
-        """
-
-        # Get exchange calendar for MIC.
-        c = Context().cache.get(mic)
-
-        # If time zone name is given, convert to tzinfo. Otherwise, use calendar's time zone.
-        tz: ZoneInfo = parse_timezone(tz=tz, mic=mic)
-
-        # tz as str
-        tz_str = str(tz)
-
-        # List of special days.
-        days = []
-
-        # First day of year.
-        s = dt.datetime(year, 1, 1)
-
-        # Last day of year
-        e = dt.datetime(year, 12, 31)
-
-        # Add regular holidays.
-        days.extend(
-            [
-                StandardDayClassification.model_validate(
-                    {
-                        "date": date.to_pydatetime().date(),
-                        "type": holiday_day_type,
-                        "is_business_day": False,
-                        "name": name,
-                    }
-                )
-                for date, name in c.regular_holidays.holidays(s, e, return_name=True).items()
-            ]
-        )
-
-        # Add ad-hoc holidays.
-        days.extend(
-            [
-                StandardDayClassification.model_validate(
-                    {
-                        "date": date.to_pydatetime().date(),
-                        "type": holiday_day_type,
-                        "is_business_day": False,
-                        "name": "ad-hoc holiday",
-                    }
-                )
-                for date in c.adhoc_holidays
-                if date.year == year
-            ]
-        )
-
-        # Add regular special closes.
-        for time, cal in c.special_closes:
-            days.extend(
-                [
-                    SpecialOpenCloseDayClassification.model_validate(
-                        {
-                            "date": date.to_pydatetime().date(),
-                            "type": special_close_day_type,
-                            "is_business_day": True,
-                            "time": localize_time(date.to_pydatetime().date(), time, c.tz, tz).isoformat(),
-                            "tz": tz_str,
-                            "name": name,
-                        }
-                    )
-                    for date, name in cal.holidays(s, e, return_name=True).items()
-                ]
-            )
-
-        # Add ad-hoc special closes.
-        for time, dates in c.special_closes_adhoc:
-            days.extend(
-                [
-                    SpecialOpenCloseDayClassification.model_validate(
-                        {
-                            "date": x.date(),
-                            "type": special_close_day_type,
-                            "is_business_day": True,
-                            "time": localize_time(x.date(), time, c.tz, tz).isoformat(),
-                            "tz": tz_str,
-                            "name": "ad-hoc special close",
-                        }
-                    )
-                    for x in dates
-                    if x.year == year
-                ]
-            )
-
-        # Add regular special opens.
-        for time, cal in c.special_opens:
-            days.extend(
-                [
-                    SpecialOpenCloseDayClassification.model_validate(
-                        {
-                            "date": date.to_pydatetime().date(),
-                            "type": special_open_day_type,
-                            "is_business_day": True,
-                            "time": localize_time(date.to_pydatetime().date(), time, c.tz, tz).isoformat(),
-                            "tz": tz_str,
-                            "name": name,
-                        }
-                    )
-                    for date, name in cal.holidays(s, e, return_name=True).items()
-                ]
-            )
-
-        # Add ad-hoc special opens.
-        for time, dates in c.special_opens_adhoc:
-            days.extend(
-                [
-                    SpecialOpenCloseDayClassification.model_validate(
-                        {
-                            "date": x.date(),
-                            "type": special_open_day_type,
-                            "is_business_day": True,
-                            "time": localize_time(x.date(), time, c.tz, tz).isoformat(),
-                            "tz": tz_str,
-                            "name": "ad-hoc special open",
-                        }
-                    )
-                    for x in dates
-                    if x.year == year
-                ]
-            )
-
-        # Quarterly expiries.
-        days.extend(
-            [
-                StandardDayClassification.model_validate(
-                    {
-                        "date": date.to_pydatetime().date(),
-                        "type": witching_day_type,
-                        "is_business_day": True,
-                        "name": name,
-                    }
-                )
-                for date, name in c.quarterly_expiries.holidays(s, e, return_name=True).items()
-            ]
-        )
-
-        # Monthly expiries.
-        days.extend(
-            [
-                StandardDayClassification.model_validate(
-                    {
-                        "date": date.to_pydatetime().date(),
-                        "type": monthly_expiry_day_type,
-                        "is_business_day": True,
-                        "name": name,
-                    }
-                )
-                for date, name in c.monthly_expiries.holidays(s, e, return_name=True).items()
-            ]
-        )
-
-        # All dates collected so far.
-        dates = [x.date for x in days]
-
-        # Add last trading day for every month, if not already collected.
-        days.extend(
-            [
-                x
-                for x in [
-                    StandardDayClassification.model_validate(
-                        {
-                            "date": date.to_pydatetime().date(),
-                            "type": month_end_day_type,
-                            "is_business_day": True,
-                            "name": name,
-                        }
-                    )
-                    for date, name in c.last_trading_days_of_months.holidays(s, e, return_name=True).items()
-                ]
-                if x.date not in dates
-            ]
-        )
-
-        # All dates collected so far.
-        dates = [x.date for x in days]
-
-        # MSCI rebalancing days.
-        # days.extend([x for x in [{'date': check_date(c.day_merged, d), 'type': msci_rebal_day_type, 'is_business_day': True,
-        #    'name': 'MSCI Rebalancing'} for d in get_msci_rebal_dates(year)] if
-        #                x['date'] not in dates and x['date'] is not None])
-
-        # Filter out days that fall on regular non-business days, i.e. weekend days.
-        days = [x for x in days if c.weekmask[x.date.weekday()] == "1"]
-
-        # Sort all days by date.
-        days = sorted(days, key=lambda x: x.date)
-
-        # for day in days:
-        # Convert dates to ISO-format strings.
-        # day['date'] = day['date'].isoformat()
-
-        return days
-
-    # Cache return values.
     @router.get(
         "/classify_day",
         tags=["Days"],
         summary="Classify a given day for one or all valid operating MICs.",
+        dependencies=[Depends(as_of)],
         operation_id="api.special_days.classify_day",
         responses={200: {"description": "List of classifications for the given day."}},
     )
-    @cached(LFUCache(maxsize=50))
     def classify_day(
         day: dt.date, mic: SupportedMIC = None, tz: str | None = None
     ) -> Union[
@@ -554,51 +399,28 @@ def get_router(exchanges_enum: type[Enum]):
         :param tz: the optional name of the time zone to return special open/close times in
         :param return_mics: whether to return the list of MICs the classification was done for in the result. Defaults to True.
         """
+        return get_engine().classify_day(day, mic, tz)
 
-        if mic is not None:
-            # Classify for the single MIC.
-
-            # Check for weekend.
-            if Context().cache.get(mic).weekmask[day.weekday()] == "0":
-                return StandardDayClassification(
-                    date=day,
-                    type=DayTypeNonBusinessRegular.WEEKEND,
-                    is_business_day=False,
-                )
-
-            # Get special days for year.
-            special_days: list[DayClassification] = get_special_days(mic, day.year, tz=tz)
-
-            # Check for special day.
-            for d in special_days:
-                if d.date == day:
-                    return d
-
-            # If we get here, must be a regular trading day.
-            return StandardDayClassification(date=day, type=DayTypeBusinessRegular.REGULAR, is_business_day=True)
-        else:
-            # Classify for all operating MICs.
-
-            # Dictionary to map classifications to the corresponding list of MICs they apply to. The same day, e.g.,
-            # 2020-12-24, may be classified as a special close day at different exchanges, but with different actual
-            # closing times. These classifications should be treated as distinct.
-            r: dict[DayClassification, list[SupportedMIC]] = {}
-
-            # Loop over classifications for all operating MICs.
-            for k, v in {mic: classify_day(day, mic=mic, tz=tz) for mic in MICS}.items():
-                # Update entry for classification. Create one if necessary.
-                m = r.get(v, [])
-                m.append(k)
-                r[v] = m
-
-            # The list of classifications to return.
-            r0 = []
-
-            # Loop over all different classifications.
-            for k, v in r.items():
-                r0.append(DayClassificationWithMics(**k.model_dump(), mics=v))
+    @router.post(
+        "/classify_days",
+        tags=["Days"],
+        summary="Classify multiple days for given operating MICs.",
+        description="Classify multiple days at once, each for a single operating MIC. Equivalent to calling the "
+        "classify_day endpoint once per query, but in a single request.",
+        dependencies=[Depends(as_of)],
+        operation_id="api.special_days.classify_days",
+        responses={200: {"description": "List of classifications, one entry per query in the same order."}},
+    )
+    def classify_days(
+        queries: list[ClassifyDayQuery] = Body(examples=[[{"day": "2024-12-24", "mic": MICS[0]}]]),
+    ) -> list[DayClassification]:
+        """
+        Return the classifications of multiple days.
 
-            return r0
+        :param queries: the list of day, operating MIC, and optional time zone triples
+        """
+        engine = get_engine()
+        return [engine.classify_day(q.day, q.mic, q.tz) for q in queries]
 
     @router.get(
         "/next_special_days",
@@ -608,6 +430,7 @@ def get_router(exchanges_enum: type[Enum]):
         "neither regular business days nor regular days where the exchange is closed, i.e. weekend "
         "days. Special days may be business days, e.g. special close days, or non-business days, e.g. "
         "holidays.",
+        dependencies=[Depends(as_of)],
         operation_id="api.special_days.get_next_special_days",
         responses={
             200: {"description": "List of special days for the given operating MIC and year."},
@@ -625,17 +448,10 @@ def get_router(exchanges_enum: type[Enum]):
         tz: str | None = None,
         skip_bad_dates: bool = False,
     ) -> tuple[list[DayClassificationMap], int]:
-        return _get_next_special_days0(
-            day,
-            inclusive,
-            forward,
-            frozenset(mic) if mic is not None else mic,
-            frozenset(types) if types is not None else special_day_types2,
-            n,
-            range,
-            tz,
-            skip_bad_dates,
+        result, complete = get_engine().next_special_days(
+            day, inclusive, forward, mic, types, n, range, tz, skip_bad_dates
         )
+        return result, 200 if complete else 416
 
     @router.get(
         "/next_business_days",
@@ -644,6 +460,7 @@ def get_router(exchanges_enum: type[Enum]):
         description="Return a list of previous or upcoming business days relative to a given day. Note that business "
         "days include certain types of special days like special open/close days, or triple-witching "
         "days, i.e. any day on which an exchange is open for trading counts as a business day.",
+        dependencies=[Depends(as_of)],
         operation_id="api.special_days.get_next_business_days",
         responses={
             200: {"description": "List of business days sorted by increasing distance to the given day."},
@@ -661,248 +478,420 @@ def get_router(exchanges_enum: type[Enum]):
         tz: str | None = None,
         skip_bad_dates: bool = False,
     ) -> tuple[list[DayClassificationMap], int]:
-        return _get_next_special_days0(
-            day,
-            inclusive,
-            forward,
-            frozenset(mic) if mic is not None else mic,
-            frozenset(types) if types is not None else business_day_types2,
-            n,
-            range,
-            tz,
-            skip_bad_dates,
+        result, complete = get_engine().next_business_days(
+            day, inclusive, forward, mic, types, n, range, tz, skip_bad_dates
         )
+        return result, 200 if complete else 416
 
-    def _get_business_days(mic: str, start: dt.datetime, end: dt.datetime) -> list[dt.date]:
-        result = [x for x in pd.bdate_range(start, end, freq=Context().cache.get(mic).day).date]
-        return result
+    @router.get(
+        "/combined_business_days",
+        tags=["Days"],
+        summary="Get the days on which all, any, or exactly one of the given operating MICs are open.",
+        description="Combine the business days of a set of operating MICs over a period of days. With `op` set to "
+        "`all`, returns the days on which all exchanges are open. With `any`, returns the days on which at least one "
+        "exchange is open. With `exactly_one`, returns the days on which exactly one exchange is open.",
+        dependencies=[Depends(as_of)],
+        operation_id="api.special_days.get_combined_business_days",
+        responses={
+            200: {"description": "Sorted list of days that satisfy the given operation."},
+            416: {"description": "Requested range is outside the supported years."},
+        },
+    )
+    def get_combined_business_days(
+        mic: list[SupportedMIC] = Query(),
+        op: BusinessDayOperator = BusinessDayOperator.ALL,
+        start: dt.date = Query(default_factory=lambda: dt.date.today()),
+        end: dt.date | None = None,
+    ) -> list[dt.date]:
+        """
+        Return the days in a period on which all, any, or exactly one of the given operating MICs are open.
 
-    @cached(LFUCache(maxsize=20))
-    def _get_next_special_days0(
-        day: dt.date,
-        inclusive: bool,
-        forward: bool,
-        mic: frozenset | None,
-        types: frozenset | None,
-        n: int,
-        range: int | None,
-        tz: str,
-        skip_bad_dates: bool,
-    ) -> tuple[list[DayClassificationMap], int]:
-        result = dict()
-        mics = mic if mic is not None else MICS
-        valid_types = types if types is not None else special_day_types
-        year = day.year
-        needed = n
-        range_threshold = (
-            (dt.datetime.combine(date=day, time=dt.time.min) + dt.timedelta(days=(1 if forward else -1) * range)).date()
-            if range is not None
-            else None
-        )
-        status = 200
-        # TODO: Catch situation where type isn't available, e.g. special close on XAMS.
-
-        while needed > 0:
-            # Build up a dictionary with dates as key to group together common dates. Each value is a dictionary that maps
-            # day classifications to the list of MICs it applies to. This is because the same day may be a different type of
-            # special day across the various exchanges.
-            special_days = dict()
-
-            for m in mics:
-                # Get all special days for MIC for current year.
-                special_days_for_mic: list[DayClassification] = get_special_days(m, year, tz=tz)
-
-                # Filter special days for specified types, e.g. business days only (see valid_types variable)
-                relevant_special_days_for_mic = [x for x in special_days_for_mic if x.type in valid_types]
-
-                # If year is the same as that of day, then if forward is true (false), filter out all days that are before
-                # (after) day, respecting the inclusive flag as well.
-                if year == day.year:
-
-                    def is_before(x, y):
-                        if forward:
-                            return x < y or (not inclusive and x == y)
-                        else:
-                            return x > y or (not inclusive and x == y)
-
-                    relevant_special_days_for_mic = [
-                        x for x in relevant_special_days_for_mic if not is_before(x.date, day)
-                    ]
-
-                # If regular business days are to be included, get those as well for year. But exclude those that are also
-                # contained in the list of special days (e.g. triple witching days).
-                if regular_day_type in valid_types:
-                    # Determine the period for which to get the regular business days.
-                    if year == day.year and forward:
-                        start = dt.datetime(year, day.month, day.day) + dt.timedelta(days=0 if inclusive else 1)
-                    else:
-                        start = dt.datetime(year, 1, 1)
-
-                    if year == day.year and not forward:
-                        end = dt.datetime(year, day.month, day.day) - dt.timedelta(days=0 if inclusive else 1)
-                    else:
-                        end = dt.datetime(year, 12, 31)
-
-                    # Get business days. This may include special days like e.g. early close days which are already included
-                    # in special_days_for_mic.
-                    business_days_for_mic: list[dt.date] = _get_business_days(m, start, end)
-
-                    # Filter out business days that are already marked as special days.
-                    special_days_for_mic_dates = [x.date for x in special_days_for_mic]
-
-                    business_days_for_mic: list[StandardDayClassification] = [
-                        StandardDayClassification(
-                            date=x,
-                            type=DayTypeBusinessRegular.REGULAR,
-                            is_business_day=True,
-                        )
-                        for x in business_days_for_mic
-                        if x not in special_days_for_mic_dates
-                    ]
-
-                    # Add regular business days to "special days".
-                    relevant_special_days_for_mic.extend(business_days_for_mic)
-
-                for d in relevant_special_days_for_mic:
-                    # Get existing entry for date in dictionary.
-                    v = special_days.get(d.date, dict())
-
-                    # Get existing entry for classification.
-                    c = v.get(d, list())
-
-                    # Add the MIC code to the list.
-                    c.append(m)
-
-                    # Safe updated entry back to v.
-                    v[d] = c
-
-                    # Safe updated entry back to special_days.
-                    special_days[d.date] = v
-
-            # Remove bad dates, if specified
-            if skip_bad_dates and not forward and len(special_days) > 0:
-                # start and end are only set
-                special_days = _remove_bad_days(mics=list(mics), special_days=special_days)
-
-            # Sort dict by date (key)
-            special_days = OrderedDict(sorted(special_days.items(), key=lambda x: x[0], reverse=not forward))
-
-            # Filter out all days that are outside the requested range, maybe.
-            if range_threshold is not None:
-                special_days = OrderedDict(
-                    filter(
-                        lambda x: dt.date.fromisoformat(x[0]) <= range_threshold
-                        if forward
-                        else dt.date.fromisoformat(x[0]) >= range_threshold,
-                        special_days.items(),
-                    )
-                )
+        :param mic: the operating MICs to combine
+        :param op: the operation to combine the business days with
+        :param start: the first day of the period, defaults to today
+        :param end: the last day of the period, defaults to the last day of the year of start
+        """
+        end = end if end is not None else dt.date(start.year, 12, 31)
 
-            # Only retain number of items still needed, maybe.
-            special_days = OrderedDict(itertools.islice(special_days.items(), min(needed, len(special_days))))
-
-            # Append items to result.
-            result.update(special_days)
-
-            # Update number of items still needed.
-            needed -= len(special_days)
-
-            # Move on to next (previous) year.
-            year += 1 if forward else -1
-
-            # Check that new year is not already outside range, maybe.
-            if range_threshold is not None:
-                # The first day (relative to the search direction) in the new year.
-                first = dt.date(day=1, month=1, year=year) if forward else dt.date(day=31, month=12, year=year)
-                is_outside_range = first > range_threshold if forward else first < range_threshold
-                if is_outside_range:
-                    break
-
-            # Check if we're outside the range of permissible values for year.. If not, assume that we can't find any more
-            # relevant special days.
-            if not min_year <= year <= max_year:
-                status = 416
-                break
-
-        def combine(c: DayClassification, mics: list[str]) -> DayClassificationWithMics:
-            if isinstance(c, StandardDayClassification):
-                return StandardDayClassificationWithMics(**c.model_dump(), mics=mics)
-            elif isinstance(c, SpecialOpenCloseDayClassification):
-                return SpecialOpenCloseDayClassificationWithMics(**c.model_dump(), mics=mics)
-            else:
-                raise RuntimeError("Unexpected day classification type.")
-
-        result = sorted(
-            [
-                DayClassificationMap(date=k, classifications=[combine(c, m) for c, m in v.items()])
-                for k, v in result.items()
-            ],
-            key=lambda x: x.date,
-            reverse=not forward,
-        )
+        check_range(start, end)
 
-        return result, status
+        return get_engine().combined_business_days(mic, op.value, start, end)
 
-    def get_bad_dates(
-        mic: Iterable[SupportedMIC] | None = None,
-        start: dt.date | None = None,
+    @router.get(
+        "/sessions",
+        tags=["Sessions"],
+        summary="Get the trading sessions for a given operating MIC and period.",
+        description="Get the trading sessions for a given operating MIC and period. Each session consists of the date "
+        "and the open and close instants, taking into account special open and close days, and the start and end of "
+        "the break, if any. Instants are returned in UTC unless a time zone is given.",
+        dependencies=[Depends(as_of)],
+        operation_id="api.special_days.get_sessions",
+        response_model=list[Session],
+        responses={
+            200: {"description": "List of sessions sorted by date."},
+            416: {"description": "Requested range is outside the supported years."},
+        },
+    )
+    def get_sessions(
+        mic: SupportedMIC,
+        start: dt.date = Query(default_factory=lambda: dt.date.today()),
         end: dt.date | None = None,
-    ) -> Iterable[dt.date]:
+        tz: str | None = None,
+    ) -> StreamingResponse:
+        """
+        Return the trading sessions for a given operating MIC and period.
+
+        :param mic: the operating MIC to return the sessions for
+        :param start: the first day of the period, defaults to today
+        :param end: the last day of the period, defaults to the last day of the year of start
+        :param tz: the optional name of the time zone to return open and close instants in, defaults to UTC
+        """
+        end = end if end is not None else dt.date(start.year, 12, 31)
+
+        check_range(start, end)
+
+        sessions = get_engine().sessions(mic, start, end)
+
+        return StreamingResponse(iter_sessions_json(sessions, parse_timezone(tz)), media_type="application/json")
+
+    @router.get(
+        "/open_at",
+        tags=["Sessions"],
+        summary="Get the operating MICs that are in session at given instants.",
+        description="Get the operating MICs that are in session at one or more instants. Exchanges are not in session "
+        "during breaks. Instants without a time zone are interpreted as UTC. If no instant is given, the current time "
+        "is used.",
+        dependencies=[Depends(as_of)],
+        operation_id="api.special_days.get_open_at",
+        responses={200: {"description": "List of instants and the MICs in session at each of them."}},
+    )
+    def get_open_at(
+        at: list[dt.datetime] = Query(default=None),
+        mic: list[SupportedMIC] = Query(default=None),
+    ) -> list[OpenMics]:
         """
-        Finds and returns bad dates for mic (if given), and within date range defined by start and end date.
+        Return the operating MICs that are in session at the given instants.
 
-        test_docs parameter only passed when running unit tests
+        :param at: the instants to check, defaults to the current time
+        :param mic: the optional operating MICs to restrict the result to, defaults to all
         """
+        at = at if at is not None else [dt.datetime.now(tz=dt.timezone.utc)]
 
-        if not end:
-            # if no end date specified, use today, i.e. ignore any future bad dates.
-            end = pd.Timestamp.now().date()
+        mics, is_open = get_engine().is_open(at, mic)
 
-        if not start:
-            # if no start date specified, use end - 365 days
-            start = pd.Timestamp.now().date() - pd.Timedelta(years=1)
+        return [OpenMics(at=a, mics=[m for m, x in zip(mics, row) if x]) for a, row in zip(at, is_open.tolist())]
 
-        mics = (mic,) if mic else MICS
+    @router.get(
+        "/next_open_close",
+        tags=["Sessions"],
+        summary="Get the next session open and close for one or all valid operating MICs.",
+        description="Get the next session open and close instants after a given instant, and the time remaining until "
+        "each of them. Instants without a time zone are interpreted as UTC. If no instant is given, the current time "
+        "is used.",
+        dependencies=[Depends(as_of)],
+        operation_id="api.special_days.get_next_open_close",
+        responses={200: {"description": "List of next open and close instants, one entry per MIC."}},
+    )
+    def get_next_open_close(
+        at: dt.datetime | None = None,
+        mic: list[SupportedMIC] = Query(default=None),
+        tz: str | None = None,
+    ) -> list[NextOpenClose]:
+        """
+        Return the next session open and close after a given instant for one or more operating MICs.
+
+        :param at: the instant to look ahead from, defaults to the current time
+        :param mic: the optional operating MICs to return results for, defaults to all
+        :param tz: the optional name of the time zone to return instants in, defaults to UTC
+        """
+        at = at if at is not None else dt.datetime.now(tz=dt.timezone.utc)
+        at = at if at.tzinfo is not None else at.replace(tzinfo=dt.timezone.utc)
+        tz: ZoneInfo = parse_timezone(tz)
+
+        def to_datetime(x: np.datetime64) -> dt.datetime | None:
+            return pd.Timestamp(x).tz_localize("UTC").tz_convert(tz).to_pydatetime() if not np.isnat(x) else None
 
-        # filter for start and end dates, and MIC if applicable
         result = []
 
-        for m in mics:
-            # get bad dates for MIC
-            result.extend(d for d, meta in Context().cache.get(m).meta(start=start, end=end) if "bad date" in meta.tags)
+        for m in mic if mic is not None else MICS:
+            next_open, next_close = (x[0] for x in get_engine().next_open_close(m, [at]))
+            next_open, next_close = to_datetime(next_open), to_datetime(next_close)
+            result.append(
+                NextOpenClose(
+                    mic=m,
+                    # The exchange is in session if and only if it closes before it opens again.
+                    is_open=next_close is not None and (next_open is None or next_close < next_open),
+                    next_open=next_open,
+                    next_close=next_close,
+                    time_to_open=next_open - at if next_open is not None else None,
+                    time_to_close=next_close - at if next_close is not None else None,
+                )
+            )
 
         return result
 
-    def _remove_bad_days(
-        mics: Iterable[SupportedMIC],
-        special_days: dict[dt.date, dict[DayClassification, list[SupportedMIC]]],
-        test_docs: list = None,
-    ):
+    @router.post(
+        "/trading_minutes",
+        tags=["Sessions"],
+        summary="Get the number of trading minutes between pairs of instants.",
+        description="Get the number of trading minutes between a start and an end instant for each of a list of "
+        "queries. Trading minutes take into account holidays, special open and close days, and breaks. Instants "
+        "without a time zone are interpreted as UTC.",
+        dependencies=[Depends(as_of)],
+        operation_id="api.special_days.get_trading_minutes",
+        responses={200: {"description": "List of trading minutes, one entry per query in the same order."}},
+    )
+    def get_trading_minutes(
+        queries: list[TradingMinutesQuery] = Body(
+            examples=[[{"mic": MICS[0], "start": "2024-01-01T00:00:00Z", "end": "2024-02-01T00:00:00Z"}]]
+        ),
+    ) -> list[TradingMinutes]:
+        """
+        Return the number of trading minutes between pairs of instants.
+
+        :param queries: the list of operating MIC, start and end instant triples
+        """
+        minutes = get_engine().trading_minutes(
+            [q.mic for q in queries], [q.start for q in queries], [q.end for q in queries]
+        )
+
+        return [TradingMinutes(**dict(q), minutes=x) for q, x in zip(queries, minutes.tolist())]
+
+    @router.get(
+        "/tagged_days",
+        tags=["Days"],
+        summary="Get the days that carry a given tag for one or more operating MICs.",
+        description="Get the days that carry a given tag in the meta of the exchange calendar changesets, optionally "
+        "restricted to a set of operating MICs and a period.",
+        dependencies=[Depends(as_of)],
+        operation_id="api.special_days.get_tagged_days",
+        responses={200: {"description": "List of tagged days, sorted by date and MIC."}},
+    )
+    def get_tagged_days(
+        tag: str,
+        mic: list[SupportedMIC] = Query(default=None),
+        start: dt.date | None = None,
+        end: dt.date | None = None,
+    ) -> list[TaggedDay]:
+        """
+        Return the days that carry a given tag.
+
+        :param tag: the tag to look up
+        :param mic: the optional operating MICs to restrict the result to, defaults to all
+        :param start: the optional first day of the period
+        :param end: the optional last day of the period
+        """
+        return [
+            TaggedDay(date=d, mic=m, tags=meta.tags, comment=meta.comment)
+            for m, d, meta in get_engine().tagged_days(tag, mic, start, end)
+        ]
+
+    @router.get(
+        "/export",
+        tags=["Export"],
+        summary="Export the special days for multiple operating MICs and years as a table.",
+        description="Export the special days for multiple operating MICs and years as a single table, either as an "
+        "Arrow IPC stream or a Parquet file. The table has the columns date, mic, type, is_business_day, name, time, "
+        "and tz, where time is the special open/close time, if any, in the time zone tz of the exchange.",
+        dependencies=[Depends(as_of)],
+        operation_id="api.special_days.export",
+        responses={
+            200: {
+                "description": "Table of special days.",
+                "content": {"application/vnd.apache.arrow.stream": {}, "application/vnd.apache.parquet": {}},
+            },
+            416: {"description": "Requested range is outside the supported years."},
+            501: {"description": "Export is not available."},
+        },
+        response_class=Response,
+    )
+    def export_special_days(
+        format: ExportFormat = ExportFormat.ARROW,
+        mic: list[SupportedMIC] = Query(default=None),
+        types: set[DayTypeBusinessSpecial | DayTypeNonBusinessSpecial] = Query(default=None),
+        year: list[int] = Query(default=None),
+    ) -> Response:
         """
-        Remove bad days from return dates, when parameter skip_bad_dates is true
+        Return the special days for multiple operating MICs and years as a table.
 
-        the test_docs variable is only set to not None by unit tests
+        :param format: the format of the table
+        :param mic: the optional operating MICs to export, defaults to all
+        :param types: the optional types of special days to export, defaults to all
+        :param year: the optional years to export, defaults to all supported years
         """
+        if not export.is_available():
+            raise HTTPException(status_code=501, detail="Export requires pyarrow to be installed.")
 
-        dates = list(special_days.keys())
-        start, end = str(min(dates)), str(max(dates))
+        if year is not None and not all(min_year <= y <= max_year for y in year):
+            raise HTTPException(
+                status_code=416,
+                detail=f"Requested years must be within the years {min_year} to {max_year}.",
+            )
+
+        batches = export.iter_special_days_batches(
+            {m: get_engine().cache.index(m) for m in (mic if mic is not None else MICS)},
+            types={x.value for x in types} if types is not None else None,
+            years=year,
+        )
+
+        if format == ExportFormat.PARQUET:
+            return Response(
+                export.to_parquet(batches),
+                media_type="application/vnd.apache.parquet",
+                headers={"Content-Disposition": 'attachment; filename="special_days.parquet"'},
+            )
+        else:
+            return StreamingResponse(
+                export.iter_arrow_stream(batches), media_type="application/vnd.apache.arrow.stream"
+            )
+
+    @router.get(
+        "/changes/stream",
+        tags=["Changes"],
+        summary="Subscribe to notifications about changes to the exchange calendars.",
+        description="Stream notifications about changes to the exchange calendars as server-sent events. Each time "
+        "changes are applied, a change event is sent whose data is a JSON object with the new version of the calendars, "
+        "the affected MICs, and the affected date ranges per MIC. Responses that were tagged with a different version "
+        "and overlap the affected ranges are stale. Reconnecting clients may send the Last-Event-ID header to catch up on "
+        "missed events. If that is not possible, a reset event is sent and all cached responses should be discarded.",
+        operation_id="api.changes.stream",
+        responses={200: {"description": "Stream of server-sent events.", "content": {"text/event-stream": {}}}},
+        response_class=StreamingResponse,
+    )
+    async def stream_changes(
+        mic: list[SupportedMIC] = Query(default=None),
+        last_event_id: str | None = Header(default=None),
+    ) -> StreamingResponse:
+        """
+        Return a stream of change notifications.
+
+        :param mic: the optional operating MICs to restrict notifications to, defaults to all
+        :param last_event_id: the id of the last event the client has received, if reconnecting
+        """
+        cache = Context().cache
+
+        return StreamingResponse(
+            iter_change_events(
+                Context().feed,
+                lambda: f"{cache.token}-{cache.version}",
+                last_event_id,
+                mics=set(mic) if mic is not None else None,
+                keepalive=settings.changes_stream_keepalive,
+            ),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
-        # get bad dates for mic, as list
-        bad_dates: Iterable[dt.date] = get_bad_dates(mic=mics, start=start, end=end, test_docs=test_docs)
+    # Operations that can be used in batch requests, by name. Streaming endpoints are excluded.
+    operations = {
+        "mics": get_valid_mics,
+        "mic2name": get_mic2name_mapping,
+        "timezone": get_timezone,
+        "special_days": get_special_days,
+        "classify_day": classify_day,
+        "classify_days": classify_days,
+        "next_special_days": get_next_special_days,
+        "next_business_days": get_next_business_days,
+        "combined_business_days": get_combined_business_days,
+        "open_at": get_open_at,
+        "next_open_close": get_next_open_close,
+        "trading_minutes": get_trading_minutes,
+        "tagged_days": get_tagged_days,
+    }
 
-        # iterate through bad dates found and filter out irrelevant dates and mics
-        for item in bad_dates:
-            mic = item["mic"]
-            date = item["date"]
+    # Validate parameters of batch sub-queries the same way as query parameters and bodies of individual requests.
+    validated_operations = {k: validate_call(v) for k, v in operations.items()}
+
+    class BatchQuery(BaseModel):
+        id: str
+        op: Literal[*operations.keys()]
+        params: dict[str, Any] = {}
+
+    class BatchResult(BaseModel):
+        status: int
+        result: Any = None
+        detail: Any = None
+
+    @router.post(
+        "/batch",
+        tags=["Batch"],
+        summary="Run multiple queries in a single request.",
+        description="Run a list of named sub-queries against the other operations in a single request. Each sub-query "
+        "names an operation, e.g. `special_days`, and passes the same parameters as the corresponding endpoint, by "
+        "name. Request bodies are passed as parameter `queries`. All sub-queries see the same state of the exchange "
+        "calendars, and identical sub-queries are only run once. The results are returned by the names of the "
+        "sub-queries, each with its own status code.",
+        dependencies=[Depends(as_of)],
+        operation_id="api.batch",
+        responses={
+            200: {"description": "Results of the sub-queries, by name."},
+            409: {"description": "The exchange calendars changed and the previous version is no longer retained."},
+            422: {"description": "Invalid request, e.g. duplicate names."},
+        },
+    )
+    def batch(
+        queries: list[BatchQuery] = Body(
+            examples=[
+                [
+                    {"id": "mics", "op": "mics"},
+                    {"id": "holidays", "op": "special_days", "params": {"mic": MICS[0], "year": 2024}},
+                ]
+            ]
+        ),
+    ) -> dict[str, BatchResult]:
+        """
+        Return the results of multiple sub-queries.
 
-            if date in list(special_days.keys()):
-                dateTypeKey = list(special_days[date].keys())[0]
-                if mic in special_days[date][dateTypeKey]:
-                    special_days[date][dateTypeKey].remove(mic)
+        :param queries: the sub-queries, each with a unique name, the operation, and its parameters
+        """
+        if len({q.id for q in queries}) != len(queries):
+            raise HTTPException(status_code=422, detail="Names of sub-queries must be unique.")
+
+        def run(op: str, params: dict[str, Any]) -> BatchResult:
+            try:
+                result = validated_operations[op](**params)
+                if inspect.isawaitable(result):
+                    result = anyio.from_thread.run(_await, result)
+                return BatchResult(status=200, result=jsonable_encoder(result))
+            except ValidationError as e:
+                errors = e.errors(include_url=False, include_context=False)
+                return BatchResult(status=422, detail=jsonable_encoder(errors))
+            except HTTPException as e:
+                return BatchResult(status=e.status_code, detail=e.detail)
+
+        def run_all() -> dict[tuple[str, str], BatchResult]:
+            # Results of distinct sub-queries.
+            results = {}
+
+            for q in queries:
+                key = (q.op, json.dumps(q.params, sort_keys=True, default=str))
+                if key not in results:
+                    results[key] = run(q.op, q.params)
+
+            return results
+
+        # Run all sub-queries. The version of a snapshot never changes, so this only matters for the current version.
+        engine = get_engine()
+        version = engine.cache.version
+
+        results = run_all()
+
+        if engine.cache.version != version:
+            # The calendars changed in the meantime. Run all sub-queries again against the previous version, so that
+            # all results are based on the same state.
+            try:
+                engine = engine.as_of(version)
+            except LookupError:
+                raise HTTPException(
+                    status_code=409, detail="The exchange calendars changed while running the sub-queries."
+                )
 
-        # update special days to remove "empty" dates
-        special_days = {k: v for k, v in special_days.items() if list(v.values())[0] != []}
+            token = _engine.set(engine)
+            try:
+                results = run_all()
+            finally:
+                _engine.reset(token)
 
-        return special_days
+        return {q.id: results[(q.op, json.dumps(q.params, sort_keys=True, default=str))] for q in queries}
 
     return router
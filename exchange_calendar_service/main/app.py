@@ -1,19 +1,30 @@
-import importlib
+import asyncio
 import importlib.metadata
 import logging
+import threading
+from collections.abc import Mapping
+from contextlib import asynccontextmanager, suppress
 from enum import Enum
 
 import exchange_calendars_extensions.core as ecx_core
 import fastapi
-import myers
-from exchange_calendars_extensions.api.changes import ChangeSetDict
+from exchange_calendars_extensions.api.changes import ChangeSet, ChangeSetDict
 from fastapi import FastAPI, Depends, HTTPException, status, Body
 from fastapi.security.api_key import APIKeyHeader
+from starlette.concurrency import run_in_threadpool
 
 from .api.v1.endpoints import get_router
 from .common.cache import ExchangeCalendarCache
+from .common.changes import ChangeSetDiff, apply_delta, get_delta
+from .common.compression import CompressionMiddleware
 from .common.context import Context
-from .common.util import log_iterable
+from .common.engine import QueryEngine
+from .common.etag import ETagMiddleware
+from .common.feed import ChangeFeed
+from .common.logs import QueueLogging
+from .common.journal import ChangeSetJournal
+from .common.watcher import ChangeSetDirectoryWatcher
+from .init import run_init
 from .settings import settings
 
 log = logging.getLogger(__name__)
@@ -24,50 +35,140 @@ def app() -> FastAPI:
     # The keys of _settings.exchanges become the enum member keys/names and the values become the enum member values.
     Exchanges: type[Enum] = Enum("ExchangeEnum", settings.exchanges)
 
-    # If _settings.init is not None, try to import it. Once imported. check if it is a callable with zero arguments.
-    # If so, call it. Otherwise, raise an Exception and exit. Use importlib to import the callable.
-    if settings.init:
-        import inspect
-
-        # Split into module and callable name.
-        module_name, callable_name = settings.init.rsplit(":", 1)
-
-        if not callable_name:
-            _ = importlib.import_module(module_name)
-        else:
-            # Import the module.
-            module = importlib.import_module(module_name)
-
-            # Get the callable.
-            init = getattr(module, callable_name)
-
-            # Check if it is callable.
-            if not callable(init):
-                raise ValueError(f"{settings.init} is not callable.")
-
-            # Check if it is a function.
-            if not inspect.isfunction(init):
-                raise ValueError(f"{settings.init} is not a function.")
-
-            # Check if it has zero arguments.
-            if len(inspect.signature(init).parameters) != 1:
-                raise ValueError(f"{settings.init} does not have exactly one argument.")
-
-            # Call the callable.
-            init(settings)
+    # Run customization, if any.
+    run_init(settings)
 
     # Apply extensions to exchange calendars.
     ecx_core.apply_extensions()
 
+    # Replay journaled changesets, if configured. Do this before the cache is warmed up so that each calendar is only
+    # built once.
+    journal = ChangeSetJournal(settings.journal) if settings.journal else None
+
+    if journal is not None:
+        for key, changes in journal.load().items():
+            log.info(f"Applying journaled changes for exchange {key}.")
+            ecx_core.update_calendar(key, dict(changes))
+
+    # Serializes updates via the endpoint and from the changeset directory, so that each update is computed against the
+    # changesets in effect and journaled in the order it was applied.
+    update_lock = threading.Lock()
+
+    def update_calendars(delta: Mapping[str, ChangeSet | None]) -> dict[str, ChangeSetDiff]:
+        # Apply a delta and persist it, maybe. The caller must hold the update lock.
+        diff = apply_delta(delta)
+
+        if journal is not None:
+            journal.append(delta)
+
+        return diff
+
+    def apply_changes_dir(delta: Mapping[str, ChangeSet | None]) -> None:
+        with update_lock:
+            applied = watcher.applied
+
+            # Changesets removed from the directory may have been replaced via the endpoint since. Only reset those that
+            # are still in effect as applied from the directory.
+            effective = {
+                key: changes
+                for key, changes in delta.items()
+                if changes is not None or ecx_core.get_changes_for_calendar(key) == applied.get(key)
+            }
+
+            if effective:
+                update_calendars(effective)
+
+            if journal is not None:
+                # Record the changesets now applied from the directory, so that the delta after a restart also resets
+                # those removed from the directory in the meantime.
+                journal.save_directory({k: v for k, v in {**applied, **delta}.items() if v is not None})
+
+    # Apply changesets from directory, if configured. Again, do this before the cache is warmed up.
+    watcher = (
+        ChangeSetDirectoryWatcher(
+            settings.changes_dir,
+            apply=apply_changes_dir,
+            interval=settings.changes_dir_interval,
+            debounce=settings.changes_dir_debounce,
+            applied=journal.load_directory() if journal is not None else None,
+        )
+        if settings.changes_dir
+        else None
+    )
+
+    if watcher is not None:
+        watcher.scan()
+        watcher.reload()
+
     # Initialize app context.
-    _ = Context(cache=ExchangeCalendarCache(Exchanges.__members__.keys()))
-    
+    Context().cache = ExchangeCalendarCache(
+        Exchanges.__members__.keys(), warm_up=not settings.lazy_calendars, history=settings.calendar_versions
+    )
+    Context().engine = QueryEngine(Context().cache)
+    Context().feed = ChangeFeed(history=settings.changes_stream_history)
+
     try:
         version = importlib.metadata.version("exchange_calendar_service")
     except importlib.metadata.PackageNotFoundError:
         version = "unknown"
 
-    app = FastAPI(title="Exchange Calendar Service", version=version, description="A RESTful HTTP Service.")
+    async def warm_up_calendars():
+        # One calendar at a time, so that requests are not held up for long and cancellation takes effect quickly.
+        for mic in Context().cache.mics:
+            await asyncio.to_thread(Context().cache.get, mic)
+        log.info("Built all calendars.")
+
+    @asynccontextmanager
+    async def lifespan(_: FastAPI):
+        # Set up queue-based logging, maybe.
+        queue_logging = QueueLogging(json_format=settings.log_json) if settings.log_queue else None
+
+        if queue_logging is not None:
+            queue_logging.start()
+
+        # Watch changeset directory in the background, maybe.
+        task = asyncio.create_task(watcher.run()) if watcher is not None else None
+
+        # Build remaining calendars in the background, maybe.
+        warm_up = asyncio.create_task(warm_up_calendars()) if settings.lazy_calendars else None
+
+        yield
+
+        for t in (task, warm_up):
+            if t is not None:
+                t.cancel()
+                with suppress(asyncio.CancelledError):
+                    await t
+
+        if queue_logging is not None:
+            queue_logging.stop()
+
+    app = FastAPI(
+        title="Exchange Calendar Service", version=version, description="A RESTful HTTP Service.", lifespan=lifespan
+    )
+
+    # Responses to these endpoints depend on the current time, unless the respective parameter is given.
+    volatile = {"/v1/open_at": "at", "/v1/next_open_close": "at"}
+
+    # Streaming endpoints whose responses are never tagged, cached, or compressed.
+    exclude = {"/v1/changes/stream"}
+
+    def get_version() -> str:
+        return f"{Context().cache.token}-{Context().cache.version}"
+
+    # Compress responses and cache them, both raw and compressed.
+    app.add_middleware(
+        CompressionMiddleware,
+        get_version=get_version,
+        prefix="/v1/",
+        volatile=volatile,
+        exclude=exclude,
+        min_size=settings.compression_min_size,
+        cache_size=settings.response_cache_size,
+    )
+
+    # Tag responses with the version of the calendars so that clients can revalidate cached responses cheaply.
+    app.add_middleware(ETagMiddleware, get_version=get_version, prefix="/v1/", volatile=volatile, exclude=exclude)
 
     router_v1: fastapi.APIRouter = get_router(Exchanges)
 
@@ -115,72 +216,31 @@ def app() -> FastAPI:
                     }
                 }
             ),
-        ):
+        ) -> dict[str, ChangeSetDiff]:
             log.info("Received changes via endpoint.")
 
-            # Get currently applied changesets.
-            changes_dict_prev: ChangeSetDict = ecx_core.get_changes_for_all_calendars()
+            def update_locked() -> dict[str, ChangeSetDiff] | None:
+                with update_lock:
+                    # Get currently applied changesets.
+                    changes_dict_prev: ChangeSetDict = ecx_core.get_changes_for_all_calendars()
+
+                    if changes_dict == changes_dict_prev:
+                        return None
+
+                    # Apply changes to affected calendars only.
+                    return update_calendars(get_delta(changes_dict_prev, changes_dict))
+
+            diff = await run_in_threadpool(update_locked)
 
-            if changes_dict == changes_dict_prev:
+            if diff is None:
                 log.info("No changes.")
-                return
-
-            # Keys in changes_dict but not in changes_dict_prev.
-            keys_to_add = set(changes_dict.keys()) - set(changes_dict_prev.keys())
-
-            # Keys in both changes and changes_prev.
-            keys_to_update = set(changes_dict.keys()) & set(changes_dict_prev.keys())
-
-            # Keys in changes_prev but not in changes.
-            keys_to_remove = set(changes_dict_prev.keys()) - set(changes_dict.keys())
-
-            # Reset all calendars.
-            ecx_core.reset_all_calendars()
-
-            # Apply change sets.
-            for key in keys_to_add:
-                log.info(f"Adding new changes for exchange {key}:")
-                log_iterable(
-                    [" + " + line for line in changes_dict[key].model_dump_json(indent=2).split("\n")],
-                    logging.INFO,
-                )
-                ecx_core.update_calendar(key, dict(changes_dict[key]))
-
-            # Update existing change sets.
-            for key in keys_to_update:
-                action2str = {
-                    "k": " ",
-                    "i": "+",
-                    "r": "-",
-                    "o": ".",
-                }
-                if changes_dict[key] == changes_dict_prev[key]:
-                    log.info(f"Changes remain the same for exchange {key}:")
-                    log_iterable(
-                        ["   " + line for line in changes_dict[key].model_dump_json(indent=2).split("\n")],
-                        logging.INFO,
-                    )
-                else:
-                    log.info(f"Updating changes for exchange {key}:")
-                    diff = myers.diff(
-                        a=changes_dict_prev[key].model_dump_json(indent=2).split("\n"),
-                        b=changes_dict[key].model_dump_json(indent=2).split("\n"),
-                    )
-                    diff = [" " + action2str[action] + " " + line for action, line in diff]
-                    log_iterable(diff, logging.INFO)
-
-                ecx_core.update_calendar(key, dict(changes_dict[key]))
-
-            # Remove change sets.
-            for key in keys_to_remove:
-                log.info(f"Removing changes for exchange {key}:")
-                log_iterable(
-                    [" - " + line for line in changes_dict_prev[key].model_dump_json(indent=2).split("\n")],
-                    logging.INFO,
-                )
-
-            # Refresh all affected calendars in cache.
-            for key in keys_to_add | keys_to_update | keys_to_remove:
-                Context().cache.refresh(key)
+                return {}
+
+            log.info(
+                f"Updated changes for exchanges {', '.join(sorted(diff.keys()))}.",
+                extra={"changes": {key: d.model_dump(mode="json") for key, d in diff.items()}},
+            )
+
+            return diff
 
     return app
@@ -0,0 +1,244 @@
+import argparse
+import csv
+import datetime as dt
+import enum
+import json
+import logging
+import multiprocessing
+import os
+import sys
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from concurrent.futures import Executor, ProcessPoolExecutor
+from enum import Enum
+from typing import IO, Any
+
+import exchange_calendars as ec
+import exchange_calendars_extensions.core as ecx_core
+import numpy as np
+
+from .common import export
+from .common.cache import ExtendedExchangeCalendarWrapper
+from .common.changes import apply_delta, load_changes_file
+from .common.constants import min_year, max_year
+from .common.export import Table
+from .common.index import CalendarIndex
+from .init import run_init
+from .settings import settings
+
+log = logging.getLogger(__name__)
+
+
+@enum.unique
+class Format(str, Enum):
+    """The supported output formats."""
+
+    CSV = "csv"
+    NDJSON = "ndjson"
+    PARQUET = "parquet"
+
+
+def initialize(changes: str | None = None) -> None:
+    """
+    Prepare the exchange calendars in the current process the same way the service does at startup.
+
+    :param changes: the optional path to a changeset file to apply
+    """
+    run_init(settings)
+    ecx_core.apply_extensions()
+
+    if changes is not None:
+        apply_delta(load_changes_file(changes))
+
+
+def build(table: Table, mic: str, years: list[int]) -> dict[str, np.ndarray]:
+    """
+    Build the calendar for a single MIC and return the rows of a table for the given years.
+
+    :param table: the table
+    :param mic: the MIC
+    :param years: the years
+    :return: the arrays, by column name
+    """
+    index = CalendarIndex(ExtendedExchangeCalendarWrapper(ec.get_calendar(mic)))
+
+    # Purge the instance from the exchange_calendars internal cache, see ExchangeCalendarCache.get().
+    ec.calendar_utils.global_calendar_dispatcher._calendars.clear()
+
+    return export.get_columns(table, mic, index, years=years)
+
+
+def _imap(executor: Executor | None, fn: Callable, args: Iterable[tuple], window: int) -> Iterator[Any]:
+    # Like executor.map(), but keeps at most window tasks in flight so that results do not pile up in memory when the
+    # consumer is slower than the workers. Runs in the current process if no executor is given.
+    if executor is None:
+        for a in args:
+            yield fn(*a)
+        return
+
+    pending = deque()
+
+    for a in args:
+        pending.append(executor.submit(fn, *a))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+
+def _to_text(values: np.ndarray) -> list:
+    # Convert an array to a list of JSON-compatible values.
+    if np.issubdtype(values.dtype, np.datetime64):
+        if np.datetime_data(values.dtype)[0] == "D":
+            return values.astype(str).tolist()
+        return np.datetime_as_string(values, unit="s", timezone="UTC").tolist()
+    return [x.isoformat() if isinstance(x, dt.time) else x for x in values.tolist()]
+
+
+class _CsvWriter:
+    def __init__(self, f: IO[str], table: Table):
+        self._writer = csv.writer(f, lineterminator="\n")
+        self._header = False
+
+    def write(self, columns: Mapping[str, np.ndarray]) -> None:
+        if not self._header:
+            self._writer.writerow(columns.keys())
+            self._header = True
+        self._writer.writerows(zip(*(_to_text(v) for v in columns.values())))
+
+    def close(self) -> None:
+        pass
+
+
+class _NdjsonWriter:
+    def __init__(self, f: IO[str], table: Table):
+        self._f = f
+
+    def write(self, columns: Mapping[str, np.ndarray]) -> None:
+        keys = tuple(columns.keys())
+        for row in zip(*(_to_text(v) for v in columns.values())):
+            self._f.write(json.dumps(dict(zip(keys, row))))
+            self._f.write("\n")
+
+    def close(self) -> None:
+        pass
+
+
+class _ParquetWriter:
+    def __init__(self, f: IO[bytes], table: Table):
+        self._table = table
+        self._writer = export.pq.ParquetWriter(f, export.get_schema(table))
+
+    def write(self, columns: Mapping[str, np.ndarray]) -> None:
+        self._writer.write_batch(export.to_record_batch(self._table, columns))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def run(
+    table: Table,
+    format: Format,
+    mics: list[str],
+    years: list[int],
+    output: IO,
+    changes: str | None = None,
+    workers: int = 1,
+) -> None:
+    """
+    Write a table for the given MICs and years to a file.
+
+    Calendars are built in parallel in worker processes, if requested, and the rows for each MIC are written as soon as
+    they are available, in the given order of MICs. Only a bounded number of calendars are held in memory at any time.
+
+    :param table: the table to write
+    :param format: the output format
+    :param mics: the MICs
+    :param years: the years
+    :param output: the file to write to, in text mode for CSV and NDJSON, in binary mode for Parquet
+    :param changes: the optional path to a changeset file to apply
+    :param workers: the number of worker processes, or 1 to build all calendars in the current process
+    """
+    writer = {Format.CSV: _CsvWriter, Format.NDJSON: _NdjsonWriter, Format.PARQUET: _ParquetWriter}[format](
+        output, table
+    )
+
+    executor = (
+        ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=initialize,
+            initargs=(changes,),
+        )
+        if workers > 1
+        else None
+    )
+
+    if executor is None:
+        initialize(changes)
+
+    try:
+        for mic, columns in zip(mics, _imap(executor, build, ((table, m, years) for m in mics), 2 * workers)):
+            writer.write(columns)
+            log.info(f"Wrote {len(columns['date'])} rows for exchange {mic}.")
+    finally:
+        writer.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Export special days, business days, or sessions of exchange calendars without running the service."
+    )
+    parser.add_argument("table", choices=[x.value for x in Table], help="the table to export")
+    parser.add_argument(
+        "--format", choices=[x.value for x in Format], default=Format.CSV.value, help="the output format"
+    )
+    parser.add_argument(
+        "--mic", action="append", help="the MIC to export, may be given multiple times, defaults to all exchanges"
+    )
+    parser.add_argument("--start-year", type=int, default=dt.date.today().year, help="the first year to export")
+    parser.add_argument("--end-year", type=int, help="the last year to export, defaults to the first year")
+    parser.add_argument("--changes", help="the optional path to a changeset file in JSON or YAML format to apply")
+    parser.add_argument("--output", "-o", default="-", help="the output file, defaults to stdout for CSV and NDJSON")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="the number of worker processes to build calendars"
+    )
+    args = parser.parse_args(argv)
+    table, format = Table(args.table), Format(args.format)
+
+    end_year = args.end_year if args.end_year is not None else args.start_year
+
+    if not min_year <= args.start_year <= end_year <= max_year:
+        parser.error(f"Years must be within the years {min_year} to {max_year}.")
+
+    if format == Format.PARQUET:
+        if not export.is_available():
+            parser.error("Parquet format requires pyarrow to be installed.")
+        if args.output == "-":
+            parser.error("Parquet format requires an output file.")
+
+    mics = args.mic if args.mic else list(settings.exchanges.keys())
+
+    unknown = [m for m in mics if m not in settings.exchanges]
+    if unknown:
+        parser.error(f"Unsupported exchanges: {', '.join(unknown)}.")
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
+    years = list(range(args.start_year, end_year + 1))
+    workers = max(1, min(args.workers, len(mics)))
+
+    if args.output == "-":
+        run(table, format, mics, years, sys.stdout, args.changes, workers)
+    else:
+        mode, newline = ("wb", None) if format == Format.PARQUET else ("w", "")
+        encoding = None if format == Format.PARQUET else "utf-8"
+        with open(args.output, mode, encoding=encoding, newline=newline) as f:
+            run(table, format, mics, years, f, args.changes, workers)
+
+
+if __name__ == "__main__":
+    main()
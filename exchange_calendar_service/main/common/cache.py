@@ -1,9 +1,18 @@
+import datetime as dt
+import threading
+import uuid
+from collections import deque
 from collections.abc import Iterable
 
 import exchange_calendars as ec
 from cachetools import cached, LFUCache
 from exchange_calendars_extensions.core import ExtendedExchangeCalendar
 
+import numpy as np
+
+from .index import CalendarIndex, SessionIntervalIndex
+from .tags import TagIndex
+
 
 class ExtendedExchangeCalendarWrapper:
     """Wrapper class that exposes just a subset of the attributes of ExtendedExchangeCalendar. The names of the
@@ -26,27 +35,160 @@ class ExtendedExchangeCalendarWrapper:
         "tz",
         "open_times",
         "close_times",
+        "open_offset",
+        "close_offset",
         "weekmask",
+        "break_start_times",
+        "break_end_times",
+        "special_offsets",
+        "special_offsets_adhoc",
         "meta",
     )
 
+    # Defaults for the properties that only some calendars have.
+    _defaults = {"special_offsets": (), "special_offsets_adhoc": ()}
+
     def __init__(self, exchange_calendar: ExtendedExchangeCalendar):
         # Copy all the relevant properties from wrapped object to this one.
         for prop in self.__slots__:
-            setattr(self, prop, getattr(exchange_calendar, prop))
+            setattr(self, prop, getattr(exchange_calendar, prop, self._defaults.get(prop)))
+
+
+def _sessions_index(calendars, days_before: int, days_after: int) -> SessionIntervalIndex:
+    # Get precomputed index of sessions for all MICs of a cache or snapshot. Rebuild if the current day is no longer
+    # covered.
+    today = np.datetime64(dt.date.today(), "ns")
+    index = calendars._sessions_index
+    if index is None or not index.covers(today) or not index.covers(today + np.timedelta64(days_after // 2, "D")):
+        start = dt.date.today() - dt.timedelta(days=days_before)
+        end = dt.date.today() + dt.timedelta(days=days_after)
+        index = calendars._sessions_index = SessionIntervalIndex(
+            {m: calendars.index(m) for m in calendars.mics}, start, end
+        )
+    return index
+
+
+class ExchangeCalendarSnapshot:
+    """Read-only view of a previous version of the calendars in an ExchangeCalendarCache, with the same interface for
+    queries.
+
+    A snapshot only holds the calendars and indices that have been refreshed in the cache since its version. All other
+    calendars are looked up in the cache, so unchanged calendars and their indices are shared between all versions."""
+
+    def __init__(self, cache: "ExchangeCalendarCache", version: int, created: dt.datetime):
+        """
+        :param cache: the cache to take the snapshot of
+        :param version: the version of the cache
+        :param created: the time at which the version was created
+        """
+        self.mics = cache.mics
+        self.token = cache.token
+        self.version = version
+        self.created = created
+
+        self._cache = cache
+
+        # The calendars and indices as of this version that have since been refreshed in the cache, per MIC.
+        self._calendars: dict[str, ExtendedExchangeCalendarWrapper] = {}
+        self._indices: dict[str, CalendarIndex] = {}
+
+        self._tags: TagIndex | None = None
+        self._sessions_index: SessionIntervalIndex | None = None
+
+    def _retain(self, mic: str, calendar: ExtendedExchangeCalendarWrapper, index: CalendarIndex | None) -> None:
+        # Called by the cache before it refreshes a calendar. Keep the previous calendar and index, unless the calendar
+        # has already been refreshed since this version before.
+        if mic not in self._calendars:
+            self._calendars[mic] = calendar
+            if index is not None:
+                self._indices[mic] = index
+
+    def get(self, mic: str) -> ExtendedExchangeCalendarWrapper:
+        # Get wrapper for the given MIC, as of this version.
+        with self._cache._lock:
+            c = self._calendars.get(mic)
+            return c if c is not None else self._cache.get(mic)
+
+    def index(self, mic: str) -> CalendarIndex:
+        # Get precomputed index for the given MIC, as of this version.
+        with self._cache._lock:
+            index = self._indices.get(mic)
+            if index is not None:
+                return index
+            c = self._calendars.get(mic)
+            if c is None:
+                return self._cache.index(mic)
+
+        # The calendar has been refreshed since, but its index was never built.
+        index = CalendarIndex(c)
+        with self._cache._lock:
+            return self._indices.setdefault(mic, index)
+
+    @property
+    def tags(self) -> TagIndex:
+        # Inverted index of tags in calendar meta as of this version, created on first access.
+        tags = self._tags
+        if tags is None:
+            tags = TagIndex()
+            for mic in self.mics:
+                tags.update(mic, self.get(mic).meta())
+            self._tags = tags
+        return tags
+
+    def sessions_index(self, days_before: int = 7, days_after: int = 365) -> SessionIntervalIndex:
+        return _sessions_index(self, days_before, days_after)
 
 
 class ExchangeCalendarCache:
     """Cache for exchange calendars. The cache is populated on demand, and the instances are cached using a least
     frequently used cache."""
 
-    def __init__(self, mics: Iterable[str]):
-        # Set up caching for get() method.
-        cache = LFUCache(maxsize=len([mic for mic in mics]))
-        self.get = cached(cache=cache)(self.get)
+    def __init__(self, mics: Iterable[str], warm_up: bool = True, history: int = 0):
+        """
+        :param mics: the MICs in the cache
+        :param warm_up: whether to build all calendars right away, otherwise each calendar is built on first use
+        :param history: the number of previous versions to retain as snapshots
+        """
+        # The MICs in the cache.
+        self.mics = tuple(mics)
+
+        # Inverted index of tags in calendar meta, across all MICs. Updated whenever a calendar is (re-)created.
+        self.tags = TagIndex()
+
+        # Set up caching for get() method. Calendars are built outside the lock, but only once per MIC at a time, with
+        # concurrent callers waiting for the result.
+        cache = LFUCache(maxsize=len(self.mics))
+        self.get = cached(cache=cache, condition=threading.Condition())(self.get)
 
-        # Warm up cache.
-        for mic in mics:
+        # Precomputed indices, per MIC.
+        self._indices: dict[str, CalendarIndex] = {}
+
+        # Precomputed index of sessions across all MICs over a rolling window.
+        self._sessions_index: SessionIntervalIndex | None = None
+
+        # Incremented whenever a calendar is refreshed, so that dependent caches can detect stale entries.
+        self.version = 0
+
+        # Unique per instance, so that versions of different instances, e.g. across restarts, can be told apart.
+        self.token = uuid.uuid4().hex[:16]
+
+        # The time at which the current version was created.
+        self.created = dt.datetime.now(dt.timezone.utc)
+
+        # The number of previous versions to retain, and their snapshots, oldest first.
+        self.history = max(history, 0)
+        self._history: deque[ExchangeCalendarSnapshot] = deque(maxlen=self.history)
+
+        # Guards refreshes against concurrent lookups in snapshots.
+        self._lock = threading.RLock()
+
+        # Warm up cache, maybe.
+        if warm_up:
+            self.warm_up()
+
+    def warm_up(self) -> None:
+        # Build all calendars that have not been built yet.
+        for mic in self.mics:
             _ = self.get(mic)
 
     def get(self, mic: str) -> ExtendedExchangeCalendarWrapper:
@@ -59,8 +201,93 @@ class ExchangeCalendarCache:
         # amounts of memory.
         ec.calendar_utils.global_calendar_dispatcher._calendars.clear()
 
+        # Update tag index.
+        self.tags.update(mic, c.meta())
+
         return c
 
-    def refresh(self, mic: str) -> None:
-        self.get.cache.pop(self.get.cache_key(self, mic))
-        _ = self.get(mic)
+    def index(self, mic: str) -> CalendarIndex:
+        # Get precomputed index for the given MIC, create on first access.
+        index = self._indices.get(mic)
+        if index is not None:
+            return index
+
+        c = self.get(mic)
+        index = CalendarIndex(c)
+
+        # Only keep the index if the calendar has not been refreshed in the meantime.
+        with self._lock:
+            if self.get(mic) is c:
+                index = self._indices.setdefault(mic, index)
+        return index
+
+    def sessions_index(self, days_before: int = 7, days_after: int = 365) -> SessionIntervalIndex:
+        return _sessions_index(self, days_before, days_after)
+
+    def refresh(self, *mics: str) -> None:
+        """
+        Rebuild the calendars for the given MICs and create a new version.
+
+        The calendars should have been built before the underlying calendars were changed. Otherwise, their previous
+        state is lost for snapshots, and a build of the previous state that is still in progress may end up in the
+        cache.
+
+        :param mics: the MICs to refresh
+        """
+        with self._lock:
+            if self.history:
+                self._history.append(ExchangeCalendarSnapshot(self, self.version, self.created))
+
+                # Hand the previous calendars over to all snapshots that still share them with the cache.
+                for mic in mics:
+                    with self.get.cache_lock:
+                        c = self.get.cache.get(self.get.cache_key(mic))
+                    if c is not None:
+                        for snapshot in self._history:
+                            snapshot._retain(mic, c, self._indices.get(mic))
+
+            for mic in mics:
+                with self.get.cache_lock:
+                    self.get.cache.pop(self.get.cache_key(mic), None)
+                self._indices.pop(mic, None)
+            self._sessions_index = None
+            for mic in mics:
+                _ = self.get(mic)
+            self.version += 1
+            self.created = dt.datetime.now(dt.timezone.utc)
+
+    def as_of(
+        self, version: int | None = None, time: dt.datetime | None = None
+    ) -> "ExchangeCalendarCache | ExchangeCalendarSnapshot":
+        """
+        Return the calendars as of a given version or point in time.
+
+        :param version: the version, or None for the current version
+        :param time: the point in time, used if no version is given, or None for the current version. Naive datetimes
+            are interpreted as UTC.
+        :return: this cache for the current version, otherwise the snapshot of the version
+        :raises ValueError: if the version does not exist yet
+        :raises LookupError: if the version is no longer retained
+        """
+        with self._lock:
+            if version is not None:
+                if version > self.version:
+                    raise ValueError(f"Version {version} does not exist.")
+                if version == self.version:
+                    return self
+                snapshot = next((x for x in self._history if x.version == version), None)
+                if snapshot is None:
+                    raise LookupError(f"Version {version} is no longer retained.")
+                return snapshot
+
+            if time is not None:
+                time = time if time.tzinfo is not None else time.replace(tzinfo=dt.timezone.utc)
+                if time >= self.created:
+                    return self
+                # The latest retained version created at or before the given time.
+                snapshot = next((x for x in reversed(self._history) if x.created <= time), None)
+                if snapshot is None:
+                    raise LookupError(f"No version as of {time.isoformat()} is retained.")
+                return snapshot
+
+            return self
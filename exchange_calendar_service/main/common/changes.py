@@ -0,0 +1,170 @@
+import datetime as dt
+import json
+import logging
+import os
+from collections.abc import Iterable, Mapping
+
+import exchange_calendars_extensions.core as ecx_core
+import pandas as pd
+import yaml
+from exchange_calendars_extensions.api.changes import ChangeSet, ChangeSetDict
+from pydantic import BaseModel
+
+from .context import Context
+from .feed import ChangeEvent, get_ranges
+
+log = logging.getLogger(__name__)
+
+# File extensions of changeset files and the corresponding parsers.
+_parsers = {
+    ".json": json.loads,
+    ".yaml": yaml.safe_load,
+    ".yml": yaml.safe_load,
+}
+
+
+class SectionDiff(BaseModel):
+    """Differences between the dates in one section of two changesets."""
+
+    # Dates only in the new changeset.
+    added: list[dt.date] = []
+
+    # Dates only in the previous changeset.
+    removed: list[dt.date] = []
+
+    # Dates in both changesets, but with different values.
+    modified: list[dt.date] = []
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.modified)
+
+
+class ChangeSetDiff(BaseModel):
+    """Differences between two changesets, per section."""
+
+    add: SectionDiff = SectionDiff()
+    remove: SectionDiff = SectionDiff()
+    meta: SectionDiff = SectionDiff()
+
+    def __bool__(self):
+        return bool(self.add or self.remove or self.meta)
+
+    def dates(self) -> set[dt.date]:
+        """Return all dates that differ in any section."""
+        return {d for s in (self.add, self.remove, self.meta) for d in (*s.added, *s.removed, *s.modified)}
+
+
+def _diff_section(prev: Mapping | Iterable, new: Mapping | Iterable) -> SectionDiff:
+    # Sections are either mappings from dates to values or collections of dates.
+    prev = prev if isinstance(prev, Mapping) else dict.fromkeys(prev)
+    new = new if isinstance(new, Mapping) else dict.fromkeys(new)
+
+    def to_dates(x: Iterable) -> list[dt.date]:
+        return sorted(pd.Timestamp(d).date() for d in x)
+
+    return SectionDiff(
+        added=to_dates(k for k in new.keys() if k not in prev),
+        removed=to_dates(k for k in prev.keys() if k not in new),
+        modified=to_dates(k for k, v in new.items() if k in prev and prev[k] != v),
+    )
+
+
+def diff_changesets(prev: ChangeSet | None, new: ChangeSet | None) -> ChangeSetDiff:
+    """
+    Return the differences between two changesets, per section. Runs in linear time in the size of the changesets.
+
+    :param prev: the previous changeset, or None if there was none
+    :param new: the new changeset, or None if it was removed
+    :return: the dates that were added, removed, or modified in each section
+    """
+    prev = prev if prev is not None else ChangeSet()
+    new = new if new is not None else ChangeSet()
+
+    return ChangeSetDiff(
+        add=_diff_section(prev.add, new.add),
+        remove=_diff_section(prev.remove, new.remove),
+        meta=_diff_section(prev.meta, new.meta),
+    )
+
+
+def get_delta(changes_prev: Mapping[str, ChangeSet], changes: Mapping[str, ChangeSet]) -> dict[str, ChangeSet | None]:
+    """
+    Return the per-MIC delta between two complete states of changesets.
+
+    :param changes_prev: the previous changesets, by MIC
+    :param changes: the new changesets, by MIC
+    :return: the new changeset for each MIC that was added or modified, and None for each MIC that was removed
+    """
+    delta = {k: v for k, v in changes.items() if changes_prev.get(k) != v}
+    delta.update({k: None for k in changes_prev.keys() - changes.keys()})
+    return delta
+
+
+def apply_delta(delta: Mapping[str, ChangeSet | None]) -> dict[str, ChangeSetDiff]:
+    """
+    Replace the changesets for individual exchange calendars and refresh the affected calendars in the cache. All
+    calendars not contained in the delta remain untouched.
+
+    If a change feed is set up, an event is published for the affected calendars that are served.
+
+    :param delta: the new changeset per MIC, or None to remove the changeset for the MIC
+    :return: the differences to the previous changesets, for each MIC with any
+    """
+    changes_prev = {key: ecx_core.get_changes_for_calendar(key) for key in delta.keys()}
+
+    # Build the affected calendars in the cache before they are changed, so that their previous versions can be
+    # retained, and so that no build of a previous version is still in progress when they are refreshed.
+    cache = Context().cache
+    if cache is not None:
+        for key in delta.keys():
+            if key in cache.mics:
+                _ = cache.get(key)
+
+    for key, changes in delta.items():
+        if changes is None:
+            ecx_core.reset_calendar(key)
+        else:
+            ecx_core.update_calendar(key, changes)
+
+    # Differences per affected calendar. An empty changeset has the same effect as none.
+    diff = {key: diff_changesets(changes_prev[key], changes) for key, changes in delta.items()}
+    diff = {key: d for key, d in diff.items() if d}
+
+    # Refresh all affected calendars in cache as a single new version, unless not yet initialized. Changesets may exist
+    # for exchanges that are not served.
+    if cache is not None:
+        mics = sorted(key for key in delta.keys() if key in cache.mics)
+
+        if mics:
+            cache.refresh(*mics)
+
+        # Notify subscribers, maybe.
+        feed = Context().feed
+        if feed is not None and mics:
+            feed.publish(
+                ChangeEvent(
+                    version=f"{cache.token}-{cache.version}",
+                    mics=mics,
+                    ranges={key: get_ranges(diff[key].dates()) if key in diff else [] for key in mics},
+                )
+            )
+
+    return diff
+
+
+def is_changes_file(path: str) -> bool:
+    """Return whether the given path has the file extension of a changeset file."""
+    return os.path.splitext(path)[1].lower() in _parsers
+
+
+def load_changes_file(path: str) -> ChangeSetDict:
+    """
+    Load a changeset file.
+
+    :param path: the path to the file, in JSON or YAML format, containing a mapping from MICs to changesets
+    :return: the changesets, by MIC
+    """
+    with open(path, encoding="utf-8") as f:
+        data = _parsers[os.path.splitext(path)[1].lower()](f.read())
+
+    return ChangeSetDict.model_validate(data or {})
@@ -0,0 +1,228 @@
+import datetime as dt
+import gzip
+from collections.abc import Callable, Iterable, Mapping
+
+from cachetools import LRUCache, cached
+from starlette.concurrency import run_in_threadpool
+
+from .etag import is_cacheable
+
+# brotli and zstandard are optional dependencies. Without them, responses are only compressed with gzip.
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+# Compressors per content coding, with a fast level for responses compressed once and a strong level for responses that
+# are cached. In order of preference if a client accepts multiple codings equally.
+_compressors: dict[str, Callable[[bytes, bool], bytes]] = {}
+
+if brotli is not None:
+    _compressors["br"] = lambda data, strong: brotli.compress(data, quality=9 if strong else 4)
+
+if zstandard is not None:
+    _compressors["zstd"] = lambda data, strong: zstandard.ZstdCompressor(level=12 if strong else 3).compress(data)
+
+_compressors["gzip"] = lambda data, strong: gzip.compress(data, compresslevel=9 if strong else 6, mtime=0)
+
+# Media types of responses to compress. Others, e.g. Parquet files, are either already compressed or streamed.
+_compressible = (b"application/json", b"text/")
+
+
+@cached(LRUCache(maxsize=64))
+def negotiate(accept_encoding: str) -> str | None:
+    """
+    Select the content coding for a response from an Accept-Encoding header.
+
+    :param accept_encoding: the value of the Accept-Encoding header
+    :return: the supported coding with the highest quality value, or None to not compress the response
+    """
+    q = {}
+
+    for item in accept_encoding.split(","):
+        coding, *params = (x.strip() for x in item.split(";"))
+        weight = 1.0
+        for p in params:
+            name, _, value = p.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        q[coding.lower()] = weight
+
+    best, best_q = None, 0.0
+
+    for coding in _compressors.keys():
+        weight = q.get(coding, q.get("*", 0.0))
+        if weight > best_q:
+            best, best_q = coding, weight
+
+    return best
+
+
+class _Response:
+    # A complete response, with the body in a given content coding.
+
+    def __init__(self, status: int, headers: list[tuple[bytes, bytes]], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def __len__(self) -> int:
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers)
+
+
+def _is_compressible(response: _Response) -> bool:
+    # Whether the media type of a response should be compressed, and it has not been encoded already.
+    content_type = next((v for k, v in response.headers if k == b"content-type"), b"")
+    return content_type.startswith(_compressible) and not any(k == b"content-encoding" for k, _ in response.headers)
+
+
+class CompressionMiddleware:
+    """ASGI middleware that compresses responses with gzip, brotli, or zstd, as negotiated with the client.
+
+    Responses to GET requests that only depend on the request and the state of the exchange calendars, and that have a
+    compressible media type, are stored in a cache, both uncompressed and in each content coding requested so far. A
+    cache hit neither runs the endpoint, nor serializes, nor compresses anything. Since the cache key includes the
+    version of the calendars, cached responses become unreachable as soon as any calendar changes and are eventually
+    evicted. Responses smaller than a threshold are never compressed. Streaming responses are passed through
+    unchanged."""
+
+    def __init__(
+        self,
+        app,
+        get_version: Callable[[], str],
+        prefix: str = "/v1/",
+        volatile: Mapping[str, str] | None = None,
+        exclude: Iterable[str] | None = None,
+        min_size: int = 1024,
+        cache_size: int = 64 * 1024 * 1024,
+    ):
+        """
+        :param app: the ASGI app to wrap
+        :param get_version: callable that returns the current version of the exchange calendars
+        :param prefix: the path prefix of the requests to handle
+        :param volatile: maps paths of endpoints that default to the current time to the name of the respective query
+            parameter
+        :param exclude: the paths of endpoints to never compress or cache
+        :param min_size: the minimum size of a response body to compress, in bytes
+        :param cache_size: the maximum total size of cached responses, in bytes, or 0 to disable the cache
+        """
+        self.app = app
+        self.get_version = get_version
+        self.prefix = prefix
+        self.volatile = dict(volatile or {})
+        self.exclude = frozenset(exclude or ())
+        self.min_size = min_size
+        self.cache: LRUCache | None = LRUCache(maxsize=cache_size, getsizeof=len) if cache_size > 0 else None
+
+    async def _encode(self, response: _Response, coding: str | None, strong: bool) -> _Response:
+        # Return the response in the given content coding, or unchanged if it should not be compressed. Compresses in a
+        # worker thread so that large responses do not block the event loop.
+        if not _is_compressible(response) or len(response.body) < self.min_size:
+            return response
+
+        # The response is compressed for clients that accept it, so it varies with the Accept-Encoding header, even if
+        # it is not compressed for this client.
+        headers = [(k, v) for k, v in response.headers if k != b"vary"] + [(b"vary", b"accept-encoding")]
+
+        if coding is None:
+            return _Response(response.status, headers, response.body)
+
+        body = await run_in_threadpool(_compressors[coding], response.body, strong)
+
+        headers = [(k, v) for k, v in headers if k != b"content-length"]
+        headers += [
+            (b"content-encoding", coding.encode("latin-1")),
+            (b"content-length", str(len(body)).encode("latin-1")),
+        ]
+
+        return _Response(response.status, headers, body)
+
+    def _store(self, key, response: _Response) -> None:
+        # Cache the response, unless it is larger than the entire cache, which the cache would reject.
+        if len(response) <= self.cache.maxsize:
+            self.cache[key] = response
+
+    async def _run(self, scope, receive, send) -> _Response | None:
+        # Run the app and return the complete response, or None if it has been streamed to the client already.
+        start = None
+        response = None
+
+        async def send_or_buffer(message):
+            nonlocal start, response
+
+            if start is False:
+                # Streaming, pass through.
+                await send(message)
+            elif message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                response = _Response(start["status"], list(start.get("headers", [])), message.get("body", b""))
+            else:
+                # Streaming response, or the like. Send everything as is from here on.
+                await send(start)
+                start = False
+                await send(message)
+
+        await self.app(scope, receive, send_or_buffer)
+
+        return response
+
+    @staticmethod
+    async def _send(send, response: _Response) -> None:
+        await send({"type": "http.response.start", "status": response.status, "headers": response.headers})
+        await send({"type": "http.response.body", "body": response.body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix) or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = next((v for k, v in scope["headers"] if k == b"accept-encoding"), None)
+        coding = negotiate(accept_encoding.decode("latin-1")) if accept_encoding is not None else None
+
+        if (
+            self.cache is None
+            or scope["method"] != "GET"
+            or not is_cacheable(scope, self.prefix, self.volatile, self.exclude)
+        ):
+            # Compress on the fly, maybe.
+            response = await self._run(scope, receive, send)
+            if response is not None:
+                await self._send(send, await self._encode(response, coding, strong=False))
+            return
+
+        key = (scope["path"], scope.get("query_string", b""), self.get_version(), dt.date.today())
+
+        # Serve from cache, maybe in the requested coding.
+        response = self.cache.get((key, coding))
+
+        if response is None:
+            response = self.cache.get((key, None))
+
+            if response is None:
+                response = await self._run(scope, receive, send)
+                if response is None:
+                    return
+                if response.status != 200 or not _is_compressible(response):
+                    # Only cache responses that can be compressed, not e.g. Parquet files.
+                    await self._send(send, response)
+                    return
+                response = await self._encode(response, None, strong=True)
+                self._store((key, None), response)
+
+            if coding is not None:
+                encoded = await self._encode(response, coding, strong=True)
+                if encoded is not response:
+                    self._store((key, coding), encoded)
+                response = encoded
+
+        await self._send(send, response)
@@ -1,3 +1,5 @@
+import datetime as dt
+
 # Maps time zones names of the form Continent/City to standardised short names. For example, instead of using a
 # different names like Europe/Madrid and Europe/Berlin, we prefer to use CET in both cases.
 standardised_tz_names = {
@@ -26,3 +28,12 @@ standardised_tz_names = {
     "America/New_York": "ET",
     "America/Toronto": "ET",
 }
+
+# The range of years supported by the service. Queries outside of this range are rejected and precomputed indexes only
+# cover the years in between.
+min_year = dt.date.today().year - 30
+
+max_year = dt.date.today().year + 30
+
+# The tag that marks days in changeset meta as bad dates. Bad dates can optionally be skipped in query results.
+bad_date_tag = "bad date"
@@ -1,4 +1,6 @@
 from .cache import ExchangeCalendarCache
+from .engine import QueryEngine
+from .feed import ChangeFeed
 from dataclasses import dataclass
 
 
@@ -18,3 +20,9 @@ class Context(metaclass=Singleton):
 
     # The cache for exchange calendars.
     cache: ExchangeCalendarCache = None
+
+    # The query engine over the cache.
+    engine: QueryEngine = None
+
+    # The feed of change notifications.
+    feed: ChangeFeed = None
@@ -0,0 +1,777 @@
+import datetime as dt
+import itertools
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+from cachetools import cached, keys, LFUCache, LRUCache
+from exchange_calendars_extensions.api.changes import DayMeta
+from zoneinfo import ZoneInfo
+
+from .cache import ExchangeCalendarCache, ExchangeCalendarSnapshot
+from .constants import standardised_tz_names, min_year, max_year
+from .index import CalendarIndex, Sessions, SpecialDays, combine_business_days
+from .model import (
+    DayClassification,
+    DayClassificationMap,
+    DayClassificationWithMics,
+    DayTypeBusinessRegular,
+    DayTypeNonBusinessRegular,
+    SpecialOpenCloseDayClassification,
+    StandardDayClassification,
+    business_day_types2,
+    combine,
+    day_types,
+    localize_time,
+    parse_timezone,
+    regular_day_type,
+    resolve_timezone,
+    special_day_types,
+    special_day_types2,
+)
+
+
+def to_days(days: Iterable[dt.date] | np.ndarray) -> np.ndarray:
+    """Convert days to an array of datetime64[D] values."""
+    return np.asarray(days if isinstance(days, np.ndarray) else list(days), dtype="datetime64[D]")
+
+
+def to_instants(instants: Iterable[dt.datetime] | np.ndarray) -> np.ndarray:
+    """Convert instants to an array of timezone-naive datetime64[ns] values in UTC. Naive datetimes are interpreted as
+    UTC."""
+    instants = instants if isinstance(instants, np.ndarray) else list(instants)
+    return pd.to_datetime(instants, utc=True).tz_localize(None).values.astype("datetime64[ns]")
+
+
+class QueryEngine:
+    """In-process query engine over a cache of exchange calendars.
+
+    Offers the same operations as the HTTP API, with results as pydantic models, as well as batch operations that take
+    and return NumPy arrays or plain tuples. The HTTP API is a thin layer over this class, but it can also be used
+    directly, e.g. from batch jobs, to avoid the overhead of HTTP and JSON. The calendars must be set up, e.g. by
+    calling exchange_calendars_extensions.core.apply_extensions(), before the cache is created.
+
+    Results are cached per instance and invalidated whenever a calendar in the underlying cache is refreshed. Dates and
+    instants must be within the years covered by the calendar indices."""
+
+    def __init__(self, cache: ExchangeCalendarCache | ExchangeCalendarSnapshot):
+        """
+        :param cache: the cache of exchange calendars to query, or a snapshot of a previous version
+        """
+        self.cache = cache
+
+        # The MICs in the cache, sorted.
+        self.mics = tuple(sorted(cache.mics))
+        self._all_mics = frozenset(self.mics)
+
+        # The version of the cache that the cached results below were last cleared for.
+        self._version = cache.version
+
+        # Guards access to the caches below.
+        self._lock = threading.Lock()
+
+        # Set up caching. Allow for two times the number of MICs where results are per MIC. The cache keys include the
+        # version of the cache, so that results computed while a calendar is refreshed are never returned afterwards.
+        n = len(self.mics)
+        self._special_days = cached(LFUCache(maxsize=2 * n), key=self._key, lock=self._lock)(self._special_days)
+        self._special_days_by_date = cached(LFUCache(maxsize=2 * n), key=self._key, lock=self._lock)(
+            self._special_days_by_date
+        )
+        self._grouped_classifications_by_date = cached(LFUCache(maxsize=4), key=self._key, lock=self._lock)(
+            self._grouped_classifications_by_date
+        )
+        self._mics_by_weekday = cached(LFUCache(maxsize=1), key=self._key, lock=self._lock)(self._mics_by_weekday)
+        self._classify_day = cached(LFUCache(maxsize=50), key=self._key, lock=self._lock)(self._classify_day)
+        self._next_days = cached(LFUCache(maxsize=20), key=self._key, lock=self._lock)(self._next_days)
+        self._timezone = cached(LFUCache(maxsize=2 * (n + 1)), key=self._key, lock=self._lock)(self._timezone)
+        self._canonical_tz = cached(LFUCache(maxsize=4 * (n + 1)), key=self._key, lock=self._lock)(self._canonical_tz)
+
+        # Engines for previous versions of the calendars, by version.
+        self._engines: LRUCache = LRUCache(maxsize=4)
+
+    def _key(self, *args, **kwargs) -> tuple:
+        # Cache key for a result computed from the current version of the cache. Read before the result is computed, so
+        # a result that is computed while a calendar is refreshed is stored under the previous version.
+        return keys.hashkey(self.cache.version, *args, **kwargs)
+
+    def _check_version(self) -> None:
+        # Drop all cached results for previous versions once any calendar has been refreshed. They can no longer be
+        # looked up, but would otherwise take up space until evicted.
+        version = self.cache.version
+        if version != self._version:
+            for f in (
+                self._special_days,
+                self._special_days_by_date,
+                self._grouped_classifications_by_date,
+                self._mics_by_weekday,
+                self._classify_day,
+                self._next_days,
+                self._timezone,
+                self._canonical_tz,
+            ):
+                f.cache_clear()
+            self._version = version
+
+    def as_of(self, version: int | None = None, time: dt.datetime | None = None) -> "QueryEngine":
+        """
+        Return an engine for the calendars as of a given version or point in time.
+
+        Engines for previous versions are cached. Their results never need to be invalidated since snapshots do not
+        change.
+
+        :param version: the version, or None for the current version
+        :param time: the point in time, used if no version is given, or None for the current version. Naive datetimes
+            are interpreted as UTC.
+        :return: this engine for the current version, otherwise an engine for the snapshot of the version
+        :raises ValueError: if the version does not exist yet
+        :raises LookupError: if the version is no longer retained
+        """
+        snapshot = self.cache.as_of(version, time)
+        if snapshot is self.cache:
+            return self
+
+        with self._lock:
+            engine = self._engines.get(snapshot.version)
+            if engine is None or engine.cache is not snapshot:
+                engine = self._engines[snapshot.version] = QueryEngine(snapshot)
+        return engine
+
+    def timezone(self, mic: str, standardise: bool = True) -> str:
+        """
+        Return the time zone name for a MIC.
+
+        :param mic: the MIC
+        :param standardise: whether to map the time zone to a standardised name, e.g. Europe/Berlin to CET
+        :return: the time zone name
+        """
+        self._check_version()
+        return self._timezone(mic, standardise)
+
+    def _timezone(self, mic: str, standardise: bool) -> str:
+        # get timezone for mic in Continent/City format, e.g. Europe/Berlin
+        tz = self.cache.get(mic).tz
+        if standardise:
+            # map Continent/City tz to standard tz names, e.g. Europe/Berlin --> CET (not CEST)
+            name = standardised_tz_names.get(str(tz), None)
+            if name is not None:
+                tz = name
+        return str(tz)
+
+    def parse_timezone(self, tz: str | ZoneInfo | None, mic: str | None = None) -> ZoneInfo:
+        """
+        Resolve a time zone name.
+
+        :param tz: the time zone name
+        :param mic: the optional MIC whose time zone to default to if tz is not given, defaults to UTC otherwise
+        :return: the time zone
+        """
+        return parse_timezone(tz, self.cache.get(mic).tz if mic else None)
+
+    # Queries are canonicalized before any cache lookup so that equivalent queries share cached results, e.g. an
+    # omitted time zone and the native time zone of an exchange given explicitly, or an omitted MIC filter and one that
+    # lists all MICs.
+
+    def _canonical_tz(self, tz: str | ZoneInfo | None, mic: str | None) -> str | None:
+        # Resolve a time zone to its key. Without a MIC, an omitted or unresolvable time zone is kept as None, meaning
+        # the native time zone of each exchange.
+        z = resolve_timezone(tz)
+        if z is None and mic is not None:
+            z = parse_timezone(None, self.cache.get(mic).tz)
+        return z.key if z is not None else None
+
+    def _canonical_mics(self, mics: Iterable[str] | None) -> frozenset | None:
+        # An omitted MIC filter and one that lists all MICs are equivalent.
+        mics = frozenset(mics) if mics is not None else self._all_mics
+        return mics if mics != self._all_mics else None
+
+    def _canonical_next_days_query(
+        self, mics: Iterable[str] | None, tz: str | None
+    ) -> tuple[frozenset | None, str | None]:
+        # With a single MIC, an omitted time zone is the native time zone of that exchange.
+        mics = self._canonical_mics(mics)
+        return mics, self._canonical_tz(tz, next(iter(mics)) if mics is not None and len(mics) == 1 else None)
+
+    def special_days(self, mic: str, year: int | None = None, tz: str | None = None) -> list[DayClassification]:
+        """
+        Return the special days for a given MIC and year.
+
+        Special days include regular holidays where the exchange is closed, special opens/closes where the trading hours
+        deviate from the regular schedule, and witching days which have regular trading hours but typically see
+        increased trading activity owing to options/futures expiry. Weekdays that are never regular trading days
+        (typically Saturdays and Sundays) are never returned as special days.
+
+        :param mic: the MIC to return the special days for
+        :param year: the optional year to return special days for, defaults to the current year
+        :param tz: the optional time zone to return special open/close times in, defaults to the native time zone of the
+            exchange
+        :return: the special days, sorted by date
+        """
+        self._check_version()
+
+        # To correctly handle the case where the year is omitted, need to get the year to use here every time rather
+        # than use a default argument. Otherwise, the wrong year would be used if the process rolls over to a new
+        # calendar year.
+        return self._special_days(mic, year if year is not None else dt.date.today().year, self._canonical_tz(tz, mic))
+
+    def _special_days(self, mic: str, year: int, tz: str | None) -> list[DayClassification]:
+        # Get exchange calendar for MIC.
+        c = self.cache.get(mic)
+
+        # If time zone name is given, convert to tzinfo. Otherwise, use calendar's time zone.
+        tz: ZoneInfo = parse_timezone(tz, c.tz)
+
+        # tz as str
+        tz_str = str(tz)
+
+        # Special days for the year.
+        start, end = dt.date(year, 1, 1), dt.date(year, 12, 31)
+        special_days = self._index(mic, start, end).special_days.between(start, end)
+
+        # The columns are already typed and consistent, so construct results without validation.
+        days = []
+
+        for date, type_, is_business_day, name, time in zip(*(x.tolist() for x in special_days)):
+            if time is None:
+                days.append(
+                    StandardDayClassification.model_construct(
+                        date=date, type=day_types[type_], is_business_day=is_business_day, name=name
+                    )
+                )
+            else:
+                days.append(
+                    SpecialOpenCloseDayClassification.model_construct(
+                        date=date,
+                        type=day_types[type_],
+                        is_business_day=is_business_day,
+                        name=name,
+                        time=localize_time(date, time, c.tz, tz),
+                        tz=tz_str,
+                    )
+                )
+
+        return days
+
+    def classify_day(
+        self, day: dt.date, mic: str | None = None, tz: str | None = None
+    ) -> DayClassification | list[DayClassificationWithMics]:
+        """
+        Return the classification of a given day for a single MIC or all MICs combined.
+
+        :param day: the day to classify
+        :param mic: the optional single MIC to classify the day for, defaults to all MICs
+        :param tz: the optional name of the time zone to return special open/close times in
+        :return: the classification for a single MIC, or the distinct classifications and the MICs they apply to
+        """
+        self._check_version()
+        return self._classify_day(day, mic, self._canonical_tz(tz, mic))
+
+    def _classify_day(
+        self, day: dt.date, mic: str | None, tz: str | None
+    ) -> DayClassification | list[DayClassificationWithMics]:
+        if mic is not None:
+            # Classify for the single MIC.
+            return self._classify_day0(day, mic, tz)
+        else:
+            # Classify for all MICs.
+            grouped = self._grouped_classifications_by_date(day.year, tz)
+
+            # Check for a day that is special for at least one MIC.
+            r = grouped.get(day)
+
+            if r is None:
+                # Regular business day or weekend day for all MICs.
+                r = [
+                    combine(self._classify_day0(day, mics[0], tz), list(mics))
+                    for mics in self._mics_by_weekday()[day.weekday()]
+                ]
+
+            return r
+
+    def _classify_day0(self, day: dt.date, mic: str, tz: str | None) -> DayClassification:
+        # Check for special day.
+        d = self._special_days_by_date(mic, day.year, self._canonical_tz(tz, mic)).get(day)
+
+        if d is not None:
+            return d
+
+        # Check for weekend.
+        if self.cache.get(mic).weekmask[day.weekday()] == "0":
+            return StandardDayClassification.model_construct(
+                date=day,
+                type=DayTypeNonBusinessRegular.WEEKEND,
+                is_business_day=False,
+                name=None,
+            )
+
+        # If we get here, must be a regular trading day.
+        return StandardDayClassification.model_construct(
+            date=day, type=DayTypeBusinessRegular.REGULAR, is_business_day=True, name=None
+        )
+
+    def _special_days_by_date(self, mic: str, year: int, tz: str | None) -> dict[dt.date, DayClassification]:
+        # Index the special days for a given MIC and year by date. If there are multiple entries for the same day, the
+        # first one takes precedence, like in exchange_calendars.
+        result = {}
+        for d in self._special_days(mic, year, tz):
+            result.setdefault(d.date, d)
+        return result
+
+    def _grouped_classifications_by_date(
+        self, year: int, tz: str | None
+    ) -> dict[dt.date, list[DayClassificationWithMics]]:
+        # Precompute the classifications for all MICs, grouped by classification, for each day in the given year that
+        # is a special day for at least one MIC.
+        days = sorted(
+            set(
+                itertools.chain.from_iterable(
+                    self._special_days_by_date(m, year, self._canonical_tz(tz, m)).keys() for m in self.mics
+                )
+            )
+        )
+
+        result = {}
+
+        for day in days:
+            # Dictionary to map classifications to the corresponding list of MICs they apply to. The same day, e.g.,
+            # 2020-12-24, may be classified as a special close day at different exchanges, but with different actual
+            # closing times. These classifications should be treated as distinct.
+            r: dict[DayClassification, list[str]] = {}
+
+            for m in self.mics:
+                r.setdefault(self._classify_day0(day, m, tz), []).append(m)
+
+            result[day] = [combine(c, v) for c, v in r.items()]
+
+        return result
+
+    def _mics_by_weekday(self) -> tuple[tuple[tuple[str, ...], ...], ...]:
+        # Group all MICs by whether they are open on each day of the week. For each day of the week, returns a tuple of
+        # non-empty groups of MICs that are open or closed, respectively.
+        result = []
+
+        for weekday in range(7):
+            r: dict[bool, list[str]] = {}
+
+            for m in self.mics:
+                r.setdefault(self.cache.get(m).weekmask[weekday] == "1", []).append(m)
+
+            result.append(tuple(tuple(v) for v in r.values()))
+
+        return tuple(result)
+
+    def next_special_days(
+        self,
+        day: dt.date,
+        inclusive: bool = True,
+        forward: bool = True,
+        mics: Iterable[str] | None = None,
+        types: Iterable[str] | None = None,
+        n: int = 1,
+        range: int | None = None,
+        tz: str | None = None,
+        skip_bad_dates: bool = False,
+    ) -> tuple[list[DayClassificationMap], bool]:
+        """
+        Return the next or previous special days relative to a given day.
+
+        :param day: the day to start from
+        :param inclusive: whether to include the given day itself
+        :param forward: whether to look forward or backward in time
+        :param mics: the optional MICs to include, defaults to all
+        :param types: the optional day types to include, defaults to all special day types
+        :param n: the number of distinct days to return
+        :param range: the optional maximum distance from the given day, in days
+        :param tz: the optional name of the time zone to return special open/close times in
+        :param skip_bad_dates: whether to skip days that are tagged as bad dates
+        :return: the days sorted by increasing distance from the given day, and whether the search completed within the
+            supported years
+        """
+        self._check_version()
+        return self._next_days(
+            day,
+            inclusive,
+            forward,
+            *self._canonical_next_days_query(mics, tz),
+            frozenset(types) if types is not None else special_day_types2,
+            n,
+            range,
+            skip_bad_dates,
+        )
+
+    def next_business_days(
+        self,
+        day: dt.date,
+        inclusive: bool = True,
+        forward: bool = True,
+        mics: Iterable[str] | None = None,
+        types: Iterable[str] | None = None,
+        n: int = 1,
+        range: int | None = None,
+        tz: str | None = None,
+        skip_bad_dates: bool = False,
+    ) -> tuple[list[DayClassificationMap], bool]:
+        """
+        Return the next or previous business days relative to a given day. Business days include special days on which
+        an exchange is open, e.g. special close days.
+
+        :param day: the day to start from
+        :param inclusive: whether to include the given day itself
+        :param forward: whether to look forward or backward in time
+        :param mics: the optional MICs to include, defaults to all
+        :param types: the optional day types to include, defaults to all business day types
+        :param n: the number of distinct days to return
+        :param range: the optional maximum distance from the given day, in days
+        :param tz: the optional name of the time zone to return special open/close times in
+        :param skip_bad_dates: whether to skip days that are tagged as bad dates
+        :return: the days sorted by increasing distance from the given day, and whether the search completed within the
+            supported years
+        """
+        self._check_version()
+        return self._next_days(
+            day,
+            inclusive,
+            forward,
+            *self._canonical_next_days_query(mics, tz),
+            frozenset(types) if types is not None else business_day_types2,
+            n,
+            range,
+            skip_bad_dates,
+        )
+
+    def _next_days(
+        self,
+        day: dt.date,
+        inclusive: bool,
+        forward: bool,
+        mic: frozenset | None,
+        tz: str | None,
+        types: frozenset | None,
+        n: int,
+        range: int | None,
+        skip_bad_dates: bool,
+    ) -> tuple[list[DayClassificationMap], bool]:
+        result = dict()
+        mics = sorted(mic) if mic is not None else self.mics
+        valid_types = types if types is not None else special_day_types
+        year = day.year
+        needed = n
+        range_threshold = (
+            (dt.datetime.combine(date=day, time=dt.time.min) + dt.timedelta(days=(1 if forward else -1) * range)).date()
+            if range is not None
+            else None
+        )
+        complete = True
+        # TODO: Catch situation where type isn't available, e.g. special close on XAMS.
+
+        while needed > 0:
+            # Build up a dictionary with dates as key to group together common dates. Each value is a dictionary that
+            # maps day classifications to the list of MICs it applies to. This is because the same day may be a
+            # different type of special day across the various exchanges.
+            special_days = dict()
+
+            for m in mics:
+                # Get all special days for MIC for current year.
+                special_days_for_mic: list[DayClassification] = self._special_days(m, year, self._canonical_tz(tz, m))
+
+                # Filter special days for specified types, e.g. business days only (see valid_types variable)
+                relevant_special_days_for_mic = [x for x in special_days_for_mic if x.type in valid_types]
+
+                # If year is the same as that of day, then if forward is true (false), filter out all days that are
+                # before (after) day, respecting the inclusive flag as well.
+                if year == day.year:
+
+                    def is_before(x, y):
+                        if forward:
+                            return x < y or (not inclusive and x == y)
+                        else:
+                            return x > y or (not inclusive and x == y)
+
+                    relevant_special_days_for_mic = [
+                        x for x in relevant_special_days_for_mic if not is_before(x.date, day)
+                    ]
+
+                # If regular business days are to be included, get those as well for year. But exclude those that are
+                # also contained in the list of special days (e.g. triple witching days).
+                if regular_day_type in valid_types:
+                    # Determine the period for which to get the regular business days.
+                    if year == day.year and forward:
+                        start = day + dt.timedelta(days=0 if inclusive else 1)
+                    else:
+                        start = dt.date(year, 1, 1)
+
+                    if year == day.year and not forward:
+                        end = day - dt.timedelta(days=0 if inclusive else 1)
+                    else:
+                        end = dt.date(year, 12, 31)
+
+                    # Get business days. This may include special days like e.g. early close days which are already
+                    # included in special_days_for_mic.
+                    business_days_for_mic: list[dt.date] = self.business_days(m, start, end).tolist()
+
+                    # Filter out business days that are already marked as special days.
+                    special_days_for_mic_dates = {x.date for x in special_days_for_mic}
+
+                    business_days_for_mic: list[StandardDayClassification] = [
+                        StandardDayClassification.model_construct(
+                            date=x,
+                            type=DayTypeBusinessRegular.REGULAR,
+                            is_business_day=True,
+                            name=None,
+                        )
+                        for x in business_days_for_mic
+                        if x not in special_days_for_mic_dates
+                    ]
+
+                    # Add regular business days to "special days".
+                    relevant_special_days_for_mic.extend(business_days_for_mic)
+
+                # Remove bad dates, if specified.
+                if skip_bad_dates and relevant_special_days_for_mic:
+                    is_bad = self.cache.index(m).is_bad_date(to_days(x.date for x in relevant_special_days_for_mic))
+                    relevant_special_days_for_mic = list(itertools.compress(relevant_special_days_for_mic, ~is_bad))
+
+                for d in relevant_special_days_for_mic:
+                    # Add the MIC code to the list for the classification on the date.
+                    special_days.setdefault(d.date, dict()).setdefault(d, list()).append(m)
+
+            # Sort dict by date (key)
+            special_days = OrderedDict(sorted(special_days.items(), key=lambda x: x[0], reverse=not forward))
+
+            # Filter out all days that are outside the requested range, maybe.
+            if range_threshold is not None:
+                special_days = OrderedDict(
+                    (k, v)
+                    for k, v in special_days.items()
+                    if (k <= range_threshold if forward else k >= range_threshold)
+                )
+
+            # Only retain number of items still needed, maybe.
+            special_days = OrderedDict(itertools.islice(special_days.items(), min(needed, len(special_days))))
+
+            # Append items to result.
+            result.update(special_days)
+
+            # Update number of items still needed.
+            needed -= len(special_days)
+
+            # Move on to next (previous) year.
+            year += 1 if forward else -1
+
+            # Check that new year is not already outside range, maybe.
+            if range_threshold is not None:
+                # The first day (relative to the search direction) in the new year.
+                first = dt.date(day=1, month=1, year=year) if forward else dt.date(day=31, month=12, year=year)
+                is_outside_range = first > range_threshold if forward else first < range_threshold
+                if is_outside_range:
+                    break
+
+            # Check if we're outside the range of permissible values for year. If not, assume that we can't find any
+            # more relevant special days.
+            if not min_year <= year <= max_year:
+                complete = False
+                break
+
+        result = sorted(
+            [
+                DayClassificationMap.model_construct(date=k, classifications=[combine(c, m) for c, m in v.items()])
+                for k, v in result.items()
+            ],
+            key=lambda x: x.date,
+            reverse=not forward,
+        )
+
+        return result, complete
+
+    def special_days_table(self, mic: str, start: dt.date | None = None, end: dt.date | None = None) -> SpecialDays:
+        """
+        Return the special days for a given MIC as parallel arrays. Special open/close times are in the native time
+        zone of the exchange.
+
+        :param mic: the MIC
+        :param start: the optional first day of the period, defaults to the first day covered
+        :param end: the optional last day of the period, defaults to the last day covered
+        :return: the special days, sorted by date
+        """
+        index = self.cache.index(mic)
+        return index.special_days.between(start or index.start, end or index.end)
+
+    def classify_days(self, mic: str, days: Iterable[dt.date] | np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Classify many days for a given MIC at once.
+
+        :param mic: the MIC
+        :param days: the days to classify
+        :return: the day types as an array of strings, and whether each day is a business day as a boolean array
+        """
+        index = self.cache.index(mic)
+        special_days = index.special_days
+        days = to_days(days)
+
+        # Types for regular days, depending on the weekday. The epoch was a Thursday.
+        weekmask = np.array([x == "1" for x in self.cache.get(mic).weekmask])
+        is_business_day = weekmask[(days.view(np.int64) + 3) % 7]
+        types = np.where(is_business_day, regular_day_type, DayTypeNonBusinessRegular.WEEKEND.value).astype(object)
+
+        # Overwrite with special days. If there are multiple entries for the same day, the first one takes precedence.
+        i = np.searchsorted(special_days.dates, days, side="left")
+        special = i < len(special_days.dates)
+        special[special] = special_days.dates[i[special]] == days[special]
+        types[special] = special_days.types[i[special]]
+        is_business_day[special] = special_days.is_business_day[i[special]]
+
+        return types, is_business_day
+
+    def _index(self, mic: str, start: dt.date, end: dt.date) -> CalendarIndex:
+        # Get precomputed index for the given MIC if it covers the period. Otherwise, compute an index for just the
+        # period, so that the offsets of days into the index stay within bounds.
+        index = self.cache.index(mic)
+        if index.covers(start) and index.covers(end):
+            return index
+        return CalendarIndex(self.cache.get(mic), start, end)
+
+    def is_business_day(self, mic: str, days: Iterable[dt.date] | np.ndarray) -> np.ndarray:
+        """
+        Return whether each of many days is a business day for a given MIC.
+
+        :param mic: the MIC
+        :param days: the days
+        :return: boolean array
+        """
+        days = to_days(days)
+        if not len(days):
+            return np.zeros(0, dtype=bool)
+        index = self._index(mic, days.min().astype(dt.date), days.max().astype(dt.date))
+        offsets = (days - np.datetime64(index.start, "D")).astype(np.int64)
+        return (index.business_days[offsets >> 3] >> (7 - (offsets & 7)) & 1).astype(bool)
+
+    def business_days(self, mic: str, start: dt.date, end: dt.date) -> np.ndarray:
+        """
+        Return the business days of a given MIC in a period.
+
+        :param mic: the MIC
+        :param start: the first day of the period
+        :param end: the last day of the period
+        :return: the business days, as datetime64[D], sorted
+        """
+        if end < start:
+            return np.array([], dtype="datetime64[D]")
+        index = self._index(mic, start, end)
+        first, last = index.offset(start), index.offset(end)
+        bits = np.unpackbits(index.business_days[first // 8 : last // 8 + 1])[first % 8 : first % 8 + last - first + 1]
+        return np.datetime64(start, "D") + np.flatnonzero(bits)
+
+    def combined_business_days(self, mics: Iterable[str], op: str, start: dt.date, end: dt.date) -> list[dt.date]:
+        """
+        Return the days in a period on which all, any, or exactly one of the given MICs are open.
+
+        :param mics: the MICs to combine
+        :param op: one of "all", "any", or "exactly_one"
+        :param start: the first day of the period
+        :param end: the last day of the period
+        :return: the sorted list of days
+        """
+        return combine_business_days([self._index(m, start, end) for m in set(mics)], op, start, end)
+
+    def sessions(self, mic: str, start: dt.date, end: dt.date) -> Sessions:
+        """
+        Return the trading sessions of a given MIC in a period.
+
+        :param mic: the MIC
+        :param start: the first day of the period
+        :param end: the last day of the period
+        :return: the sessions with dates, open and close instants in UTC as parallel arrays
+        """
+        return self.cache.index(mic).sessions.between(start, end)
+
+    def is_open(
+        self, instants: Iterable[dt.datetime] | np.ndarray, mics: Sequence[str] | None = None
+    ) -> tuple[tuple[str, ...], np.ndarray]:
+        """
+        Return which MICs are in session at each of many instants.
+
+        :param instants: the instants, naive datetimes are interpreted as UTC
+        :param mics: the optional MICs to return results for, defaults to all
+        :return: the MICs, and a boolean array of shape (len(instants), len(mics))
+        """
+        instants = to_instants(instants)
+
+        index = self.cache.sessions_index()
+
+        is_open = np.zeros((len(instants), len(index.mics)), dtype=bool)
+
+        # Use the index for instants within its window and fall back to the individual calendars otherwise.
+        covered = index.covers(instants)
+        is_open[covered] = index.is_open(instants[covered])
+
+        if not covered.all():
+            for j, m in enumerate(index.mics):
+                is_open[~covered, j] = self.cache.index(m).is_open(instants[~covered])
+
+        # Restrict to given MICs, maybe.
+        mics = tuple(mics) if mics is not None else index.mics
+        columns = {m: j for j, m in enumerate(index.mics)}
+
+        return mics, is_open[:, [columns[m] for m in mics]]
+
+    def next_open_close(self, mic: str, instants: Iterable[dt.datetime] | np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return the next session open and close strictly after each of many instants for a given MIC.
+
+        :param mic: the MIC
+        :param instants: the instants, naive datetimes are interpreted as UTC
+        :return: the next open and close instants in UTC, as timezone-naive datetime64[ns], NaT if there is none
+        """
+        return self.cache.index(mic).next_open_close(to_instants(instants))
+
+    def trading_minutes(
+        self,
+        mics: Sequence[str],
+        starts: Iterable[dt.datetime] | np.ndarray,
+        ends: Iterable[dt.datetime] | np.ndarray,
+    ) -> np.ndarray:
+        """
+        Return the number of trading minutes between pairs of instants.
+
+        :param mics: the MIC for each pair
+        :param starts: the start instant for each pair, naive datetimes are interpreted as UTC
+        :param ends: the end instant for each pair, naive datetimes are interpreted as UTC
+        :return: the number of trading minutes for each pair, as floats
+        """
+        starts, ends = to_instants(starts), to_instants(ends)
+
+        minutes = np.zeros(len(mics))
+
+        # Group pairs by MIC and calculate in bulk.
+        by_mic: dict[str, list[int]] = {}
+        for i, m in enumerate(mics):
+            by_mic.setdefault(m, []).append(i)
+
+        for m, i in by_mic.items():
+            minutes[i] = self.cache.index(m).session_time_between(starts[i], ends[i]) / np.timedelta64(1, "m")
+
+        return minutes
+
+    def tagged_days(
+        self,
+        tag: str,
+        mics: Iterable[str] | None = None,
+        start: dt.date | None = None,
+        end: dt.date | None = None,
+    ) -> list[tuple[str, dt.date, DayMeta]]:
+        """
+        Return the days that carry a given tag.
+
+        :param tag: the tag
+        :param mics: the optional MICs to restrict the result to, defaults to all
+        :param start: the optional first day of the period
+        :param end: the optional last day of the period
+        :return: the MIC, day, and meta triples, sorted by day and MIC
+        """
+        # The tag index only covers calendars that have been built.
+        mics = tuple(mics) if mics is not None else None
+        for m in mics if mics is not None else self.mics:
+            _ = self.cache.get(m)
+
+        return self.cache.tags.query(tag, mics=mics, start=start, end=end)
@@ -0,0 +1,103 @@
+import datetime as dt
+from collections.abc import Callable, Iterable, Mapping
+from urllib.parse import parse_qs
+
+
+def matches(if_none_match: str, etag: str) -> bool:
+    """
+    Compare an entity tag against the list of entity tags in an If-None-Match header, using weak comparison.
+
+    :param if_none_match: the value of the If-None-Match header
+    :param etag: the entity tag
+    :return: whether the entity tag matches
+    """
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(x.strip().removeprefix("W/") == opaque for x in if_none_match.split(","))
+
+
+def is_cacheable(scope, prefix: str, volatile: Mapping[str, str], exclude: Iterable[str]) -> bool:
+    """
+    Return whether the response to a request only depends on the request and the state of the exchange calendars.
+
+    :param scope: the ASGI scope of the request
+    :param prefix: the path prefix of cacheable requests
+    :param volatile: maps paths of endpoints that default to the current time to the name of the respective query
+        parameter
+    :param exclude: the paths of endpoints that are never cacheable
+    :return: whether the response is cacheable
+    """
+    if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+        return False
+
+    if not scope["path"].startswith(prefix) or scope["path"] in exclude:
+        return False
+
+    param = volatile.get(scope["path"])
+    if param is not None and param not in parse_qs(scope.get("query_string", b"").decode("latin-1")):
+        return False
+
+    return True
+
+
+class ETagMiddleware:
+    """ASGI middleware that adds entity tags to responses to GET requests and answers conditional requests.
+
+    All responses below a path prefix depend only on the request and on the state of the exchange calendars, so a
+    single weak entity tag that changes whenever any calendar changes is sufficient. Since some parameters default to
+    the current day, the tag also includes the current day. Requests that carry a matching If-None-Match header are
+    answered with 304 Not Modified without computing the response at all. Endpoints that default to the current time
+    are only tagged if the respective parameter is given explicitly. Streaming endpoints can be excluded altogether."""
+
+    def __init__(
+        self,
+        app,
+        get_version: Callable[[], str],
+        prefix: str = "/v1/",
+        volatile: Mapping[str, str] | None = None,
+        exclude: Iterable[str] | None = None,
+    ):
+        """
+        :param app: the ASGI app to wrap
+        :param get_version: callable that returns the current version of the exchange calendars
+        :param prefix: the path prefix of the requests to handle
+        :param volatile: maps paths of endpoints that default to the current time to the name of the respective query
+            parameter
+        :param exclude: the paths of endpoints to never tag
+        """
+        self.app = app
+        self.get_version = get_version
+        self.prefix = prefix
+        self.volatile = dict(volatile or {})
+        self.exclude = frozenset(exclude or ())
+
+    def _etag(self, scope) -> str | None:
+        # Return the entity tag for the request, or None if the response must not be tagged.
+        if not is_cacheable(scope, self.prefix, self.volatile, self.exclude):
+            return None
+
+        return f'W/"{self.get_version()}-{dt.date.today().isoformat()}"'
+
+    async def __call__(self, scope, receive, send):
+        etag = self._etag(scope)
+
+        if etag is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = [(b"etag", etag.encode("latin-1")), (b"cache-control", b"no-cache")]
+
+        # Answer conditional request right away, maybe.
+        if_none_match = next((v for k, v in scope["headers"] if k == b"if-none-match"), None)
+        if if_none_match is not None and matches(if_none_match.decode("latin-1"), etag):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                message = {**message, "headers": [*message.get("headers", []), *headers]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
@@ -0,0 +1,196 @@
+import enum
+import io
+from collections.abc import Iterable, Iterator, Mapping
+from enum import Enum
+
+import numpy as np
+
+from .index import CalendarIndex
+
+# pyarrow is an optional dependency, only needed for the bulk export in Arrow and Parquet formats.
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+    pq = None
+
+
+@enum.unique
+class Table(str, Enum):
+    """The tables that can be exported."""
+
+    SPECIAL_DAYS = "special_days"
+    BUSINESS_DAYS = "business_days"
+    SESSIONS = "sessions"
+
+
+def is_available() -> bool:
+    """Return whether the export in Arrow and Parquet formats is available."""
+    return pa is not None
+
+
+def get_schema(table: Table = Table.SPECIAL_DAYS) -> "pa.Schema":
+    """
+    Return the Arrow schema of the given table.
+
+    :param table: the table
+    :return: the schema
+    """
+    if table == Table.SPECIAL_DAYS:
+        return pa.schema(
+            [
+                ("date", pa.date32()),
+                ("mic", pa.string()),
+                ("type", pa.string()),
+                ("is_business_day", pa.bool_()),
+                ("name", pa.string()),
+                ("time", pa.time64("us")),
+                ("tz", pa.string()),
+            ]
+        )
+    elif table == Table.BUSINESS_DAYS:
+        return pa.schema([("date", pa.date32()), ("mic", pa.string())])
+    else:
+        return pa.schema(
+            [
+                ("date", pa.date32()),
+                ("mic", pa.string()),
+                ("open", pa.timestamp("ns", tz="UTC")),
+                ("close", pa.timestamp("ns", tz="UTC")),
+            ]
+        )
+
+
+def _years_mask(dates: np.ndarray, years: np.ndarray | None) -> np.ndarray:
+    # Mask for the given dates that fall into any of the given years.
+    if years is None:
+        return np.ones(len(dates), dtype=bool)
+    return np.isin(dates.astype("datetime64[Y]").astype(np.int64) + 1970, years)
+
+
+def get_columns(
+    table: Table,
+    mic: str,
+    index: CalendarIndex,
+    types: Iterable[str] | None = None,
+    years: Iterable[int] | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    Return the rows of a table for a single calendar, as parallel arrays.
+
+    Dates are datetime64[D], instants are timezone-naive datetime64[ns] in UTC, times are dt.time objects or None in the
+    time zone of the exchange, and strings are object arrays.
+
+    :param table: the table
+    :param mic: the MIC of the calendar
+    :param index: the index of the calendar
+    :param types: the optional day types to restrict special days to, defaults to all
+    :param years: the optional years to restrict the result to, defaults to all years in the index
+    :return: the arrays, by column name, in the order of the table's schema
+    """
+    years = np.array(sorted(years)) if years is not None else None
+
+    if table == Table.SPECIAL_DAYS:
+        special_days = index.special_days
+
+        mask = _years_mask(special_days.dates, years)
+        if types is not None:
+            mask &= np.isin(special_days.types, np.array(sorted(types), dtype=object))
+
+        special_days = special_days.filter(mask)
+
+        return {
+            "date": special_days.dates,
+            "mic": np.full(len(special_days), mic, dtype=object),
+            "type": special_days.types,
+            "is_business_day": special_days.is_business_day,
+            "name": special_days.names,
+            "time": special_days.times,
+            "tz": np.full(len(special_days), str(index.calendar.tz), dtype=object),
+        }
+    elif table == Table.BUSINESS_DAYS:
+        dates = np.datetime64(index.start, "D") + np.flatnonzero(np.unpackbits(index.business_days)[: len(index)])
+        dates = dates[_years_mask(dates, years)]
+
+        return {"date": dates, "mic": np.full(len(dates), mic, dtype=object)}
+    else:
+        sessions = index.sessions
+        mask = _years_mask(sessions.dates, years)
+
+        return {
+            "date": sessions.dates[mask],
+            "mic": np.full(np.count_nonzero(mask), mic, dtype=object),
+            "open": sessions.opens[mask],
+            "close": sessions.closes[mask],
+        }
+
+
+def to_record_batch(table: Table, columns: Mapping[str, np.ndarray]) -> "pa.RecordBatch":
+    """
+    Convert the arrays returned by get_columns() into a record batch.
+
+    :param table: the table
+    :param columns: the arrays, by column name
+    :return: the record batch
+    """
+    schema = get_schema(table)
+    return pa.RecordBatch.from_arrays([pa.array(columns[f.name], type=f.type) for f in schema], schema=schema)
+
+
+def iter_special_days_batches(
+    indices: Mapping[str, CalendarIndex],
+    types: Iterable[str] | None = None,
+    years: Iterable[int] | None = None,
+) -> Iterator["pa.RecordBatch"]:
+    """
+    Return the special days of multiple calendars as record batches, one per MIC.
+
+    :param indices: the calendar indices, by MIC
+    :param types: the optional day types to restrict the result to, defaults to all
+    :param years: the optional years to restrict the result to, defaults to all years in the indices
+    :return: iterator over record batches with the schema returned by get_schema()
+    """
+    for mic, index in indices.items():
+        yield to_record_batch(Table.SPECIAL_DAYS, get_columns(Table.SPECIAL_DAYS, mic, index, types, years))
+
+
+def iter_arrow_stream(batches: Iterable["pa.RecordBatch"], table: Table = Table.SPECIAL_DAYS) -> Iterator[bytes]:
+    """
+    Serialize record batches into the Arrow IPC streaming format, yielding the bytes for each batch as it is written.
+
+    :param batches: the record batches to serialize
+    :param table: the table the record batches belong to
+    :return: iterator over chunks of bytes that form the stream
+    """
+    sink = io.BytesIO()
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    with pa.ipc.new_stream(sink, get_schema(table)) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            yield drain()
+
+    yield drain()
+
+
+def to_parquet(batches: Iterable["pa.RecordBatch"], table: Table = Table.SPECIAL_DAYS) -> bytes:
+    """
+    Serialize record batches into a Parquet file, with one row group per batch.
+
+    :param batches: the record batches to serialize
+    :param table: the table the record batches belong to
+    :return: the contents of the Parquet file
+    """
+    sink = io.BytesIO()
+
+    with pq.ParquetWriter(sink, get_schema(table)) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+
+    return sink.getvalue()
@@ -0,0 +1,184 @@
+import asyncio
+import datetime as dt
+import threading
+import uuid
+from collections import deque
+from collections.abc import AsyncIterator, Iterable
+
+from pydantic import BaseModel
+
+
+class DateRange(BaseModel):
+    """An inclusive range of dates."""
+
+    start: dt.date
+    end: dt.date
+
+
+class ChangeEvent(BaseModel):
+    """Notification about an update of one or more exchange calendars."""
+
+    # The version of the exchange calendars after the update, as used in entity tags.
+    version: str
+
+    # The MICs of the affected exchange calendars.
+    mics: list[str]
+
+    # The affected date ranges, per MIC.
+    ranges: dict[str, list[DateRange]]
+
+
+def get_ranges(dates: Iterable[dt.date]) -> list[DateRange]:
+    """
+    Return the ranges of dates affected by changes to the given dates.
+
+    A changed holiday or special open or close may shift other special days within the same month, e.g. monthly or
+    quarterly expiry days, so each date is expanded to its whole month and adjacent months are merged.
+
+    :param dates: the changed dates
+    :return: the sorted, non-overlapping ranges
+    """
+    ranges = []
+
+    for month in sorted({(d.year, d.month) for d in dates}):
+        start = dt.date(*month, 1)
+        end = (start + dt.timedelta(days=32)).replace(day=1) - dt.timedelta(days=1)
+
+        if ranges and ranges[-1].end + dt.timedelta(days=1) == start:
+            ranges[-1].end = end
+        else:
+            ranges.append(DateRange(start=start, end=end))
+
+    return ranges
+
+
+class ChangeFeed:
+    """In-memory feed of change events that subscribers can listen to.
+
+    Events are published from any thread and retained in a bounded buffer so that subscribers that reconnect can catch
+    up on missed events. All subscribers on an event loop wait on a single shared asyncio.Event that is replaced on each
+    publish, so an idle subscriber costs no more than a suspended coroutine."""
+
+    def __init__(self, history: int = 1000):
+        """
+        :param history: the maximum number of events to retain for subscribers that catch up
+        """
+        # Identifies this feed so that event ids from a previous instance, e.g. before a restart, can be recognised.
+        self.token = uuid.uuid4().hex
+        self._events: deque[tuple[int, ChangeEvent]] = deque(maxlen=history)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+        # The shared event for each event loop with subscribers.
+        self._wakeups: dict[asyncio.AbstractEventLoop, asyncio.Event] = {}
+
+    def event_id(self, seq: int) -> str:
+        """Return the id of the event with the given sequence number."""
+        return f"{self.token}:{seq}"
+
+    def last_event_id(self) -> str:
+        """Return the id of the last published event, or of the start of the feed if none has been published yet."""
+        with self._lock:
+            return self.event_id(self._seq)
+
+    def publish(self, event: ChangeEvent) -> int:
+        """
+        Publish an event to all subscribers. Thread-safe.
+
+        :param event: the event
+        :return: the sequence number of the event
+        """
+        with self._lock:
+            self._seq += 1
+            self._events.append((self._seq, event))
+            seq = self._seq
+            loops = list(self._wakeups.keys())
+
+        # Wake up subscribers on their respective loops.
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._wake, loop)
+            except RuntimeError:
+                # Loop is closed.
+                with self._lock:
+                    self._wakeups.pop(loop, None)
+
+        return seq
+
+    def _wake(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Runs on the given loop. Replace the shared event first so that woken subscribers wait on the next one.
+        with self._lock:
+            event = self._wakeups.pop(loop, None)
+        if event is not None:
+            event.set()
+
+    def _since(self, seq: int) -> list[tuple[int, ChangeEvent]] | int:
+        # Return the events after the given sequence number, or the current sequence number if any events in between
+        # have been dropped.
+        with self._lock:
+            if seq > self._seq or (self._events[0][0] if self._events else self._seq + 1) > seq + 1:
+                return self._seq
+            return [x for x in self._events if x[0] > seq]
+
+    def _resume(self, last_event_id: str | None) -> int | None:
+        # Return the sequence number to resume after, or None if the given id is not from this feed.
+        if last_event_id is None:
+            with self._lock:
+                return self._seq
+
+        token, _, seq = last_event_id.partition(":")
+        if token != self.token or not seq.isdigit():
+            return None
+
+        return int(seq)
+
+    async def listen(
+        self, last_event_id: str | None = None, keepalive: float | None = None
+    ) -> AsyncIterator[tuple[int, ChangeEvent] | None]:
+        """
+        Listen to the feed on the current event loop.
+
+        Yields (sequence number, event) for each published event, and None whenever no event has been published for the
+        keep-alive interval. If the subscriber cannot catch up from the given event id, e.g. because it is from a
+        previous instance or too many events have been published since, yields (sequence number, None) once to signal
+        that all state derived from previous events must be discarded.
+
+        :param last_event_id: the id of the last event the subscriber has seen, or None to only receive new events
+        :param keepalive: the keep-alive interval in seconds, or None to never yield None
+        :return: async iterator over events
+        """
+        loop = asyncio.get_running_loop()
+        seq = self._resume(last_event_id)
+
+        if seq is None:
+            with self._lock:
+                seq = self._seq
+            yield seq, None
+
+        while True:
+            # Get the shared event before looking for events so that no wakeup is missed. Wakeups are scheduled on the
+            # loop, so they can only happen while waiting.
+            with self._lock:
+                wakeup = self._wakeups.get(loop)
+                if wakeup is None:
+                    wakeup = self._wakeups[loop] = asyncio.Event()
+
+            events = self._since(seq)
+
+            if isinstance(events, int):
+                seq = events
+                yield seq, None
+                continue
+
+            for x in events:
+                seq = x[0]
+                yield x
+
+            if events:
+                continue
+
+            try:
+                async with asyncio.timeout(keepalive):
+                    await wakeup.wait()
+            except TimeoutError:
+                yield None
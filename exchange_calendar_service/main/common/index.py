@@ -0,0 +1,509 @@
+import datetime as dt
+from collections.abc import Iterable
+from functools import cached_property
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from .constants import bad_date_tag, min_year, max_year
+
+
+class Sessions(NamedTuple):
+    """Trading sessions as parallel arrays, sorted by date."""
+
+    # The session dates, as datetime64[D].
+    dates: np.ndarray
+
+    # The session open instants in UTC, as timezone-naive datetime64[ns].
+    opens: np.ndarray
+
+    # The session close instants in UTC, as timezone-naive datetime64[ns].
+    closes: np.ndarray
+
+    # The break start instants in UTC, as timezone-naive datetime64[ns], NaT for sessions without a break.
+    break_starts: np.ndarray
+
+    # The break end instants in UTC, as timezone-naive datetime64[ns], NaT for sessions without a break.
+    break_ends: np.ndarray
+
+    def between(self, start: dt.date, end: dt.date) -> "Sessions":
+        """Return the sessions with dates in the given period."""
+        i0 = np.searchsorted(self.dates, np.datetime64(start, "D"), side="left")
+        i1 = np.searchsorted(self.dates, np.datetime64(end, "D"), side="right")
+        return Sessions(*(x[i0:i1] for x in self))
+
+
+class SpecialDays(NamedTuple):
+    """Special days as parallel arrays, sorted by date."""
+
+    # The dates, as datetime64[D].
+    dates: np.ndarray
+
+    # The day types, as strings.
+    types: np.ndarray
+
+    # Whether each day is a business day.
+    is_business_day: np.ndarray
+
+    # The names, as strings.
+    names: np.ndarray
+
+    # The special open/close times in the calendar's time zone, as datetime.time objects or None.
+    times: np.ndarray
+
+    def __len__(self):
+        return len(self.dates)
+
+    def between(self, start: dt.date, end: dt.date) -> "SpecialDays":
+        """Return the special days with dates in the given period."""
+        i0 = np.searchsorted(self.dates, np.datetime64(start, "D"), side="left")
+        i1 = np.searchsorted(self.dates, np.datetime64(end, "D"), side="right")
+        return SpecialDays(*(x[i0:i1] for x in self))
+
+    def filter(self, mask: np.ndarray) -> "SpecialDays":
+        """Return the special days selected by the given boolean mask."""
+        return SpecialDays(*(x[mask] for x in self))
+
+
+def _positions(dates: np.ndarray, days) -> np.ndarray:
+    # Positions of the given days within the sorted dates, skipping days not contained.
+    if not len(dates):
+        return np.zeros(0, dtype=np.int64)
+    days = np.asarray(days, dtype="datetime64[D]")
+    i = np.searchsorted(dates, days).clip(max=len(dates) - 1)
+    return i[dates[i] == days]
+
+
+def _to_timedelta(time: dt.time) -> np.timedelta64:
+    # Convert time of day into offset from midnight.
+    return np.timedelta64(((time.hour * 60 + time.minute) * 60 + time.second) * 1_000_000 + time.microsecond, "us")
+
+
+class CalendarIndex:
+    """Precomputed, array-based representation of a single exchange calendar over the range of supported years.
+
+    An index is derived from one specific version of a calendar and is never updated in place. When the underlying
+    calendar changes, a new index must be created. All members are computed lazily on first access."""
+
+    def __init__(self, calendar, start: dt.date | None = None, end: dt.date | None = None):
+        """
+        :param calendar: the exchange calendar
+        :param start: the first day to cover, defaults to the first day of the supported years
+        :param end: the last day to cover, defaults to the last day of the supported years
+        """
+        # The wrapped exchange calendar.
+        self.calendar = calendar
+
+        # First and last day covered by the index.
+        self.start = start if start is not None else dt.date(min_year, 1, 1)
+        self.end = end if end is not None else dt.date(max_year, 12, 31)
+
+    def __len__(self):
+        # The number of calendar days covered by the index.
+        return (self.end - self.start).days + 1
+
+    def offset(self, day: dt.date) -> int:
+        """Return the offset of the given day relative to the first day of the index."""
+        return (day - self.start).days
+
+    def covers(self, day: dt.date) -> bool:
+        """Return whether the given day is covered by the index."""
+        return self.start <= day <= self.end
+
+    @cached_property
+    def business_days(self) -> np.ndarray:
+        """Packed bit array with one bit per calendar day in the index. A bit is set if and only if the corresponding
+        day is a business day."""
+        days = pd.bdate_range(self.start, self.end, freq=self.calendar.day)
+        bits = np.zeros(len(self), dtype=bool)
+        bits[(days.values.astype("datetime64[D]") - np.datetime64(self.start, "D")).astype(np.int64)] = True
+        return np.packbits(bits)
+
+    @cached_property
+    def bad_dates(self) -> np.ndarray:
+        """Sorted array of all days in the index that are tagged as bad dates, as datetime64[D]."""
+        meta = self.calendar.meta(start=pd.Timestamp(self.start), end=pd.Timestamp(self.end))
+        return np.array(sorted(d for d, m in meta.items() if bad_date_tag in m.tags), dtype="datetime64[D]")
+
+    def is_bad_date(self, dates: np.ndarray) -> np.ndarray:
+        """
+        Return whether each of the given days is tagged as a bad date.
+
+        :param dates: the days to check, as datetime64[D] values
+        :return: boolean array with one element per day
+        """
+        return np.isin(dates, self.bad_dates)
+
+    @cached_property
+    def sessions(self) -> Sessions:
+        """All trading sessions in the index, with open and close instants that account for special opens and
+        closes, and with break start and end instants where the exchange observes a break."""
+        c = self.calendar
+
+        # Business days.
+        dates = np.datetime64(self.start, "D") + np.flatnonzero(np.unpackbits(self.business_days)[: len(self)])
+
+        opens = self._times(dates, c.open_times, c.special_opens, c.special_opens_adhoc)
+        opens += np.timedelta64(c.open_offset, "D")
+        opens = self._to_utc(opens)
+
+        closes = self._times(dates, c.close_times, c.special_closes, c.special_closes_adhoc)
+        closes += np.timedelta64(c.close_offset, "D")
+        closes = self._to_utc(closes)
+
+        # Special offsets, e.g. a delayed session on some days. Like in exchange_calendars, special open and close times
+        # take precedence.
+        is_special_close = self._is_special(dates, c.special_closes, c.special_closes_adhoc)
+        if c.special_offsets or c.special_offsets_adhoc:
+            opens += np.where(
+                self._is_special(dates, c.special_opens, c.special_opens_adhoc), 0, self._offsets(dates, 0)
+            )
+            closes += np.where(is_special_close, 0, self._offsets(dates, 3))
+
+        # Breaks, if any. Like in exchange_calendars, there is no break on days with a special close.
+        break_starts = np.full(len(dates), np.datetime64("NaT"), dtype="datetime64[ns]")
+        break_ends = break_starts.copy()
+
+        if c.break_start_times and c.break_end_times:
+            starts = self._to_utc(self._times(dates, c.break_start_times, (), ()))
+            ends = self._to_utc(self._times(dates, c.break_end_times, (), ()))
+
+            if c.special_offsets or c.special_offsets_adhoc:
+                starts += self._offsets(dates, 1)
+                ends += self._offsets(dates, 2)
+
+            # A schedule may also end the breaks from some date on, which leaves the start and end of the break unset.
+            has_break = ~is_special_close & ~np.isnat(starts) & ~np.isnat(ends)
+
+            break_starts[has_break] = starts[has_break]
+            break_ends[has_break] = ends[has_break]
+
+        return Sessions(dates, opens, closes, break_starts, break_ends)
+
+    @cached_property
+    def special_days(self) -> SpecialDays:
+        """All special days in the index. Special days are holidays, special open and close days, quarterly and monthly
+        expiries, and the last trading days of months, excluding any days that fall on regular non-business days."""
+        c = self.calendar
+        start, end = pd.Timestamp(self.start), pd.Timestamp(self.end)
+
+        # Columns, as lists of arrays, one per category of special days.
+        dates, types, is_business_day, names, times = [], [], [], [], []
+
+        def add(days, type_: str, business_day: bool, name, time: dt.time | None = None):
+            # The name is either a single string or an array of strings, one per day.
+            days = pd.DatetimeIndex(days)
+            name = np.broadcast_to(np.asarray(name, dtype=object), len(days))
+            mask = (days >= start) & (days <= end)
+            dates.append(days.values[mask].astype("datetime64[D]"))
+            types.append(np.full(mask.sum(), type_, dtype=object))
+            is_business_day.append(np.full(mask.sum(), business_day))
+            names.append(name[mask])
+            times.append(np.full(mask.sum(), time, dtype=object))
+
+        def add_calendar(cal, type_: str, business_day: bool, time: dt.time | None = None):
+            holidays = cal.holidays(start, end, return_name=True).copy()
+
+            # Which of multiple holidays on the same day gives the day its name depends on the range looked up, due to
+            # an unstable sort. Name these days after the first rule instead.
+            rules = getattr(cal, "rules", None) or ()
+            if rules:
+                named = pd.concat([r.dates(start, end, return_name=True) for r in rules])
+                holidays.update(named[named.index.duplicated(keep=False) & ~named.index.duplicated()])
+
+            add(holidays.index, type_, business_day, holidays.values, time)
+
+        # Regular and ad-hoc holidays.
+        add_calendar(c.regular_holidays, "holiday", False)
+        add(c.adhoc_holidays, "holiday", False, "ad-hoc holiday")
+
+        # Regular and ad-hoc special closes and opens. Special times that apply to entire days of the week are changes
+        # to the regular schedule rather than special days.
+        for time, cal in c.special_closes:
+            if not isinstance(cal, int):
+                add_calendar(cal, "special close", True, time)
+        for time, days in c.special_closes_adhoc:
+            add(days, "special close", True, "ad-hoc special close", time)
+        for time, cal in c.special_opens:
+            if not isinstance(cal, int):
+                add_calendar(cal, "special open", True, time)
+        for time, days in c.special_opens_adhoc:
+            add(days, "special open", True, "ad-hoc special open", time)
+
+        # Quarterly and monthly expiries.
+        add_calendar(c.quarterly_expiries, "witching", True)
+        add_calendar(c.monthly_expiries, "monthly expiry", True)
+
+        # Last trading day of every month, if not already collected.
+        collected = np.concatenate(dates)
+        add_calendar(c.last_trading_days_of_months, "month end", True)
+        dates[-1], types[-1], is_business_day[-1], names[-1], times[-1] = (
+            x[-1][~np.isin(dates[-1], collected)] for x in (dates, types, is_business_day, names, times)
+        )
+
+        result = SpecialDays(*(np.concatenate(x) for x in (dates, types, is_business_day, names, times)))
+
+        # Filter out days that fall on regular non-business days, i.e. weekend days.
+        weekmask = np.array([x == "1" for x in c.weekmask])
+        result = result.filter(weekmask[(result.dates.view("int64") + 3) % 7])
+
+        # Sort by date, retaining the order of categories for the same date.
+        return result.filter(np.argsort(result.dates, kind="stable"))
+
+    @cached_property
+    def boundaries(self) -> tuple[np.ndarray, np.ndarray]:
+        """The sorted instants at which the exchange opens and closes, respectively. The end of a break counts as an
+        open and the start of a break as a close."""
+        sessions = self.sessions
+        has_break = ~np.isnat(sessions.break_starts)
+        opens = np.sort(np.concatenate([sessions.opens, sessions.break_ends[has_break]]))
+        closes = np.sort(np.concatenate([sessions.closes, sessions.break_starts[has_break]]))
+        return opens, closes
+
+    def is_open(self, instants: np.ndarray) -> np.ndarray:
+        """
+        Return whether the exchange is in session at each of the given instants. The exchange is not in session during
+        breaks.
+
+        :param instants: the instants in UTC, as timezone-naive datetime64[ns] values
+        :return: boolean array with one element per instant
+        """
+        opens, closes = self.boundaries
+        i = np.searchsorted(opens, instants, side="right") - 1
+        return (i >= 0) & (instants < closes[i.clip(min=0)])
+
+    def next_open_close(self, instants: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return the next open and close strictly after each of the given instants, including the ends and starts of
+        breaks, respectively.
+
+        :param instants: the instants in UTC, as timezone-naive datetime64[ns] values
+        :return: arrays of the next open and next close instants, NaT if beyond the last session in the index
+        """
+
+        def next_after(boundaries: np.ndarray) -> np.ndarray:
+            i = np.searchsorted(boundaries, instants, side="right")
+            return np.where(i < len(boundaries), boundaries[i.clip(max=len(boundaries) - 1)], np.datetime64("NaT"))
+
+        opens, closes = self.boundaries
+
+        return next_after(opens), next_after(closes)
+
+    @cached_property
+    def break_durations(self) -> np.ndarray:
+        """Duration of the break of each session in the index, as timedelta64[ns], zero for sessions without a
+        break."""
+        sessions = self.sessions
+        durations = sessions.break_ends - sessions.break_starts
+        return np.where(np.isnat(durations), np.timedelta64(0, "ns"), durations)
+
+    @cached_property
+    def cumulative_session_time(self) -> np.ndarray:
+        """Cumulative duration of all sessions in the index, excluding breaks, as timedelta64[ns]. The i-th element is
+        the total duration of all sessions before the i-th session, with one more trailing element for the total over
+        all sessions."""
+        sessions = self.sessions
+        durations = sessions.closes - sessions.opens - self.break_durations
+        return np.concatenate([[np.timedelta64(0, "ns")], np.cumsum(durations)])
+
+    def session_time_until(self, instants: np.ndarray) -> np.ndarray:
+        """
+        Return the total duration of all sessions, or parts thereof, before each of the given instants, excluding
+        breaks.
+
+        :param instants: the instants in UTC, as timezone-naive datetime64[ns] values
+        :return: array of durations, as timedelta64[ns]
+        """
+        sessions = self.sessions
+        i = np.searchsorted(sessions.opens, instants, side="right") - 1
+        j = i.clip(min=0)
+        zero = np.timedelta64(0, "ns")
+
+        # Completed sessions before the current one, plus the elapsed part of the current session, if any, minus the
+        # elapsed part of its break.
+        elapsed = np.clip(instants - sessions.opens[j], zero, sessions.closes[j] - sessions.opens[j])
+        breaks = self.break_durations[j]
+        has_break = breaks > zero
+        if has_break.any():
+            elapsed[has_break] -= np.clip(
+                instants[has_break] - sessions.break_starts[j[has_break]], zero, breaks[has_break]
+            )
+        return np.where(i >= 0, self.cumulative_session_time[j] + elapsed, zero)
+
+    def session_time_between(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """
+        Return the total duration of all sessions, or parts thereof, between pairs of instants.
+
+        :param starts: the start instants in UTC, as timezone-naive datetime64[ns] values
+        :param ends: the end instants in UTC, as timezone-naive datetime64[ns] values
+        :return: array of durations, as timedelta64[ns], negative where the end is before the start
+        """
+        return self.session_time_until(ends) - self.session_time_until(starts)
+
+    def _special(self, dates: np.ndarray, special, special_adhoc) -> Iterable[tuple[np.ndarray, dt.time]]:
+        """Yield the positions of the given dates with special times of day, and the respective times, with ad-hoc
+        special times last so that they take precedence."""
+        start, end = pd.Timestamp(self.start), pd.Timestamp(self.end)
+
+        # Regular special times. The day may also be given as an integer day of the week.
+        for time, cal in special:
+            if isinstance(cal, int):
+                yield np.flatnonzero((dates.view("int64") + 3) % 7 == cal), time
+            else:
+                yield _positions(dates, cal.holidays(start, end).values), time
+
+        for time, days in special_adhoc:
+            yield _positions(dates, pd.DatetimeIndex(days).values), time
+
+    def _offsets(self, dates: np.ndarray, k: int) -> np.ndarray:
+        """Return the special offsets for the given dates, with 0 for the open, 1 for the break start, 2 for the break
+        end, and 3 for the close, in the order of the tuples in exchange_calendars. Ad-hoc offsets take precedence."""
+        c = self.calendar
+        start, end = pd.Timestamp(self.start), pd.Timestamp(self.end)
+        result = np.zeros(len(dates), dtype="timedelta64[ns]")
+
+        entries = [(x[k], x[-1].holidays(start, end).values) for x in c.special_offsets]
+        entries += [(x[k], pd.DatetimeIndex(x[-1]).values) for x in c.special_offsets_adhoc]
+
+        for offset, days in entries:
+            if offset is not None:
+                result[_positions(dates, days)] = pd.Timedelta(offset).to_timedelta64()
+
+        return result
+
+    def _is_special(self, dates: np.ndarray, special, special_adhoc) -> np.ndarray:
+        """Return whether each of the given dates has a special time of day."""
+        result = np.zeros(len(dates), dtype=bool)
+        for i, _ in self._special(dates, special, special_adhoc):
+            result[i] = True
+        return result
+
+    def _times(self, dates: np.ndarray, regular, special, special_adhoc) -> np.ndarray:
+        """Return local, timezone-naive datetimes for the given dates from regular and special times of day. Dates for
+        which the regular time is None, i.e. none applies from some date on, are NaT unless they have a special time."""
+        result = np.zeros(len(dates), dtype="timedelta64[us]")
+
+        # Regular times, in ascending order of the date from which they apply.
+        for since, time in regular:
+            result[dates >= np.datetime64(since if since is not None else self.start, "D")] = (
+                _to_timedelta(time) if time is not None else np.timedelta64("NaT", "us")
+            )
+
+        # Special times take precedence.
+        for i, time in self._special(dates, special, special_adhoc):
+            result[i] = _to_timedelta(time)
+
+        return dates.astype("datetime64[us]") + result
+
+    def _to_utc(self, local: np.ndarray) -> np.ndarray:
+        # Localize the given timezone-naive local datetimes to the calendar's time zone and convert to UTC.
+        return (
+            pd.DatetimeIndex(local)
+            .tz_localize(self.calendar.tz, ambiguous=True, nonexistent="shift_forward")
+            .tz_convert("UTC")
+            .tz_localize(None)
+            .values.astype("datetime64[ns]")
+        )
+
+
+class SessionIntervalIndex:
+    """Sorted index of the trading sessions of multiple calendars over a window of days.
+
+    The boundaries of all sessions and breaks split the window into elementary intervals during each of which the set of calendars
+    in session does not change. That set is stored as a packed bit mask per interval, so that looking up the calendars
+    in session at a given instant is a binary search over the interval boundaries."""
+
+    def __init__(self, indices: dict[str, CalendarIndex], start: dt.date, end: dt.date):
+        """
+        :param indices: the calendar indices to include, by MIC
+        :param start: the first day of the window
+        :param end: the last day of the window
+        """
+        self.mics = tuple(indices.keys())
+
+        # The window, as UTC instants. Instants in [lower, upper) are covered by the index.
+        self.lower = np.datetime64(start, "ns")
+        self.upper = np.datetime64(end + dt.timedelta(days=1), "ns")
+
+        # Sessions that may overlap with the window. Sessions never span more than two days, but their dates may differ
+        # from the UTC dates of their open and close instants.
+        sessions = [
+            x.sessions.between(start - dt.timedelta(days=2), end + dt.timedelta(days=2)) for x in indices.values()
+        ]
+
+        # Breaks split sessions into two intervals each.
+        has_break = [~np.isnat(x.break_starts) for x in sessions]
+        opens = np.concatenate([x.opens for x in sessions] + [x.break_ends[b] for x, b in zip(sessions, has_break)])
+        closes = np.concatenate([x.closes for x in sessions] + [x.break_starts[b] for x, b in zip(sessions, has_break)])
+        ids = np.concatenate(
+            [np.full(len(x.dates), i) for i, x in enumerate(sessions)]
+            + [np.full(np.count_nonzero(b), i) for i, b in enumerate(has_break)]
+        )
+
+        # The boundaries of all elementary intervals.
+        self.boundaries = np.unique(np.concatenate([opens, closes]))
+
+        # Count opens and closes per calendar at each boundary, then accumulate to get the calendars in session.
+        counts = np.zeros((len(self.boundaries), len(self.mics)), dtype=np.int8)
+        np.add.at(counts, (np.searchsorted(self.boundaries, opens), ids), 1)
+        np.add.at(counts, (np.searchsorted(self.boundaries, closes), ids), -1)
+        self.masks = np.packbits(np.cumsum(counts, axis=0) > 0, axis=1)
+
+    def covers(self, instants: np.ndarray) -> np.ndarray:
+        """Return whether each of the given instants is covered by the index."""
+        return (self.lower <= instants) & (instants < self.upper)
+
+    def is_open(self, instants: np.ndarray) -> np.ndarray:
+        """
+        Return which calendars are in session at each of the given instants. All instants must be covered by the index.
+
+        :param instants: the instants in UTC, as timezone-naive datetime64[ns] values
+        :return: boolean array of shape (len(instants), len(self.mics))
+        """
+        i = np.searchsorted(self.boundaries, instants, side="right") - 1
+        result = np.unpackbits(self.masks[i.clip(min=0)], axis=1, count=len(self.mics)).astype(bool)
+        result[i < 0] = False
+        return result
+
+
+def combine_business_days(indices: Iterable[CalendarIndex], op: str, start: dt.date, end: dt.date) -> list[dt.date]:
+    """
+    Combine the business days of multiple calendars with a bitwise operation and return the resulting days.
+
+    :param indices: the calendar indices to combine, all covering the same range of days
+    :param op: one of "all" (all calendars open), "any" (at least one calendar open), or "exactly_one" (exactly one
+        calendar open)
+    :param start: the first day of the period to return days for
+    :param end: the last day of the period to return days for
+    :return: the sorted list of days in the given period that satisfy the operation
+    """
+    indices = list(indices)
+
+    if not indices or end < start:
+        return []
+
+    # Offsets of start and end relative to the start of the indices and the corresponding range of bytes.
+    first, last = indices[0].offset(start), indices[0].offset(end)
+    b0, b1 = first // 8, last // 8 + 1
+
+    if op == "all":
+        bits = np.bitwise_and.reduce([x.business_days[b0:b1] for x in indices])
+    elif op == "any":
+        bits = np.bitwise_or.reduce([x.business_days[b0:b1] for x in indices])
+    elif op == "exactly_one":
+        # Bit-sliced counting: ones tracks days seen open an odd number of times, twos days seen open at least twice.
+        ones = np.zeros(b1 - b0, dtype=np.uint8)
+        twos = np.zeros(b1 - b0, dtype=np.uint8)
+        for x in indices:
+            b = x.business_days[b0:b1]
+            twos |= ones & b
+            ones ^= b
+        bits = ones & ~twos
+    else:
+        raise ValueError(f"Unsupported operation {op}.")
+
+    # Unpack and trim to requested period.
+    bits = np.unpackbits(bits)[first - 8 * b0 : last - 8 * b0 + 1]
+
+    return (np.datetime64(start, "D") + np.flatnonzero(bits)).astype(dt.date).tolist()
@@ -0,0 +1,112 @@
+import logging
+import sqlite3
+import threading
+from collections.abc import Mapping
+from contextlib import closing
+
+from exchange_calendars_extensions.api.changes import ChangeSet
+
+log = logging.getLogger(__name__)
+
+
+class ChangeSetJournal:
+    """Durable, append-only journal of exchange calendar changesets, backed by a SQLite database.
+
+    Each entry records the complete changeset for a single MIC at the time of an update, or None if the changeset for
+    the MIC was removed. Only the latest entry per MIC is relevant to the current state, so the journal can be compacted
+    by dropping all other entries. The database uses write-ahead logging so that multiple processes can share the same
+    journal.
+
+    Separately, the journal keeps the changesets that were last applied from a changeset directory, so that changesets
+    removed from the directory while the service was down can be told apart from those applied by other means."""
+
+    def __init__(self, path: str, compact_threshold: int = 1000):
+        """
+        :param path: the path to the SQLite database file, created if necessary
+        :param compact_threshold: the number of superseded entries above which the journal is compacted after an append
+        """
+        self.path = path
+        self.compact_threshold = compact_threshold
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS changes ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "mic TEXT NOT NULL, "
+                "changeset TEXT, "
+                "created TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS changes_mic ON changes (mic, seq)")
+            conn.execute("CREATE TABLE IF NOT EXISTS directory (mic TEXT PRIMARY KEY, changeset TEXT NOT NULL)")
+
+    def _connect(self) -> closing:
+        # Use a new connection per operation. The connection's own context manager only wraps a transaction, so
+        # additionally close the connection when done.
+        return closing(sqlite3.connect(self.path, timeout=30))
+
+    def append(self, changes: Mapping[str, ChangeSet | None]) -> None:
+        """
+        Append entries to the journal in a single transaction.
+
+        :param changes: the new complete changeset per MIC, or None if the changeset for the MIC was removed
+        """
+        if not changes:
+            return
+
+        with self._lock, self._connect() as conn, conn:
+            conn.executemany(
+                "INSERT INTO changes (mic, changeset) VALUES (?, ?)",
+                [(mic, cs.model_dump_json() if cs is not None else None) for mic, cs in changes.items()],
+            )
+            superseded = conn.execute("SELECT COUNT(*) - COUNT(DISTINCT mic) FROM changes").fetchone()[0]
+
+        if superseded > self.compact_threshold:
+            self.compact()
+
+    def compact(self) -> None:
+        """Drop all entries from the journal that are superseded by a later entry for the same MIC, as well as the
+        latest entries that record a removal."""
+        with self._lock, self._connect() as conn, conn:
+            conn.execute("DELETE FROM changes WHERE seq NOT IN (SELECT MAX(seq) FROM changes GROUP BY mic)")
+            conn.execute("DELETE FROM changes WHERE changeset IS NULL")
+
+        log.debug(f"Compacted changeset journal {self.path}.")
+
+    def load(self) -> dict[str, ChangeSet]:
+        """
+        Compact the journal and return the current state.
+
+        :return: the latest changeset per MIC
+        """
+        self.compact()
+
+        with self._lock, self._connect() as conn:
+            rows = conn.execute("SELECT mic, changeset FROM changes ORDER BY mic").fetchall()
+
+        return {mic: ChangeSet.model_validate_json(changeset) for mic, changeset in rows}
+
+    def save_directory(self, changes: Mapping[str, ChangeSet]) -> None:
+        """
+        Replace the changesets that were last applied from a changeset directory.
+
+        :param changes: the changesets from the directory, by MIC
+        """
+        with self._lock, self._connect() as conn, conn:
+            conn.execute("DELETE FROM directory")
+            conn.executemany(
+                "INSERT INTO directory (mic, changeset) VALUES (?, ?)",
+                [(mic, cs.model_dump_json()) for mic, cs in changes.items()],
+            )
+
+    def load_directory(self) -> dict[str, ChangeSet]:
+        """
+        Return the changesets that were last applied from a changeset directory.
+
+        :return: the changesets from the directory, by MIC
+        """
+        with self._lock, self._connect() as conn:
+            rows = conn.execute("SELECT mic, changeset FROM directory ORDER BY mic").fetchall()
+
+        return {mic: ChangeSet.model_validate_json(changeset) for mic, changeset in rows}
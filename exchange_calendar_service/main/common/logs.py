@@ -0,0 +1,100 @@
+import json
+import logging
+import queue
+from collections.abc import Iterable
+from logging.handlers import QueueHandler, QueueListener
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats log records as single-line JSON objects. Extra attributes passed to a logging call are included as
+    additional fields."""
+
+    # Attributes of every log record, as opposed to extra attributes.
+    _reserved = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__.keys()) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+
+        # The exception may have been formatted already, e.g. before the record was enqueued.
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+
+        data.update({k: v for k, v in record.__dict__.items() if k not in self._reserved})
+
+        return json.dumps(data, default=str)
+
+
+# Formats exceptions in the same way as the default formatters do.
+_formatter = logging.Formatter()
+
+
+class _QueueHandler(QueueHandler):
+    # Enqueue records with their arguments. The default merges the arguments into the message, which breaks formatters
+    # that use the arguments, e.g. that of uvicorn's access log. Records only cross threads, so they need not be
+    # pickleable. Exceptions are formatted right away, though, so that tracebacks and their frames are not kept alive.
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class QueueLogging:
+    """Moves the handlers of a set of loggers behind queues, so that emitting a log record only enqueues it. Background
+    threads dequeue the records and pass them on to the original handlers, which may then block on I/O without stalling
+    the event loop. If a logger has no handlers, a stream handler is used instead."""
+
+    def __init__(self, loggers: Iterable[str] = ("", "uvicorn", "uvicorn.access"), json_format: bool = False):
+        """
+        :param loggers: the names of the loggers whose handlers to move behind queues, "" for the root logger
+        :param json_format: whether to replace the formatters of the original handlers with a JSON formatter
+        """
+        self.loggers = tuple(loggers)
+        self.json_format = json_format
+
+        # Original handlers and queue listener, by logger name.
+        self._handlers: dict[str, list[logging.Handler]] = {}
+        self._formatters: dict[str, list[logging.Formatter | None]] = {}
+        self._listeners: dict[str, QueueListener] = {}
+
+    def start(self) -> None:
+        for name in self.loggers:
+            logger = logging.getLogger(name)
+
+            if name in self._listeners or (name and not logger.handlers):
+                # Already started, or not a logger with its own handlers, e.g. one that propagates to the root logger.
+                continue
+
+            handlers = self._handlers[name] = list(logger.handlers)
+            targets = handlers if handlers else [logging.StreamHandler()]
+
+            if self.json_format:
+                self._formatters[name] = [handler.formatter for handler in handlers]
+                for handler in targets:
+                    handler.setFormatter(JsonFormatter())
+
+            q = queue.SimpleQueue()
+            listener = self._listeners[name] = QueueListener(q, *targets, respect_handler_level=True)
+            listener.start()
+
+            logger.handlers = [_QueueHandler(q)]
+
+    def stop(self) -> None:
+        # Flush remaining records and restore the original handlers and their formatters.
+        for name, listener in self._listeners.items():
+            handlers = logging.getLogger(name).handlers = self._handlers.pop(name)
+            listener.stop()
+
+            for handler, formatter in zip(handlers, self._formatters.pop(name, ())):
+                handler.setFormatter(formatter)
+
+        self._listeners.clear()
@@ -0,0 +1,218 @@
+import datetime as dt
+import enum
+import itertools
+from enum import Enum
+from typing import Annotated, Any, Literal
+from typing import Union
+from zoneinfo import ZoneInfo
+
+from pydantic import BaseModel, Tag, Discriminator
+
+from .constants import standardised_tz_names
+
+
+@enum.unique
+class DayTypeBusinessSpecial(str, Enum):
+    SPECIAL_CLOSE = "special close"
+    SPECIAL_OPEN = "special open"
+    WITCHING = "witching"
+    MONTHLY_EXPIRY = "monthly expiry"
+    MONTH_END = "month end"
+    MSCI_REBAL = "MSCI rebal"
+
+
+@enum.unique
+class DayTypeNonBusinessSpecial(str, Enum):
+    HOLIDAY = "holiday"
+
+
+@enum.unique
+class DayTypeNonBusinessRegular(str, Enum):
+    WEEKEND = "weekend"
+
+
+@enum.unique
+class DayTypeBusinessRegular(str, Enum):
+    REGULAR = "regular"
+
+
+regular_day_type = "regular"
+weekend_day_type = "weekend"
+witching_day_type = "witching"
+monthly_expiry_day_type = "monthly expiry"
+month_end_day_type = "month end"
+holiday_day_type = "holiday"
+special_open_day_type = "special open"
+special_close_day_type = "special close"
+msci_rebal_day_type = "MSCI rebal"
+special_day_types = frozenset(
+    {
+        holiday_day_type,
+        special_open_day_type,
+        special_close_day_type,
+        witching_day_type,
+        monthly_expiry_day_type,
+        month_end_day_type,
+        msci_rebal_day_type,
+    }
+)
+
+# Maps day type names to the corresponding enum members.
+day_types: dict[str, Enum] = {
+    x.value: x
+    for x in itertools.chain(
+        DayTypeBusinessRegular, DayTypeNonBusinessRegular, DayTypeBusinessSpecial, DayTypeNonBusinessSpecial
+    )
+}
+
+# frozenset that contains all members of DayTypeBusinessSpecial and DayTypeNonBusinessSpecial.
+special_day_types2: set[Union[DayTypeBusinessSpecial, DayTypeNonBusinessSpecial]] = frozenset(
+    itertools.chain([x for x in DayTypeBusinessSpecial], [x for x in DayTypeNonBusinessSpecial])
+)
+business_day_types2: set[Union[DayTypeBusinessRegular, DayTypeBusinessSpecial]] = frozenset(
+    itertools.chain([x for x in DayTypeBusinessRegular], [x for x in DayTypeBusinessSpecial])
+)
+
+
+class StandardDayClassification(BaseModel, frozen=True):
+    date: dt.date
+    type: DayTypeBusinessRegular | DayTypeNonBusinessRegular | DayTypeBusinessSpecial | DayTypeNonBusinessSpecial
+    is_business_day: bool
+    name: str | None = None
+
+
+class SpecialOpenCloseDayClassification(StandardDayClassification):
+    time: dt.time = None
+    type: Literal[DayTypeBusinessSpecial.SPECIAL_OPEN, DayTypeBusinessSpecial.SPECIAL_CLOSE]
+    tz: Union[str, None] = None
+
+
+def infer_day_classification_type(v: Any):
+    # Check if value has a "time" field. If so, it's a special open/close day classification.
+    if isinstance(v, dict):
+        time = v.get("time")
+    else:
+        time = getattr(v, "time", None)
+
+    if time is not None:
+        return "special_close"
+    else:
+        return "standard"
+
+
+DayClassification = Annotated[
+    (
+        Annotated[StandardDayClassification, Tag("standard")]
+        | Annotated[SpecialOpenCloseDayClassification, Tag("special_close")]
+    ),
+    Discriminator(infer_day_classification_type),
+]
+
+
+class StandardDayClassificationWithMics(StandardDayClassification):
+    mics: list[str]
+
+
+class SpecialOpenCloseDayClassificationWithMics(SpecialOpenCloseDayClassification, StandardDayClassificationWithMics):
+    pass
+
+
+DayClassificationWithMics = Annotated[
+    (
+        Annotated[StandardDayClassificationWithMics, Tag("standard")]
+        | Annotated[SpecialOpenCloseDayClassificationWithMics, Tag("special_close")]
+    ),
+    Discriminator(infer_day_classification_type),
+]
+
+
+class DayClassificationMap(BaseModel):
+    date: dt.date
+    classifications: list[DayClassificationWithMics]
+
+
+def combine(c: DayClassification, mics: list[str]) -> DayClassificationWithMics:
+    """
+    Attach a list of MICs to a day classification. The classification is trusted to be valid, so no validation takes
+    place.
+
+    :param c: the day classification
+    :param mics: the MICs the classification applies to
+    :return: the day classification with MICs
+    """
+    if isinstance(c, SpecialOpenCloseDayClassification):
+        return SpecialOpenCloseDayClassificationWithMics.model_construct(**c.__dict__, mics=mics)
+    elif isinstance(c, StandardDayClassification):
+        return StandardDayClassificationWithMics.model_construct(**c.__dict__, mics=mics)
+    else:
+        raise RuntimeError("Unexpected day classification type.")
+
+
+def resolve_timezone(tz: Union[str, ZoneInfo, None]) -> Union[ZoneInfo, None]:
+    """
+    Resolve a time zone name without falling back to a default.
+
+    tz: time zone to resolve
+    returns: the time zone, or None if tz is None or cannot be resolved unambiguously
+    """
+    if isinstance(tz, ZoneInfo) or tz is None:
+        return tz
+
+    try:
+        # check if timezone, as entered, is supported. If so, use it.
+        return ZoneInfo(tz)
+    except Exception:
+        # If time zone as entered is not supported, try to convert to Continent/City.
+        candidates = [(region, tz) for region, tz in standardised_tz_names.items() if tz == tz.upper()]
+        if len(candidates) != 1:
+            # more than one match was made, so not sure
+            # which location is referred to.
+            return None
+        else:
+            return ZoneInfo(candidates.pop()[0])
+
+
+def parse_timezone(tz: Union[str, ZoneInfo, None], default: Union[str, dt.tzinfo, None] = None) -> ZoneInfo:
+    """
+    pytz only supports time zones in Continent/City format consistently; abbreviations, like CET
+    or IST, are only supported in some cases. Thus, if the request has specified a non-supported abbreviation, like
+    SAST, this must be converted to Africa/Johannesburg (which is supported).
+
+    tz: time zone to test
+    default: if tz is not specified, we can either default to UTC (if default = None), or we can default to a given
+    time zone, typically the one of an exchange.
+    """
+
+    tz = resolve_timezone(tz)
+
+    if tz is None and default is not None:
+        try:
+            tz = ZoneInfo(standardised_tz_names.get(str(default)))
+        except Exception:
+            tz = ZoneInfo(str(default))
+    elif tz is None:
+        tz = ZoneInfo("UTC")
+
+    return tz
+
+
+def localize_time(
+    date: dt.date,
+    time: dt.time,
+    tz_input: ZoneInfo,
+    tz_target: Union[ZoneInfo, None] = None,
+) -> dt.time:
+    """
+    Localise a given time of day on a given day in a given time zone into the time of day in another given time zone.
+
+    :param date: the date
+    :param time: the time of day
+    :param tz_input: the time zone of the given date/time combination
+    :param tz_target: the time zone to convert the time of day to
+    """
+    if tz_target is None or tz_input == tz_target:
+        return time
+    else:
+        # Note to self: Use tz.localize(datetime.datetime.combine(date, time)) instead of
+        # datetime.datetime.combine(date, time, tzinfo=tz) since the latter can lead to incorrect results.
+        return dt.datetime.combine(date, time).replace(tzinfo=tz_input).astimezone(tz_target).time()
@@ -0,0 +1,128 @@
+import json
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+
+def partition(mics: Sequence[str], n: int) -> list[tuple[str, ...]]:
+    """
+    Partition MICs into shards of nearly equal size.
+
+    Each shard is a contiguous slice of the given MICs, so that concatenating per-shard results in shard order yields
+    the MICs in the original order.
+
+    :param mics: the MICs to partition
+    :param n: the number of shards, capped at the number of MICs
+    :return: the non-empty shards
+    """
+    n = max(1, min(n, len(mics)))
+    size, rest = divmod(len(mics), n)
+
+    shards = []
+    start = 0
+
+    for i in range(n):
+        end = start + size + (1 if i < rest else 0)
+        shards.append(tuple(mics[start:end]))
+        start = end
+
+    return [x for x in shards if x]
+
+
+def _key(classification: dict[str, Any]) -> str:
+    # Identify a classification without the MICs it applies to.
+    return json.dumps({k: v for k, v in classification.items() if k != "mics"}, sort_keys=True)
+
+
+def merge_classifications(results: Iterable[list[dict[str, Any]]]) -> list[dict[str, Any]]:
+    """
+    Merge lists of day classifications with MICs from different shards, as returned for all MICs.
+
+    Identical classifications are combined into one, with the MICs concatenated in shard order.
+
+    :param results: the lists of classifications, one per shard in shard order
+    :return: the merged classifications
+    """
+    merged: dict[str, dict[str, Any]] = {}
+
+    for result in results:
+        for c in result:
+            x = merged.get(_key(c))
+            if x is None:
+                merged[_key(c)] = {**c, "mics": list(c["mics"])}
+            else:
+                x["mics"].extend(c["mics"])
+
+    return list(merged.values())
+
+
+def merge_day_maps(results: Iterable[list[dict[str, Any]]], n: int, forward: bool) -> list[dict[str, Any]]:
+    """
+    Merge lists of next or previous days from different shards.
+
+    Each shard returns its own nearest n days. The n days nearest overall are among them, so these are retained and the
+    classifications on each day are merged.
+
+    :param results: the lists of days with classifications, one per shard in shard order
+    :param n: the number of days to retain
+    :param forward: whether the days are sorted forward or backward in time
+    :return: the merged days, sorted by increasing distance from the reference day
+    """
+    by_date: dict[str, list[list[dict[str, Any]]]] = {}
+
+    for result in results:
+        for x in result:
+            by_date.setdefault(x["date"], []).append(x["classifications"])
+
+    dates = sorted(by_date.keys(), reverse=not forward)[:n]
+
+    return [{"date": d, "classifications": merge_classifications(by_date[d])} for d in dates]
+
+
+def merge_combined_business_days(op: str, results: Sequence[list[str]], any_results: Sequence[list[str]]) -> list[str]:
+    """
+    Merge lists of combined business days from different shards.
+
+    :param op: one of "all", "any", or "exactly_one"
+    :param results: the days returned by each shard for the operation
+    :param any_results: the days returned by each shard for "any", only used for "exactly_one"
+    :return: the sorted list of days
+    """
+    if op == "all":
+        days = set(results[0]).intersection(*results[1:])
+    elif op == "any":
+        days = set().union(*results)
+    else:
+        # Exactly one exchange is open if exactly one shard has exactly one open exchange and no other shard has any.
+        any_days = [set(x) for x in any_results]
+        days = {
+            d
+            for i, result in enumerate(results)
+            for d in result
+            if not any(d in x for j, x in enumerate(any_days) if j != i)
+        }
+
+    return sorted(days)
+
+
+def merge_open_mics(results: Iterable[list[dict[str, Any]]], order: Sequence[str]) -> list[dict[str, Any]]:
+    """
+    Merge lists of MICs in session at given instants from different shards.
+
+    :param results: the lists of instants and MICs in session, one per shard, all for the same instants
+    :param order: the order of the MICs in the merged result
+    :return: the merged list of instants and MICs in session
+    """
+    position = {m: i for i, m in enumerate(order)}
+    merged = None
+
+    for result in results:
+        if merged is None:
+            merged = [{**x, "mics": list(x["mics"])} for x in result]
+        else:
+            for x, y in zip(merged, result):
+                x["mics"].extend(y["mics"])
+
+    for x in merged or []:
+        x["mics"].sort(key=lambda m: position.get(m, len(position)))
+
+    return merged or []
@@ -0,0 +1,101 @@
+import datetime as dt
+import threading
+from collections.abc import Iterable, Mapping
+
+import numpy as np
+import pandas as pd
+from exchange_calendars_extensions.api.changes import DayMeta
+
+
+class TagIndex:
+    """Inverted index from tags to the days they are attached to in the meta of exchange calendars.
+
+    For each tag, the index holds a sorted array of days per MIC. The index is updated one MIC at a time, replacing all
+    entries for that MIC, so that changes to a single calendar do not require rebuilding the whole index. All methods
+    are thread-safe."""
+
+    def __init__(self):
+        # Guards the dictionaries below.
+        self._lock = threading.RLock()
+
+        # Meta per MIC and day.
+        self._meta: dict[str, dict[dt.date, DayMeta]] = {}
+
+        # Sorted days, as datetime64[D], per tag and MIC.
+        self._index: dict[str, dict[str, np.ndarray]] = {}
+
+    def update(self, mic: str, meta: Mapping[dt.date | pd.Timestamp, DayMeta]) -> None:
+        """
+        Replace all entries for the given MIC.
+
+        :param mic: the MIC to update the entries for
+        :param meta: the complete meta for the MIC, by day
+        """
+        meta = {pd.Timestamp(d).date(): m for d, m in meta.items()}
+
+        # Collect days per tag.
+        days: dict[str, list[dt.date]] = {}
+        for d, m in meta.items():
+            for tag in m.tags:
+                days.setdefault(tag, []).append(d)
+
+        with self._lock:
+            self.remove(mic)
+
+            if not meta:
+                return
+
+            self._meta[mic] = meta
+
+            for tag, v in days.items():
+                self._index.setdefault(tag, {})[mic] = np.array(sorted(v), dtype="datetime64[D]")
+
+    def remove(self, mic: str) -> None:
+        """
+        Remove all entries for the given MIC.
+
+        :param mic: the MIC to remove the entries for
+        """
+        with self._lock:
+            if self._meta.pop(mic, None) is None:
+                return
+
+            for tag in list(self._index.keys()):
+                v = self._index[tag]
+                v.pop(mic, None)
+                if not v:
+                    del self._index[tag]
+
+    def tags(self) -> list[str]:
+        """Return the sorted list of all tags in the index."""
+        with self._lock:
+            return sorted(self._index.keys())
+
+    def query(
+        self, tag: str, mics: Iterable[str] | None = None, start: dt.date | None = None, end: dt.date | None = None
+    ) -> list[tuple[str, dt.date, DayMeta]]:
+        """
+        Return the days with the given tag.
+
+        :param tag: the tag to look up
+        :param mics: the optional MICs to restrict the result to, defaults to all
+        :param start: the optional first day of the period to restrict the result to
+        :param end: the optional last day of the period to restrict the result to
+        :return: list of MIC, day, and meta triples, sorted by day and MIC
+        """
+        # Take a consistent view of the entries for the tag. The arrays and meta per MIC are replaced, never modified.
+        with self._lock:
+            by_mic = dict(self._index.get(tag, {}))
+            meta = {m: self._meta[m] for m in by_mic.keys()}
+
+        mics = by_mic.keys() if mics is None else [m for m in mics if m in by_mic]
+
+        result = []
+
+        for m in mics:
+            days = by_mic[m]
+            i0 = np.searchsorted(days, np.datetime64(start, "D"), side="left") if start is not None else 0
+            i1 = np.searchsorted(days, np.datetime64(end, "D"), side="right") if end is not None else len(days)
+            result.extend((m, d, meta[m][d]) for d in days[i0:i1].astype(dt.date).tolist())
+
+        return sorted(result, key=lambda x: (x[1], x[0]))
@@ -1,20 +1,43 @@
 from enum import Enum
 from logging import Logger
 from collections.abc import Iterable
-from typing import Literal, TypeVar
+from typing import Annotated, TypeVar
 
+from pydantic import AfterValidator, WithJsonSchema
 
-def log_iterable(log: Logger, lines: Iterable[str], level: str):
-    for line in lines:
-        log.log(level, line)
 
+def log_iterable(log: Logger, lines: Iterable[str], level: int):
+    # Emit a single record for all lines so that multi-line payloads stay together and cost only one handler call.
+    log.log(level, "\n".join(lines))
 
-def log_multi_line(message: str, level: str):
-    log_iterable(message.splitlines(), level)
+
+def log_multi_line(log: Logger, message: str, level: int):
+    log.log(level, message)
 
 
 T = TypeVar("T", bound=Enum)
 
 
-def get_enum_key_literal_type(enum: type[T]) -> type:
-    return Literal[*[item.name for item in enum]]
+def get_enum_key_type(enum: type[T], examples: int = 3) -> type:
+    """
+    Return a string type that only allows the names of the members of an enum.
+
+    Unlike a Literal type over all names, validation is a single set lookup and the size of the JSON schema does not
+    depend on the number of members.
+
+    :param enum: the enum
+    :param examples: the number of names to include as examples in the JSON schema
+    :return: the type
+    """
+    names = frozenset(enum.__members__.keys())
+
+    def check(value: str) -> str:
+        if value not in names:
+            raise ValueError("Input should be the name of a supported value")
+        return value
+
+    return Annotated[
+        str,
+        AfterValidator(check),
+        WithJsonSchema({"type": "string", "examples": sorted(names)[:examples]}),
+    ]
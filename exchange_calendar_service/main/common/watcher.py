@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Callable, Mapping
+
+from exchange_calendars_extensions.api.changes import ChangeSet, ChangeSetDict
+
+from .changes import get_delta, is_changes_file, load_changes_file
+
+log = logging.getLogger(__name__)
+
+
+class ChangeSetDirectoryWatcher:
+    """Watches a directory of changeset files and applies changes incrementally.
+
+    Each file in the directory with a supported extension contains a mapping from MICs to changesets, in JSON or YAML
+    format. The directory is polled for files that were added, modified, or deleted, and only those are parsed again.
+    After a change, the watcher waits until the directory has been stable for a short while before it merges all files
+    and applies the resulting per-MIC delta, so that rapid successive writes lead to a single update."""
+
+    def __init__(
+        self,
+        path: str,
+        apply: Callable[[Mapping[str, ChangeSet | None]], None],
+        interval: float = 1.0,
+        debounce: float = 0.5,
+        applied: Mapping[str, ChangeSet] | None = None,
+    ):
+        """
+        :param path: the directory to watch
+        :param apply: the callable to apply a per-MIC delta of changesets with
+        :param interval: the polling interval, in seconds
+        :param debounce: the time the directory must be stable after a change before changes are applied, in seconds
+        :param applied: the changesets from the directory that are already in effect, by MIC, e.g. as applied before a
+            restart, so that only the delta to these is applied, including removals
+        """
+        self.path = path
+        self.apply = apply
+        self.interval = interval
+        self.debounce = debounce
+
+        # Modification time and size, by file name.
+        self._stats: dict[str, tuple[int, int]] = {}
+
+        # Parsed contents, by file name.
+        self._contents: dict[str, ChangeSetDict] = {}
+
+        # The changesets from the directory that were last applied, by MIC.
+        self._applied: dict[str, ChangeSet] = dict(applied or {})
+
+        # Time of the last detected change that has not been applied yet.
+        self._pending: float | None = None
+
+    @property
+    def applied(self) -> Mapping[str, ChangeSet]:
+        """The changesets from the directory that were last applied, by MIC."""
+        return self._applied
+
+    def scan(self) -> bool:
+        """
+        Check the directory for changed files and parse those again.
+
+        :return: whether any file was added, modified, or deleted
+        """
+        stats = {}
+
+        for entry in os.scandir(self.path):
+            if entry.is_file() and is_changes_file(entry.name):
+                stat = entry.stat()
+                stats[entry.name] = (stat.st_mtime_ns, stat.st_size)
+
+        changed = {k for k, v in stats.items() if self._stats.get(k) != v}
+        deleted = self._stats.keys() - stats.keys()
+
+        for name in changed:
+            try:
+                self._contents[name] = load_changes_file(os.path.join(self.path, name))
+            except Exception:
+                # Keep previous contents, if any, and try again when the file changes next time.
+                log.exception(f"Failed to parse changeset file {name}.")
+
+        for name in deleted:
+            self._contents.pop(name, None)
+
+        self._stats = stats
+
+        return bool(changed or deleted)
+
+    def merged(self) -> dict[str, ChangeSet]:
+        """Return the changesets from all files, by MIC. If multiple files contain a changeset for the same MIC, the
+        file that comes last in alphabetical order takes precedence."""
+        result = {}
+
+        for name in sorted(self._contents.keys()):
+            for mic, changes in self._contents[name].items():
+                if mic in result:
+                    log.warning(f"Changeset for exchange {mic} in file {name} overrides previous one.")
+                result[mic] = changes
+
+        return result
+
+    def reload(self) -> dict[str, ChangeSet | None]:
+        """
+        Apply the delta between the current contents of the directory and the changesets that were last applied.
+
+        :return: the applied delta
+        """
+        merged = self.merged()
+        delta = get_delta(self._applied, merged)
+
+        if delta:
+            log.info(f"Applying changes from directory {self.path} for exchanges {', '.join(sorted(delta.keys()))}.")
+            self.apply(delta)
+
+        self._applied = merged
+        self._pending = None
+
+        return delta
+
+    def poll(self) -> dict[str, ChangeSet | None] | None:
+        """
+        Scan the directory once and apply changes if the directory has been stable long enough since the last change.
+
+        :return: the applied delta, or None if changes were not applied
+        """
+        now = time.monotonic()
+
+        if self.scan():
+            self._pending = now
+        elif self._pending is not None and now - self._pending >= self.debounce:
+            return self.reload()
+
+        return None
+
+    async def run(self) -> None:
+        """Poll the directory periodically until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.poll)
+            except Exception:
+                log.exception(f"Failed to reload changes from directory {self.path}.")
@@ -0,0 +1,686 @@
+import asyncio
+import datetime as dt
+import hashlib
+import itertools
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import AsyncIterator, Callable, Mapping, Sequence
+from contextlib import asynccontextmanager
+from typing import Any
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import TypeAdapter
+from starlette.background import BackgroundTask
+
+from .common.compression import CompressionMiddleware
+from .common.etag import matches
+from .common.shards import (
+    merge_classifications,
+    merge_combined_business_days,
+    merge_day_maps,
+    merge_open_mics,
+    partition,
+)
+from .settings import settings
+
+# httpx is an optional dependency, but needed to forward requests to the worker processes.
+try:
+    import httpx
+except ImportError as e:  # pragma: no cover
+    raise ImportError("The front requires httpx to be installed, e.g. via the front extra.") from e
+
+# pyarrow is an optional dependency, only needed to merge exports from multiple shards.
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+    pq = None
+
+log = logging.getLogger(__name__)
+
+# Headers that only apply to a single connection, or that are set anew when a request or response is forwarded.
+_request_hop_by_hop = frozenset({"connection", "keep-alive", "te", "trailer", "transfer-encoding", "upgrade", "host"})
+_request_hop_by_hop |= {"content-length"}
+_response_hop_by_hop = frozenset({"connection", "keep-alive", "te", "trailer", "transfer-encoding", "upgrade"})
+
+# Endpoints that default to the current time, by the name of the respective query parameter. When fanning out, the
+# current time is fixed up front so that all shards answer for the same instant.
+_volatile = {"/v1/open_at": "at", "/v1/next_open_close": "at"}
+
+# Endpoints whose request bodies are lists of queries, each for a single MIC.
+_split = frozenset({"/v1/classify_days", "/v1/trading_minutes"})
+
+# Operations of batch requests, by name, with the HTTP method of the corresponding endpoint.
+_batch_ops = {
+    "mics": "GET",
+    "mic2name": "GET",
+    "timezone": "GET",
+    "special_days": "GET",
+    "classify_day": "GET",
+    "classify_days": "POST",
+    "next_special_days": "GET",
+    "next_business_days": "GET",
+    "combined_business_days": "GET",
+    "open_at": "GET",
+    "next_open_close": "GET",
+    "trading_minutes": "POST",
+    "tagged_days": "GET",
+}
+
+# Operations that return results for all MICs if no MIC is given.
+_all_mics_ops = frozenset(
+    {
+        "mics",
+        "mic2name",
+        "timezone",
+        "classify_day",
+        "next_special_days",
+        "next_business_days",
+        "open_at",
+        "next_open_close",
+        "tagged_days",
+    }
+)
+
+_bool = TypeAdapter(bool)
+
+
+def _get(params: Sequence[tuple[str, str]], name: str, default: str | None = None) -> str | None:
+    # Return the last value of a query parameter, or the default if not given.
+    return next((v for k, v in reversed(params) if k == name), default)
+
+
+def _replace(params: Sequence[tuple[str, str]], name: str, value: str) -> list[tuple[str, str]]:
+    # Replace all values of a query parameter with a single value.
+    return [*((k, v) for k, v in params if k != name), (name, value)]
+
+
+def _restrict(params: Sequence[tuple[str, str]], mics: Sequence[str]) -> list[tuple[str, str]]:
+    # Restrict the MICs in the query parameters, if any, to the given ones.
+    return [(k, v) for k, v in params if k != "mic" or v in mics]
+
+
+def _to_query(params: Mapping[str, Any]) -> list[tuple[str, str]]:
+    # Convert the parameters of a batch sub-query to query parameters.
+    result = []
+
+    for k, v in params.items():
+        for x in v if isinstance(v, list) else [v]:
+            if x is not None:
+                result.append((k, ("true" if x else "false") if isinstance(x, bool) else str(x)))
+
+    return result
+
+
+class Shard:
+    """A worker process that serves the exchange calendars of a subset of MICs."""
+
+    def __init__(self, mics: Sequence[str], uds: str):
+        """
+        :param mics: the MICs served by the worker
+        :param uds: the path of the Unix domain socket the worker listens on
+        """
+        self.mics = tuple(mics)
+        self.uds = uds
+
+        # Workers are local and time out on their own, if at all.
+        self.client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(uds=uds), base_url="http://shard", timeout=None
+        )
+
+
+class ShardRouter:
+    """Routes requests to shards and merges the responses.
+
+    Requests that only refer to MICs of a single shard are passed through to that shard unchanged, including entity tags
+    and content codings. Requests for MICs of multiple shards, or for all MICs, are sent to each shard involved,
+    restricted to the shard's MICs, and the responses are merged. Since each shard is a contiguous slice of the
+    configured MICs, merged responses list MICs in the same order as a single process would. Merged responses carry an
+    entity tag derived from those of the individual shards."""
+
+    def __init__(self, shards: Sequence[Shard]):
+        """
+        :param shards: the shards, in the order of their MICs
+        """
+        self.shards = list(shards)
+        self.mics = tuple(m for s in self.shards for m in s.mics)
+        self._owner = {m: s for s in self.shards for m in s.mics}
+
+        def json(merge: Callable[[list[Any], list[tuple[str, str]]], Any]):
+            # Turn a merge of decoded JSON responses into a merge of responses.
+            return lambda responses, params: JSONResponse(merge([r.json() for r in responses], params))
+
+        def concat(results: list[Any], _) -> Any:
+            return list(itertools.chain.from_iterable(results))
+
+        # How to merge the responses from multiple shards, by path.
+        self._merges: dict[str, Callable[[list[httpx.Response], list[tuple[str, str]]], Response]] = {
+            "/v1/mics": json(concat),
+            "/v1/mic2name": json(lambda x, _: {k: v for y in x for k, v in y.items()}),
+            "/v1/timezone": json(concat),
+            "/v1/classify_day": json(lambda x, _: merge_classifications(x)),
+            "/v1/next_special_days": json(self._merge_next_days),
+            "/v1/next_business_days": json(self._merge_next_days),
+            "/v1/combined_business_days": json(self._merge_combined_business_days),
+            "/v1/open_at": json(lambda x, p: merge_open_mics(x, self._order(p, self.mics))),
+            "/v1/next_open_close": json(self._merge_next_open_close),
+            "/v1/tagged_days": json(lambda x, p: sorted(concat(x, p), key=lambda y: (y["date"], y["mic"]))),
+            "/v1/export": self._merge_export,
+        }
+
+    @staticmethod
+    def _order(params: Sequence[tuple[str, str]], default: Sequence[str]) -> Sequence[str]:
+        # The order of the MICs in a merged response, i.e. as requested, if any.
+        mics = [v for k, v in params if k == "mic"]
+        return mics if mics else default
+
+    def _merge_next_open_close(self, results: list[Any], params: list[tuple[str, str]]) -> Any:
+        position = {m: i for i, m in reversed(list(enumerate(self._order(params, sorted(self.mics)))))}
+        return sorted(itertools.chain.from_iterable(results), key=lambda x: position[x["mic"]])
+
+    @staticmethod
+    def _merge_next_days(results: list[Any], params: list[tuple[str, str]]) -> Any:
+        # Each result is a pair of the days and the status, i.e. 416 if the search did not complete.
+        n = int(_get(params, "n", "1"))
+        forward = _bool.validate_python(_get(params, "forward", "true"))
+        status = max(x[1] for x in results)
+        return [merge_day_maps((x[0] for x in results), n, forward), status]
+
+    @staticmethod
+    def _merge_combined_business_days(results: list[Any], params: list[tuple[str, str]]) -> Any:
+        # For "exactly_one", the results for "any" follow those for the operation itself.
+        op = _get(params, "op", "all")
+        k = len(results) // 2 if op == "exactly_one" else len(results)
+        return merge_combined_business_days(op, results[:k], results[k:])
+
+    @staticmethod
+    def _merge_export(responses: list[httpx.Response], params: list[tuple[str, str]]) -> Response:
+        # Each response is an Arrow IPC stream.
+        if pa is None:
+            return JSONResponse({"detail": "Export requires pyarrow to be installed."}, status_code=501)
+
+        table = pa.concat_tables([pa.ipc.open_stream(r.content).read_all() for r in responses])
+        sink = pa.BufferOutputStream()
+
+        if _get(params, "format", "arrow") == "parquet":
+            pq.write_table(table, sink)
+            return Response(
+                sink.getvalue().to_pybytes(),
+                media_type="application/vnd.apache.parquet",
+                headers={"Content-Disposition": 'attachment; filename="special_days.parquet"'},
+            )
+
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+
+        return Response(sink.getvalue().to_pybytes(), media_type="application/vnd.apache.arrow.stream")
+
+    def _owners(self, mics: Sequence[Any]) -> list[Shard] | None:
+        # Return the shards that serve the given MICs in shard order, all shards if no MICs are given, or None if any of
+        # the MICs is not served at all.
+        if not mics:
+            return list(self.shards)
+
+        if not all(isinstance(m, str) and m in self._owner for m in mics):
+            return None
+
+        owners = {self._owner[m] for m in mics}
+
+        return [s for s in self.shards if s in owners]
+
+    @staticmethod
+    def _response(response: httpx.Response) -> Response:
+        # Convert a complete response from a shard. The content has already been decoded.
+        headers = {
+            k: v
+            for k, v in response.headers.items()
+            if k not in _response_hop_by_hop and k not in ("content-encoding", "content-length")
+        }
+        return Response(response.content, status_code=response.status_code, headers=headers)
+
+    async def _forward(
+        self,
+        shard: Shard,
+        method: str,
+        path: str,
+        params: list[tuple[str, str]],
+        headers: list[tuple[str, str]],
+        body: bytes,
+        stream: bool = True,
+    ) -> Response:
+        # Pass a request through to a single shard. If streaming, pass the response body through as is.
+        request = shard.client.build_request(method, path, params=params, headers=headers, content=body or None)
+        response = await shard.client.send(request, stream=stream)
+
+        if not stream:
+            return self._response(response)
+
+        return StreamingResponse(
+            response.aiter_raw(),
+            status_code=response.status_code,
+            headers={k: v for k, v in response.headers.items() if k not in _response_hop_by_hop},
+            background=BackgroundTask(response.aclose),
+        )
+
+    async def _fan_out(
+        self,
+        shards: list[Shard],
+        method: str,
+        path: str,
+        params: list[tuple[str, str]],
+        headers: list[tuple[str, str]],
+    ) -> Response:
+        # Send a GET or HEAD request to multiple shards, each restricted to its own MICs, and merge the responses. If
+        # the current time is filled in here, the merged response depends on it and must not be tagged, like in a
+        # single process.
+        param = _volatile.get(path)
+        volatile = param is not None and _get(params, param) is None
+        if volatile:
+            params = [*params, (param, dt.datetime.now(tz=dt.timezone.utc).isoformat())]
+
+        requests = [(s, _restrict(params, s.mics)) for s in shards]
+
+        if path == "/v1/combined_business_days" and _get(params, "op") == "exactly_one":
+            requests += [(s, _replace(p, "op", "any")) for s, p in requests]
+        elif path == "/v1/export":
+            requests = [(s, _replace(p, "format", "arrow")) for s, p in requests]
+
+        if_none_match = next((v for k, v in headers if k == "if-none-match"), None)
+        headers = [(k, v) for k, v in headers if k not in ("if-none-match", "accept-encoding")]
+        headers.append(("accept-encoding", "identity"))
+
+        responses = await asyncio.gather(
+            *(s.client.request(method, path, params=p, headers=headers) for s, p in requests)
+        )
+
+        error = next((r for r in responses if r.status_code != 200), None)
+        if error is not None:
+            return self._response(error)
+
+        # Tag the merged response if all shards tagged theirs.
+        etags = [r.headers.get("etag") for r in responses]
+        etag = f'W/"{hashlib.sha1(",".join(etags).encode()).hexdigest()}"' if all(etags) and not volatile else None
+        tag_headers = {"etag": etag, "cache-control": "no-cache"} if etag is not None else {}
+
+        if etag is not None and if_none_match is not None and matches(if_none_match, etag):
+            return Response(status_code=304, headers=tag_headers)
+
+        response = self._merges[path](list(responses), params)
+        response.headers.update(tag_headers)
+
+        return response
+
+    async def _broadcast(
+        self, path: str, params: list[tuple[str, str]], headers: list[tuple[str, str]], body: bytes
+    ) -> Response:
+        # Send an update to all shards. Each shard holds the changesets of all exchanges, but only refreshes the
+        # calendars it serves, so all shards return the same differences.
+        responses = await asyncio.gather(
+            *(s.client.post(path, params=params, headers=headers, content=body) for s in self.shards)
+        )
+
+        error = next((r for r in responses if r.status_code != 200), None)
+
+        return self._response(error if error is not None else responses[0])
+
+    async def _split_queries(
+        self, path: str, params: list[tuple[str, str]], headers: list[tuple[str, str]], body: bytes, stream: bool
+    ) -> Response:
+        # Send the queries in a request body to the shards that serve the respective MICs and reassemble the results in
+        # the original order.
+        try:
+            queries = json.loads(body)
+        except ValueError:
+            queries = None
+
+        if not isinstance(queries, list) or not all(
+            isinstance(q, dict) and isinstance(q.get("mic"), str) and q["mic"] in self._owner for q in queries
+        ):
+            # Let a shard reject the request.
+            return await self._forward(self.shards[0], "POST", path, params, headers, body, stream)
+
+        groups: dict[Shard, list[int]] = {}
+        for i, q in enumerate(queries):
+            groups.setdefault(self._owner[q["mic"]], []).append(i)
+
+        if len(groups) <= 1:
+            shard = next(iter(groups.keys()), self.shards[0])
+            return await self._forward(shard, "POST", path, params, headers, body, stream)
+
+        headers = [(k, v) for k, v in headers if k not in ("accept-encoding", "content-type")]
+        headers.append(("accept-encoding", "identity"))
+
+        responses = await asyncio.gather(
+            *(
+                s.client.post(path, params=params, headers=headers, json=[queries[i] for i in idx])
+                for s, idx in groups.items()
+            )
+        )
+
+        error = next((r for r in responses if r.status_code != 200), None)
+        if error is not None:
+            return self._response(error)
+
+        result = [None] * len(queries)
+        for idx, r in zip(groups.values(), responses):
+            for i, x in zip(idx, r.json()):
+                result[i] = x
+
+        return JSONResponse(result)
+
+    def _batch_owners(self, query: dict[str, Any]) -> list[Shard]:
+        # Return the shards needed to answer a sub-query of a batch request.
+        params = query.get("params") or {}
+        mics = params.get("mic")
+        mics = [mics] if isinstance(mics, str) else list(mics) if isinstance(mics, list) else []
+        queries = params.get("queries")
+        mics += [x.get("mic") for x in queries if isinstance(x, dict)] if isinstance(queries, list) else []
+
+        if mics or query["op"] in _all_mics_ops:
+            return self._owners(mics) or self.shards[:1]
+
+        return self.shards[:1]
+
+    async def _run_batch_query(self, op: str, params: dict[str, Any]) -> dict[str, Any]:
+        # Run a sub-query of a batch request like an individual request and wrap the result.
+        method, path = _batch_ops[op], f"/v1/{op}"
+        headers = [("accept-encoding", "identity")]
+
+        if method == "POST":
+            headers.append(("content-type", "application/json"))
+            response = await self._route(method, path, [], headers, json.dumps(params.get("queries")).encode(), False)
+        else:
+            response = await self._route(method, path, _to_query(params), headers, b"", False)
+
+        data = json.loads(response.body) if response.body else None
+
+        if response.status_code == 200:
+            return {"status": 200, "result": data, "detail": None}
+
+        detail = data.get("detail") if isinstance(data, dict) else None
+
+        if response.status_code == 422 and isinstance(detail, list):
+            # Report validation errors relative to the parameters of the sub-query, like a single process does.
+            locations = {"query": (), "body": ("queries",)}
+            detail = [
+                {
+                    **{k: v for k, v in e.items() if k not in ("ctx", "url")},
+                    "loc": [*locations.get(e["loc"][0], e["loc"][:1]), *e["loc"][1:]],
+                }
+                for e in detail
+            ]
+
+        return {"status": response.status_code, "result": None, "detail": detail}
+
+    async def _batch(
+        self, path: str, params: list[tuple[str, str]], headers: list[tuple[str, str]], body: bytes, stream: bool
+    ) -> Response:
+        # Pass a batch request through to a single shard if possible. Otherwise, run each distinct sub-query like an
+        # individual request. In that case, sub-queries answered by different shards may see different states of the
+        # exchange calendars.
+        try:
+            queries = json.loads(body)
+        except ValueError:
+            queries = None
+
+        if (
+            not isinstance(queries, list)
+            or not all(
+                isinstance(q, dict)
+                and isinstance(q.get("id"), str)
+                and q.get("op") in _batch_ops
+                and isinstance(q.get("params", {}), dict)
+                for q in queries
+            )
+            or len({q["id"] for q in queries}) != len(queries)
+        ):
+            # Let a shard reject the request.
+            return await self._forward(self.shards[0], "POST", path, params, headers, body, stream)
+
+        owners = {s for q in queries for s in self._batch_owners(q)}
+
+        if len(owners) <= 1:
+            shard = next(iter(owners), self.shards[0])
+            return await self._forward(shard, "POST", path, params, headers, body, stream)
+
+        keys = [(q["op"], json.dumps(q.get("params") or {}, sort_keys=True, default=str)) for q in queries]
+        distinct = list(dict.fromkeys(keys))
+
+        results = await asyncio.gather(*(self._run_batch_query(op, json.loads(p)) for op, p in distinct))
+        results = dict(zip(distinct, results))
+
+        return JSONResponse({q["id"]: results[k] for q, k in zip(queries, keys)})
+
+    def _stream_changes(self, params: list[tuple[str, str]], headers: list[tuple[str, str]]) -> StreamingResponse:
+        # Merge the change streams of the shards involved. The id of each event is the list of the last event ids of
+        # all these shards, so that a reconnecting client can catch up on each of them.
+        shards = self._owners([v for k, v in params if k == "mic"]) or self.shards[:1]
+
+        last_event_id = next((v for k, v in headers if k == "last-event-id"), None)
+        ids = last_event_id.split(",") if last_event_id is not None else [None] * len(shards)
+
+        if len(ids) != len(shards):
+            # Not from this set of shards, so that each shard sends a reset event.
+            ids = [last_event_id] * len(shards)
+
+        async def events() -> AsyncIterator[str]:
+            queue: asyncio.Queue[tuple[int, list[str]] | None] = asyncio.Queue()
+
+            async def pump(i: int, shard: Shard):
+                h = {"last-event-id": ids[i]} if ids[i] is not None else {}
+                try:
+                    async with shard.client.stream(
+                        "GET", "/v1/changes/stream", params=_restrict(params, shard.mics), headers=h
+                    ) as r:
+                        lines = []
+                        async for line in r.aiter_lines():
+                            if line:
+                                lines.append(line)
+                            else:
+                                await queue.put((i, lines))
+                                lines = []
+                finally:
+                    # The merged stream ends with any of the streams, so that the client reconnects.
+                    await queue.put(None)
+
+            tasks = [asyncio.create_task(pump(i, s)) for i, s in enumerate(shards)]
+
+            try:
+                while (x := await queue.get()) is not None:
+                    i, lines = x
+                    fields = [line for line in lines if not line.startswith("id:")]
+
+                    for line in lines:
+                        if line.startswith("id:"):
+                            ids[i] = line.removeprefix("id:").strip()
+                            fields.insert(0, f"id: {','.join(y or '' for y in ids)}")
+
+                    yield "\n".join(fields) + "\n\n"
+            finally:
+                for t in tasks:
+                    t.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        return StreamingResponse(
+            events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    async def _route(
+        self,
+        method: str,
+        path: str,
+        params: list[tuple[str, str]],
+        headers: list[tuple[str, str]],
+        body: bytes,
+        stream: bool = True,
+    ) -> Response:
+        if method == "POST" and path == "/update":
+            return await self._broadcast(path, params, headers, body)
+
+        if method == "POST" and path in _split:
+            return await self._split_queries(path, params, headers, body, stream)
+
+        if method == "POST" and path == "/v1/batch":
+            return await self._batch(path, params, headers, body, stream)
+
+        if method == "GET" and path == "/v1/changes/stream":
+            return self._stream_changes(params, headers)
+
+        shards = self._owners([v for k, v in params if k == "mic"])
+
+        if method in ("GET", "HEAD") and path in self._merges and shards is not None and len(shards) > 1:
+            return await self._fan_out(shards, method, path, params, headers)
+
+        # A single shard, or a request that any shard can answer or reject.
+        return await self._forward(shards[0] if shards else self.shards[0], method, path, params, headers, body, stream)
+
+    async def route(self, request: Request) -> Response:
+        """
+        Route a request to the shards and return the response.
+
+        :param request: the request
+        :return: the response
+        """
+        headers = [(k, v) for k, v in request.headers.items() if k not in _request_hop_by_hop]
+        body = await request.body()
+
+        return await self._route(request.method, request.url.path, request.query_params.multi_items(), headers, body)
+
+
+class WorkerPool:
+    """Worker processes that each serve the exchange calendars of one shard.
+
+    Each worker runs the app in module app, configured with only the exchanges of its shard and otherwise inheriting the
+    environment, and listens on a Unix domain socket in a temporary directory."""
+
+    def __init__(self, exchanges: Mapping[str, str], n: int, env: Mapping[str, str] | None = None):
+        """
+        :param exchanges: the names of the exchanges to serve, by MIC
+        :param n: the number of worker processes
+        :param env: additional environment variables for the worker processes
+        """
+        self.exchanges = dict(exchanges)
+        self.n = n
+        self.env = dict(env or {})
+        self.shards: list[Shard] = []
+        self._processes: list[subprocess.Popen] = []
+        self._dir: str | None = None
+
+    async def start(self, timeout: float) -> list[Shard]:
+        """
+        Start the worker processes and wait until all of them serve requests.
+
+        :param timeout: the maximum time to wait, in seconds
+        :return: the shards, in the order of their MICs
+        """
+        self._dir = tempfile.mkdtemp(prefix="exchange-calendar-service-")
+
+        for i, mics in enumerate(partition(sorted(self.exchanges), self.n)):
+            path = os.path.join(self._dir, f"shard-{i}.sock")
+            exchanges = json.dumps({m: self.exchanges[m] for m in mics})
+
+            self._processes.append(
+                subprocess.Popen(
+                    [sys.executable, "-m", "uvicorn", "--factory", "--uds", path, f"{__package__}.app:app"],
+                    env={**os.environ, **self.env, "EXCHANGE_CALENDAR_SERVICE_EXCHANGES": exchanges},
+                )
+            )
+
+            self.shards.append(Shard(mics, path))
+
+        deadline = time.monotonic() + timeout
+        await asyncio.gather(*(self._wait(s, p, deadline) for s, p in zip(self.shards, self._processes)))
+
+        log.info(f"Started {len(self.shards)} worker processes.")
+
+        return self.shards
+
+    @staticmethod
+    async def _wait(shard: Shard, process: subprocess.Popen, deadline: float) -> None:
+        # Wait until the worker process serves requests.
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"Worker process for {', '.join(shard.mics)} exited with code {process.returncode}.")
+
+            try:
+                if (await shard.client.get("/v1/mics")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Worker process for {', '.join(shard.mics)} did not start in time.")
+
+            await asyncio.sleep(0.1)
+
+    async def stop(self) -> None:
+        """Stop all worker processes."""
+        for p in self._processes:
+            p.terminate()
+
+        for p in self._processes:
+            try:
+                await asyncio.to_thread(p.wait, 10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+        for s in self.shards:
+            await s.client.aclose()
+
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+
+        self.shards, self._processes, self._dir = [], [], None
+
+
+def front_app(pool: WorkerPool, timeout: float = 300.0) -> FastAPI:
+    """
+    Create the front app that routes requests to the worker processes of a pool.
+
+    :param pool: the worker pool, started and stopped with the app
+    :param timeout: the maximum time to wait for the worker processes to start up, in seconds
+    :return: the app
+    """
+    router: ShardRouter | None = None
+
+    @asynccontextmanager
+    async def lifespan(_: FastAPI):
+        nonlocal router
+
+        try:
+            router = ShardRouter(await pool.start(timeout))
+            yield
+        finally:
+            await pool.stop()
+
+    # The OpenAPI document and the docs are served by the workers.
+    app = FastAPI(lifespan=lifespan, openapi_url=None, docs_url=None, redoc_url=None)
+
+    # Compress merged responses. Responses passed through are compressed by the workers already, as negotiated.
+    app.add_middleware(
+        CompressionMiddleware,
+        get_version=lambda: "",
+        prefix="/v1/",
+        exclude={"/v1/changes/stream"},
+        min_size=settings.compression_min_size,
+        cache_size=0,
+    )
+
+    @app.api_route("/{path:path}", methods=["GET", "HEAD", "POST"], include_in_schema=False)
+    async def route(request: Request) -> Response:
+        return await router.route(request)
+
+    return app
+
+
+def app() -> FastAPI:
+    # Partition the exchanges across worker processes.
+    return front_app(WorkerPool(settings.exchanges, settings.shards), timeout=settings.shards_startup_timeout)
@@ -0,0 +1,46 @@
+import importlib
+import inspect
+
+from .settings import Settings
+
+
+def run_init(settings: Settings) -> None:
+    """
+    Import and call the customization given in settings.init, if any.
+
+    The value must be of the form module:callable, or module: to just import the module. The callable must be a
+    function that takes exactly one argument, the settings.
+
+    :param settings: the settings
+    """
+    # If settings.init is not None, try to import it. Once imported. check if it is a callable with one argument.
+    # If so, call it. Otherwise, raise an Exception and exit. Use importlib to import the callable.
+    if not settings.init:
+        return
+
+    # Split into module and callable name.
+    module_name, callable_name = settings.init.rsplit(":", 1)
+
+    if not callable_name:
+        _ = importlib.import_module(module_name)
+    else:
+        # Import the module.
+        module = importlib.import_module(module_name)
+
+        # Get the callable.
+        init = getattr(module, callable_name)
+
+        # Check if it is callable.
+        if not callable(init):
+            raise ValueError(f"{settings.init} is not callable.")
+
+        # Check if it is a function.
+        if not inspect.isfunction(init):
+            raise ValueError(f"{settings.init} is not a function.")
+
+        # Check if it has exactly one argument.
+        if len(inspect.signature(init).parameters) != 1:
+            raise ValueError(f"{settings.init} does not have exactly one argument.")
+
+        # Call the callable.
+        init(settings)
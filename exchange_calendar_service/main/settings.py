@@ -1,5 +1,14 @@
+import os
+
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
-import exchange_calendars as ec
+
+
+def _all_exchanges() -> dict[str, str]:
+    # Only import exchange_calendars if the exchanges are not configured explicitly.
+    import exchange_calendars as ec
+
+    return {x: x for x in ec.calendar_utils.get_calendar_names(include_aliases=False)}
 
 
 class Settings(BaseSettings):
@@ -14,8 +23,55 @@ class Settings(BaseSettings):
     # The optional full name of callable.
     init: str | None = None
 
+    # The optional path to a SQLite database that journals changesets received via the update endpoint. If set, the
+    # journaled changesets are applied at startup.
+    journal: str | None = None
+
+    # The optional path to a directory of changeset files in JSON or YAML format. If set, the files are applied at
+    # startup and the directory is watched for changes.
+    changes_dir: str | None = None
+
+    # The interval at which to poll the changeset directory, in seconds.
+    changes_dir_interval: float = 1.0
+
+    # The time the changeset directory must be stable after a change before changes are applied, in seconds.
+    changes_dir_debounce: float = 0.5
+
+    # The number of change notifications to retain for subscribers of the change stream that reconnect.
+    changes_stream_history: int = 1000
+
+    # The interval at which to send keep-alive comments to idle subscribers of the change stream, in seconds.
+    changes_stream_keepalive: float = 15.0
+
+    # The minimum size of a response body to compress, in bytes.
+    compression_min_size: int = 1024
+
+    # The maximum total size of cached responses, raw and compressed, in bytes. Set to 0 to disable the cache.
+    response_cache_size: int = 64 * 1024 * 1024
+
+    # Whether to hand off log records to background threads via queues, so that logging never blocks request handling.
+    log_queue: bool = True
+
+    # Whether to format log records as JSON objects.
+    log_json: bool = False
+
+    # Whether to build each calendar on first use instead of all calendars at startup. Calendars that have not been used
+    # yet are then built in the background after startup.
+    lazy_calendars: bool = False
+
+    # The number of previous versions of the calendars to retain for point-in-time queries. Only calendars that have
+    # changed since a version take up additional memory. Set to 0 to only serve the current version.
+    calendar_versions: int = 10
+
+    # The number of worker processes to partition the exchanges across when served by the front app in module front.
+    # Each worker only builds the calendars of its own shard. Defaults to the number of CPUs.
+    shards: int = Field(default_factory=lambda: os.cpu_count() or 1)
+
+    # The maximum time to wait for all worker processes to start up, in seconds.
+    shards_startup_timeout: float = 300.0
+
     # The available exchanges.
-    exchanges: dict[str, str] = {x: x for x in ec.calendar_utils.get_calendar_names(include_aliases=False)}
+    exchanges: dict[str, str] = Field(default_factory=_all_exchanges)
 
 
 settings = Settings()
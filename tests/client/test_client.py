@@ -0,0 +1,110 @@
+import asyncio
+import datetime as dt
+
+import httpx
+import pytest
+
+from exchange_calendar_service.client import AsyncExchangeCalendarClient
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Transport that forwards to the app and records all requests and response status codes."""
+
+    def __init__(self, app):
+        self.transport = httpx.ASGITransport(app=app)
+        self.requests: list[tuple[httpx.Request, int]] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.transport.handle_async_request(request)
+        self.requests.append((request, response.status_code))
+        return response
+
+
+@pytest.fixture
+def transport() -> RecordingTransport:
+    from exchange_calendar_service.main.app import app
+
+    return RecordingTransport(app())
+
+
+class TestAsyncExchangeCalendarClient:
+    def test_endpoints(self, transport):
+        """This test verifies that the client returns the decoded responses of the service."""
+
+        async def run():
+            async with AsyncExchangeCalendarClient("http://test", transport=transport) as client:
+                assert await client.mics() == ["XAMS", "XLON", "XSWX"]
+                special_days = await client.special_days("XLON", 2021)
+                assert {
+                    "date": "2021-12-27",
+                    "type": "holiday",
+                    "is_business_day": False,
+                    "name": "Weekend Christmas",
+                } in special_days
+                days, status = await client.next_business_days(dt.date(2021, 12, 24), mic=["XLON"], n=2)
+                assert [x["date"] for x in days] == ["2021-12-24", "2021-12-29"]
+                assert status == 200
+                sessions = await client.sessions("XLON", dt.date(2021, 12, 31), dt.date(2021, 12, 31))
+                assert sessions == [
+                    {
+                        "date": "2021-12-31",
+                        "open": "2021-12-31T08:00:00+00:00",
+                        "close": "2021-12-31T12:30:00+00:00",
+                        "break_start": None,
+                        "break_end": None,
+                    }
+                ]
+
+        asyncio.run(run())
+
+    def test_batch(self, transport):
+        """This test verifies that the client runs multiple sub-queries in a single request."""
+
+        async def run():
+            async with AsyncExchangeCalendarClient("http://test", transport=transport) as client:
+                results = await client.batch(
+                    {"mics": ("mics", {}), "day": ("classify_day", {"day": dt.date(2021, 12, 27), "mic": "XLON"})}
+                )
+                assert results["mics"]["result"] == ["XAMS", "XLON", "XSWX"]
+                assert results["day"]["result"]["type"] == "holiday"
+                assert len(transport.requests) == 1
+
+        asyncio.run(run())
+
+    def test_cache(self, transport):
+        """This test verifies that responses are served from the local cache within max_age and are revalidated with
+        If-None-Match afterwards."""
+
+        async def run():
+            async with AsyncExchangeCalendarClient("http://test", transport=transport, max_age=60) as client:
+                first = await client.special_days("XLON", 2021)
+                assert await client.special_days("XLON", 2021) is first
+                assert len(transport.requests) == 1
+
+                client.max_age = 0
+                assert await client.special_days("XLON", 2021) is first
+                assert len(transport.requests) == 2
+
+                request, status = transport.requests[-1]
+                assert request.headers["if-none-match"].startswith('W/"')
+                assert status == 304
+
+        asyncio.run(run())
+
+    def test_batching(self, transport):
+        """This test verifies that concurrent single-day classifications are sent in a single batch request."""
+        days = [dt.date(2021, 12, 20) + dt.timedelta(days=i) for i in range(14)]
+
+        async def run():
+            async with AsyncExchangeCalendarClient("http://test", transport=transport) as client:
+                results = await asyncio.gather(*(client.classify_day(d, m) for d in days for m in ("XLON", "XSWX")))
+
+                assert len(transport.requests) == 1
+                assert transport.requests[0][0].url.path == "/v1/classify_days"
+
+                expected = [(await client.classify_day(d), d, m) for d in days for m in ("XLON", "XSWX")]
+                for r, (c, d, m) in zip(results, expected):
+                    assert r["date"] == d.isoformat()
+                    assert any(x["type"] == r["type"] and m in x["mics"] for x in c)
+
+        asyncio.run(run())
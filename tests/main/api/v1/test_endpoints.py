@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from http import HTTPStatus
 import datetime as dt
@@ -7,8 +8,11 @@ from .special_days import special_days
 
 from exchange_calendar_service.main.api.v1.endpoints import (
     DayClassification,
+    Session,
     SpecialOpenCloseDayClassification,
+    iter_change_events,
 )
+from exchange_calendar_service.main.common.feed import ChangeEvent, ChangeFeed
 
 
 @pytest.mark.usefixtures("client")
@@ -27,6 +31,15 @@ class TestVenues:
         assert response.headers["content-type"] == "application/json"
         assert response.json() == {x: y for x, y in settings.exchanges.items()}
 
+    def test_unsupported_mic(self, client):
+        """This test verifies that unsupported MICs are rejected in query parameters and request bodies."""
+        response = client.get("/v1/special_days", params={"mic": "XNYS", "year": 2021})
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+        assert response.json()["detail"][0]["loc"] == ["query", "mic"]
+
+        response = client.post("/v1/classify_days", json=[{"day": "2021-12-24", "mic": "XNYS"}])
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
     def test_get_timezones(self, client, settings):
         """This test verifies that the GET /v1/timezones endpoint returns the correct timezone or standard time for
         each exchange.
@@ -124,3 +137,452 @@ class TestSpecialDays:
         assert response.status_code == HTTPStatus.OK
         assert response.headers["content-type"] == "application/json"
         assert ta.validate_json(response.text) == expected
+
+
+class TestCombinedBusinessDays:
+    @pytest.mark.parametrize(
+        "op, expected",
+        [
+            ("all", ["2021-12-20", "2021-12-21", "2021-12-22", "2021-12-23", "2021-12-29", "2021-12-30"]),
+            (
+                "any",
+                [
+                    "2021-12-20",
+                    "2021-12-21",
+                    "2021-12-22",
+                    "2021-12-23",
+                    "2021-12-24",
+                    "2021-12-27",
+                    "2021-12-28",
+                    "2021-12-29",
+                    "2021-12-30",
+                    "2021-12-31",
+                ],
+            ),
+            ("exactly_one", ["2021-12-24", "2021-12-27", "2021-12-28", "2021-12-31"]),
+        ],
+    )
+    def test_combined_business_days(self, client, op: str, expected: list[str]):
+        """This test verifies that the GET /v1/combined_business_days endpoint correctly combines the business days of
+        multiple exchanges."""
+        response = client.get(
+            "/v1/combined_business_days",
+            params={"mic": ["XLON", "XSWX"], "op": op, "start": "2021-12-18", "end": "2021-12-31"},
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == expected
+
+    def test_combined_business_days_out_of_range(self, client):
+        """This test verifies that the GET /v1/combined_business_days endpoint rejects periods outside the supported
+        range of years."""
+        response = client.get("/v1/combined_business_days", params={"mic": ["XLON"], "start": "1900-01-01"})
+        assert response.status_code == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+
+
+class TestClassifyDay:
+    @pytest.mark.parametrize("day", ["2021-12-24", "2021-12-25", "2021-12-29"])
+    def test_classify_day_all_mics(self, client, settings, day: str):
+        """This test verifies that the GET /v1/classify_day endpoint without a MIC returns the same classifications as
+        classifying the day for each exchange individually, grouped by classification."""
+        response = client.get("/v1/classify_day", params={"day": day})
+        assert response.status_code == HTTPStatus.OK
+
+        expected = {}
+        for mic in sorted(settings.exchanges.keys()):
+            c = client.get("/v1/classify_day", params={"day": day, "mic": mic}).json()
+            expected.setdefault(tuple(sorted(c.items())), []).append(mic)
+
+        assert response.json() == [{**dict(c), "mics": mics} for c, mics in expected.items()]
+
+    def test_classify_day_special_close(self, client):
+        """This test verifies that the GET /v1/classify_day endpoint returns the special close time for a MIC."""
+        response = client.get("/v1/classify_day", params={"day": "2021-12-24", "mic": "XLON", "tz": "UTC"})
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == {
+            "date": "2021-12-24",
+            "type": "special close",
+            "is_business_day": True,
+            "name": "Christmas Eve",
+            "time": "12:30:00",
+            "tz": "UTC",
+        }
+
+
+class TestSessions:
+    @pytest.mark.parametrize("timezone", [None, "UTC", "Europe/Berlin"])
+    def test_sessions(self, client, timezone: str):
+        """This test verifies that the GET /v1/sessions endpoint returns the correct sessions, including special closes
+        and changes of the UTC offset."""
+        params = {"mic": "XLON", "start": "2021-03-24", "end": "2021-03-29"}
+
+        if timezone is not None:
+            params["tz"] = timezone
+
+        response = client.get("/v1/sessions", params=params)
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["content-type"] == "application/json"
+
+        utc = ZoneInfo("UTC")
+        assert TypeAdapter(list[Session]).validate_json(response.text) == [
+            Session(
+                date=dt.date(2021, 3, d),
+                open=dt.datetime(2021, 3, d, o, tzinfo=utc),
+                close=dt.datetime(2021, 3, d, c, 30, tzinfo=utc),
+            )
+            for d, o, c in [(24, 8, 16), (25, 8, 16), (26, 8, 16), (29, 7, 15)]
+        ]
+
+    def test_sessions_special_close(self, client):
+        """This test verifies that the GET /v1/sessions endpoint returns the special close time on special close
+        days."""
+        response = client.get("/v1/sessions", params={"mic": "XLON", "start": "2021-12-24", "end": "2021-12-24"})
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == [
+            {
+                "date": "2021-12-24",
+                "open": "2021-12-24T08:00:00+00:00",
+                "close": "2021-12-24T12:30:00+00:00",
+                "break_start": None,
+                "break_end": None,
+            }
+        ]
+
+
+class TestOpenAt:
+    def test_open_at(self, client):
+        """This test verifies that the GET /v1/open_at endpoint returns the exchanges in session at the given
+        instants, both within and outside the window of the precomputed index."""
+        at = [
+            "2021-12-24T10:00:00Z",
+            "2021-12-24T13:00:00+00:00",
+            "2021-12-27T10:00:00",
+            "2021-12-25T10:00:00Z",
+            dt.datetime(dt.date.today().year + 1, 1, 1, 12, tzinfo=ZoneInfo("UTC")).isoformat(),
+        ]
+        response = client.get("/v1/open_at", params={"at": at})
+        assert response.status_code == HTTPStatus.OK
+        assert [x["mics"] for x in response.json()] == [["XAMS", "XLON"], ["XAMS"], ["XAMS", "XSWX"], [], []]
+
+    def test_open_at_mics(self, client):
+        """This test verifies that the GET /v1/open_at endpoint restricts the result to the given MICs."""
+        response = client.get("/v1/open_at", params={"at": "2021-12-24T10:00:00Z", "mic": ["XLON", "XSWX"]})
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == [{"at": "2021-12-24T10:00:00Z", "mics": ["XLON"]}]
+
+
+class TestNextOpenClose:
+    def test_next_open_close(self, client):
+        """This test verifies that the GET /v1/next_open_close endpoint returns the next open and close instants and
+        the time remaining until each of them."""
+        response = client.get(
+            "/v1/next_open_close", params={"at": "2021-12-24T10:00:00Z", "mic": ["XLON", "XSWX"], "tz": "UTC"}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == [
+            {
+                "mic": "XLON",
+                "is_open": True,
+                "next_open": "2021-12-29T08:00:00Z",
+                "next_close": "2021-12-24T12:30:00Z",
+                "time_to_open": "P4DT22H",
+                "time_to_close": "PT2H30M",
+            },
+            {
+                "mic": "XSWX",
+                "is_open": False,
+                "next_open": "2021-12-27T08:00:00Z",
+                "next_close": "2021-12-27T16:30:00Z",
+                "time_to_open": "P2DT22H",
+                "time_to_close": "P3DT6H30M",
+            },
+        ]
+
+
+class TestTradingMinutes:
+    def test_trading_minutes(self, client):
+        """This test verifies that the POST /v1/trading_minutes endpoint returns the number of trading minutes
+        between pairs of instants, taking into account special closes and holidays."""
+        queries = [
+            # Regular session, 08:00 to 16:30 UTC.
+            {"mic": "XLON", "start": "2021-12-23T00:00:00Z", "end": "2021-12-24T00:00:00Z"},
+            # Partial session.
+            {"mic": "XLON", "start": "2021-12-23T16:00:00Z", "end": "2021-12-23T18:00:00Z"},
+            # Special close on 2021-12-24 at 12:30 and holidays on 2021-12-27 and 2021-12-28.
+            {"mic": "XLON", "start": "2021-12-24T00:00:00Z", "end": "2021-12-29T00:00:00Z"},
+            # Holiday on 2021-12-24.
+            {"mic": "XSWX", "start": "2021-12-24T00:00:00", "end": "2021-12-25T00:00:00"},
+            # Reversed.
+            {"mic": "XLON", "start": "2021-12-24T00:00:00Z", "end": "2021-12-23T00:00:00Z"},
+        ]
+        response = client.post("/v1/trading_minutes", json=queries)
+        assert response.status_code == HTTPStatus.OK
+        assert [x["minutes"] for x in response.json()] == [510.0, 30.0, 270.0, 0.0, -510.0]
+        assert [x["mic"] for x in response.json()] == [x["mic"] for x in queries]
+
+
+@pytest.fixture
+def meta(client):
+    import exchange_calendars_extensions.core as ecx_core
+    from exchange_calendar_service.main.common.context import Context
+
+    # Tag 2021-12-29 as a bad date for XLON.
+    ecx_core.update_calendar("XLON", {"meta": {"2021-12-29": {"tags": ["bad date"], "comment": "Outage."}}})
+    ecx_core.update_calendar("XSWX", {"meta": {"2021-12-27": {"tags": ["bad date", "other"]}}})
+    Context().cache.refresh("XLON")
+    Context().cache.refresh("XSWX")
+
+    yield
+
+    ecx_core.reset_calendar("XLON")
+    ecx_core.reset_calendar("XSWX")
+    Context().cache.refresh("XLON")
+    Context().cache.refresh("XSWX")
+
+
+class TestNextSpecialDays:
+    @pytest.mark.parametrize("forward", [True, False])
+    def test_range(self, client, forward: bool):
+        """This test verifies that the GET /v1/next_special_days endpoint only returns days within the given range."""
+        params = {"mic": "XLON", "n": 5, "range": 7, "types": "holiday", "forward": forward}
+        params["day"] = "2021-12-20" if forward else "2022-01-04"
+
+        response = client.get("/v1/next_special_days", params=params)
+        assert response.status_code == HTTPStatus.OK
+        days, status = response.json()
+        assert status == HTTPStatus.OK
+        assert [x["date"] for x in days] == (["2021-12-27"] if forward else ["2022-01-03", "2021-12-28"])
+
+
+class TestSkipBadDates:
+    @pytest.mark.parametrize("forward", [True, False])
+    @pytest.mark.usefixtures("meta")
+    def test_skip_bad_dates(self, client, forward: bool):
+        """This test verifies that the GET /v1/next_business_days endpoint skips days tagged as bad dates, if
+        requested."""
+        params = {"mic": "XLON", "n": 3, "forward": forward, "day": "2021-12-23" if forward else "2021-12-31"}
+
+        def get_dates(skip_bad_dates: bool) -> list[str]:
+            response = client.get("/v1/next_business_days", params={**params, "skip_bad_dates": skip_bad_dates})
+            assert response.status_code == HTTPStatus.OK
+            days, status = response.json()
+            assert status == HTTPStatus.OK
+            return [x["date"] for x in days]
+
+        if forward:
+            assert get_dates(False) == ["2021-12-23", "2021-12-24", "2021-12-29"]
+            assert get_dates(True) == ["2021-12-23", "2021-12-24", "2021-12-30"]
+        else:
+            assert get_dates(False) == ["2021-12-31", "2021-12-30", "2021-12-29"]
+            assert get_dates(True) == ["2021-12-31", "2021-12-30", "2021-12-24"]
+
+
+@pytest.mark.usefixtures("meta")
+class TestTaggedDays:
+    def test_tagged_days(self, client):
+        """This test verifies that the GET /v1/tagged_days endpoint returns all days with a given tag across
+        exchanges."""
+        response = client.get("/v1/tagged_days", params={"tag": "bad date"})
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == [
+            {"date": "2021-12-27", "mic": "XSWX", "tags": ["bad date", "other"], "comment": None},
+            {"date": "2021-12-29", "mic": "XLON", "tags": ["bad date"], "comment": "Outage."},
+        ]
+
+    @pytest.mark.parametrize(
+        "params, expected",
+        [
+            ({"tag": "other"}, [("XSWX", "2021-12-27")]),
+            ({"tag": "bad date", "mic": ["XLON", "XAMS"]}, [("XLON", "2021-12-29")]),
+            ({"tag": "bad date", "start": "2021-12-28"}, [("XLON", "2021-12-29")]),
+            ({"tag": "bad date", "end": "2021-12-28"}, [("XSWX", "2021-12-27")]),
+            ({"tag": "unknown"}, []),
+        ],
+    )
+    def test_tagged_days_filtered(self, client, params: dict, expected: list[tuple[str, str]]):
+        """This test verifies that the GET /v1/tagged_days endpoint filters by tag, MICs and period."""
+        response = client.get("/v1/tagged_days", params=params)
+        assert response.status_code == HTTPStatus.OK
+        assert [(x["mic"], x["date"]) for x in response.json()] == expected
+
+
+class TestExport:
+    @pytest.mark.parametrize("format", ["arrow", "parquet"])
+    def test_export(self, client, format: str):
+        """This test verifies that the GET /v1/export endpoint returns the same special days as the GET
+        /v1/special_days endpoint, as a table."""
+        pa = pytest.importorskip("pyarrow")
+
+        response = client.get("/v1/export", params={"format": format, "mic": ["XLON", "XSWX"], "year": [2021, 2022]})
+        assert response.status_code == HTTPStatus.OK
+
+        if format == "arrow":
+            assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+            table = pa.ipc.open_stream(response.content).read_all()
+        else:
+            import pyarrow.parquet as pq
+
+            assert response.headers["content-type"] == "application/vnd.apache.parquet"
+            table = pq.read_table(pa.BufferReader(response.content))
+
+        rows = table.to_pylist()
+
+        for mic in ("XLON", "XSWX"):
+            for year in (2021, 2022):
+                expected = ta.validate_json(client.get("/v1/special_days", params={"mic": mic, "year": year}).text)
+                actual = [x for x in rows if x["mic"] == mic and x["date"].year == year]
+                assert [(x["date"], x["type"], x["is_business_day"], x["name"], x["time"]) for x in actual] == [
+                    (x.date, x.type.value, x.is_business_day, x.name, getattr(x, "time", None)) for x in expected
+                ]
+
+    def test_export_types(self, client):
+        """This test verifies that the GET /v1/export endpoint filters by type."""
+        pa = pytest.importorskip("pyarrow")
+
+        response = client.get("/v1/export", params={"mic": "XLON", "types": ["special close"], "year": 2021})
+        assert response.status_code == HTTPStatus.OK
+        rows = pa.ipc.open_stream(response.content).read_all().to_pylist()
+        assert [(x["date"], x["time"]) for x in rows] == [
+            (dt.date(2021, 12, 24), dt.time(12, 30)),
+            (dt.date(2021, 12, 31), dt.time(12, 30)),
+        ]
+
+
+class TestBatch:
+    def test_batch(self, client):
+        """This test verifies that the POST /v1/batch endpoint returns the same results as the individual endpoints."""
+        queries = [
+            ("mics", "mics", {}, "/v1/mics"),
+            ("names", "mic2name", {}, "/v1/mic2name"),
+            ("tz", "timezone", {"mic": "XLON"}, "/v1/timezone"),
+            ("xlon", "special_days", {"mic": "XLON", "year": 2021}, "/v1/special_days"),
+            ("xswx", "special_days", {"mic": "XSWX", "year": 2021, "tz": "UTC"}, "/v1/special_days"),
+            (
+                "next",
+                "next_business_days",
+                {"day": "2021-12-24", "mic": ["XLON", "XSWX"], "n": 3},
+                "/v1/next_business_days",
+            ),
+        ]
+
+        response = client.post("/v1/batch", json=[{"id": i, "op": op, "params": p} for i, op, p, _ in queries])
+        assert response.status_code == HTTPStatus.OK
+        results = response.json()
+
+        assert list(results.keys()) == [i for i, *_ in queries]
+
+        for i, _, params, path in queries:
+            assert results[i]["status"] == HTTPStatus.OK
+            assert results[i]["result"] == client.get(path, params=params).json()
+
+    def test_batch_errors(self, client):
+        """This test verifies that the POST /v1/batch endpoint reports errors per sub-query."""
+        response = client.post(
+            "/v1/batch",
+            json=[
+                {"id": "invalid", "op": "special_days", "params": {"mic": "XXXX"}},
+                {"id": "range", "op": "combined_business_days", "params": {"mic": ["XLON"], "start": "1800-01-01"}},
+                {"id": "valid", "op": "classify_day", "params": {"day": "2021-12-27", "mic": "XLON"}},
+            ],
+        )
+        assert response.status_code == HTTPStatus.OK
+        results = response.json()
+        assert results["invalid"]["status"] == HTTPStatus.UNPROCESSABLE_ENTITY
+        assert results["range"]["status"] == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+        assert results["valid"]["status"] == HTTPStatus.OK
+        assert results["valid"]["result"]["type"] == "holiday"
+
+        response = client.post("/v1/batch", json=[{"id": "a", "op": "mics"}, {"id": "a", "op": "mic2name"}])
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+    def test_batch_deduplication(self, client, mocker):
+        """This test verifies that identical sub-queries are only run once."""
+        from exchange_calendar_service.main.common.context import Context
+
+        spy = mocker.spy(Context().engine, "special_days")
+
+        response = client.post(
+            "/v1/batch",
+            json=[
+                {"id": "a", "op": "special_days", "params": {"mic": "XLON", "year": 2021}},
+                {"id": "b", "op": "special_days", "params": {"year": 2021, "mic": "XLON"}},
+            ],
+        )
+        assert response.status_code == HTTPStatus.OK
+        results = response.json()
+        assert results["a"] == results["b"]
+        assert spy.call_count == 1
+
+    def test_batch_consistency(self, client, mocker):
+        """This test verifies that all sub-queries see the same state of the calendars, even if the calendars change
+        while the sub-queries run."""
+        from exchange_calendars_extensions.api.changes import ChangeSet
+
+        from exchange_calendar_service.main.common.changes import apply_delta
+        from exchange_calendar_service.main.common.context import Context
+
+        engine = Context().engine
+        classify_day = engine.classify_day
+        changes = ChangeSet.model_validate({"add": {"2021-12-23": {"type": "holiday", "name": "Foo"}}})
+
+        # Whether the next call is the first sub-query of a batch.
+        first = [True]
+
+        def update_once(*args, **kwargs):
+            # Add a holiday while the first sub-query runs.
+            if first[0]:
+                first[0] = False
+                apply_delta({"XLON": changes})
+            return classify_day(*args, **kwargs)
+
+        mocker.patch.object(engine, "classify_day", side_effect=update_once)
+
+        queries = [
+            {"id": "a", "op": "classify_day", "params": {"day": "2021-12-23", "mic": "XLON"}},
+            {"id": "b", "op": "classify_day", "params": {"day": "2021-12-23", "mic": "XLON", "tz": "UTC"}},
+        ]
+
+        try:
+            response = client.post("/v1/batch", json=queries)
+            assert response.status_code == HTTPStatus.OK
+            assert [x["result"]["type"] for x in response.json().values()] == ["regular", "regular"]
+
+            # Fail if the previous version is not retained.
+            apply_delta({"XLON": None})
+            first[0] = True
+            as_of = engine.as_of
+
+            def not_retained(version=None, time=None):
+                if version is not None:
+                    raise LookupError()
+                return as_of(version, time)
+
+            mocker.patch.object(engine, "as_of", side_effect=not_retained)
+
+            response = client.post("/v1/batch", json=queries)
+            assert response.status_code == HTTPStatus.CONFLICT
+        finally:
+            apply_delta({"XLON": None})
+
+
+class TestChangeStream:
+    def test_iter_change_events(self):
+        """Test that feed events are serialized as server-sent events, restricted to the requested MICs."""
+        feed = ChangeFeed()
+        feed.publish(ChangeEvent(version="v1", mics=["XLON", "XNYS"], ranges={"XLON": [], "XNYS": []}))
+        feed.publish(ChangeEvent(version="v2", mics=["XNYS"], ranges={"XNYS": []}))
+        feed.publish(ChangeEvent(version="v3", mics=["XLON"], ranges={"XLON": []}))
+
+        async def take(n, last_event_id):
+            it = iter_change_events(feed, lambda: "v3", last_event_id, mics={"XLON"}, keepalive=0.01)
+            return [await anext(it) for _ in range(n)]
+
+        assert asyncio.run(take(3, feed.event_id(0))) == [
+            f'id: {feed.event_id(1)}\nevent: change\ndata: {{"version":"v1","mics":["XLON"],"ranges":{{"XLON":[]}}}}\n\n',
+            f'id: {feed.event_id(3)}\nevent: change\ndata: {{"version":"v3","mics":["XLON"],"ranges":{{"XLON":[]}}}}\n\n',
+            ": keep-alive\n\n",
+        ]
+
+        assert asyncio.run(take(1, "foo")) == [f'id: {feed.event_id(3)}\nevent: reset\ndata: {{"version": "v3"}}\n\n']
+
+        # New subscribers receive the current event id first.
+        assert asyncio.run(take(1, None)) == [f"id: {feed.event_id(3)}\n\n"]
@@ -0,0 +1,58 @@
+import datetime as dt
+
+from exchange_calendars_extensions.api.changes import ChangeSet
+
+from exchange_calendar_service.main.common.changes import ChangeSetDiff, SectionDiff, diff_changesets, get_delta
+
+prev = ChangeSet.model_validate(
+    {
+        "add": {
+            "2021-12-23": {"type": "holiday", "name": "a"},
+            "2021-12-24": {"type": "holiday", "name": "b"},
+        },
+        "remove": ["2021-12-27"],
+        "meta": {"2021-12-29": {"tags": ["bad date"]}},
+    }
+)
+
+new = ChangeSet.model_validate(
+    {
+        "add": {
+            "2021-12-23": {"type": "holiday", "name": "modified"},
+            "2021-12-30": {"type": "special_close", "name": "c", "time": "12:00"},
+        },
+        "remove": ["2021-12-27", "2021-12-28"],
+        "meta": {"2021-12-29": {"tags": ["bad date"]}},
+    }
+)
+
+
+class TestDiffChangesets:
+    def test_diff(self):
+        """Test that the differences between two changesets are reported per section."""
+        assert diff_changesets(prev, new) == ChangeSetDiff(
+            add=SectionDiff(
+                added=[dt.date(2021, 12, 30)], removed=[dt.date(2021, 12, 24)], modified=[dt.date(2021, 12, 23)]
+            ),
+            remove=SectionDiff(added=[dt.date(2021, 12, 28)]),
+            meta=SectionDiff(),
+        )
+
+    def test_diff_none(self):
+        """Test that a missing changeset is treated as an empty one."""
+        assert diff_changesets(None, prev) == ChangeSetDiff(
+            add=SectionDiff(added=[dt.date(2021, 12, 23), dt.date(2021, 12, 24)]),
+            remove=SectionDiff(added=[dt.date(2021, 12, 27)]),
+            meta=SectionDiff(added=[dt.date(2021, 12, 29)]),
+        )
+        assert diff_changesets(prev, None).add.removed == [dt.date(2021, 12, 23), dt.date(2021, 12, 24)]
+
+
+class TestGetDelta:
+    def test_delta(self):
+        """Test that the delta contains added and modified changesets and None for removed ones."""
+        assert get_delta({"XLON": prev, "XSWX": prev, "XAMS": prev}, {"XLON": prev, "XSWX": new, "XNYS": new}) == {
+            "XSWX": new,
+            "XNYS": new,
+            "XAMS": None,
+        }
@@ -0,0 +1,122 @@
+import gzip
+import os
+from http import HTTPStatus
+
+import pytest
+from starlette.testclient import TestClient
+
+from exchange_calendar_service.main.common.compression import CompressionMiddleware, negotiate
+
+
+def _app(content_type: bytes, body: bytes, calls: list):
+    # ASGI app that always returns the given body, and records each call.
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        await send({"type": "http.response.body", "body": body})
+
+    return app
+
+
+class TestNegotiate:
+    @pytest.mark.parametrize(
+        "accept_encoding, expected",
+        [
+            ("gzip", "gzip"),
+            ("gzip, deflate", "gzip"),
+            ("GZIP;q=0.5", "gzip"),
+            ("gzip;q=0", None),
+            ("*", "gzip"),
+            ("*, gzip;q=0", None),
+            ("identity", None),
+            ("", None),
+        ],
+    )
+    def test_negotiate(self, accept_encoding, expected):
+        """Test that the supported coding with the highest quality value is selected."""
+        assert negotiate(accept_encoding) == expected
+
+
+class TestCompressionMiddleware:
+    def test_compressed(self, client):
+        """Test that large responses are compressed as negotiated and small ones are not."""
+        params = {"mic": "XLON", "year": 2021}
+
+        response = client.get("/v1/special_days", params=params, headers={"Accept-Encoding": "identity"})
+        assert response.status_code == HTTPStatus.OK
+        assert "content-encoding" not in response.headers
+        raw = response.content
+
+        response = client.get("/v1/special_days", params=params, headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "accept-encoding"
+        assert response.content == raw
+        assert int(response.headers["content-length"]) == len(gzip.compress(raw, compresslevel=9, mtime=0))
+
+        response = client.get("/v1/mics", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+
+    def test_cached(self, client, mocker):
+        """Test that cache hits do not run the endpoint, until the calendars change."""
+        from exchange_calendar_service.main.common.context import Context
+
+        spy = mocker.spy(Context().engine, "special_days")
+        params = {"mic": "XLON", "year": 2021}
+
+        first = client.get("/v1/special_days", params=params, headers={"Accept-Encoding": "gzip"})
+        second = client.get("/v1/special_days", params=params, headers={"Accept-Encoding": "identity"})
+        third = client.get("/v1/special_days", params=params, headers={"Accept-Encoding": "gzip"})
+        assert first.content == second.content == third.content
+        assert spy.call_count == 1
+
+        Context().cache.refresh("XLON")
+
+        client.get("/v1/special_days", params=params, headers={"Accept-Encoding": "gzip"})
+        assert spy.call_count == 2
+
+    def test_not_cached(self, client, mocker):
+        """Test that responses that depend on the current time are not cached."""
+        from exchange_calendar_service.main.common.context import Context
+
+        spy = mocker.spy(Context().engine, "is_open")
+
+        client.get("/v1/open_at")
+        client.get("/v1/open_at")
+        assert spy.call_count == 2
+
+    def test_vary(self, client):
+        """Test that compressible responses vary with the Accept-Encoding header, also when not compressed."""
+        params = {"mic": "XLON", "year": 2021}
+
+        for accept_encoding in ("identity", "gzip", "identity"):
+            response = client.get("/v1/special_days", params=params, headers={"Accept-Encoding": accept_encoding})
+            assert response.headers["vary"] == "accept-encoding"
+
+    def test_not_cached_binary(self):
+        """Test that responses with media types that are not compressed are not cached."""
+        calls = []
+        app = CompressionMiddleware(_app(b"application/octet-stream", b"x" * 4096, calls), get_version=lambda: "1")
+        client = TestClient(app)
+
+        for _ in range(2):
+            response = client.get("/v1/foo", headers={"Accept-Encoding": "gzip"})
+            assert response.content == b"x" * 4096
+            assert "content-encoding" not in response.headers and "vary" not in response.headers
+
+        assert calls == ["/v1/foo"] * 2
+        assert len(app.cache) == 0
+
+    def test_not_cached_too_large(self):
+        """Test that responses larger than the entire cache are served, but not cached."""
+        calls = []
+        body = os.urandom(2048).hex().encode()
+        app = CompressionMiddleware(_app(b"application/json", body, calls), get_version=lambda: "1", cache_size=1024)
+        client = TestClient(app)
+
+        for accept_encoding in ("identity", "gzip", "gzip"):
+            response = client.get("/v1/foo", headers={"Accept-Encoding": accept_encoding})
+            assert response.content == body
+
+        assert calls == ["/v1/foo"] * 3
+        assert len(app.cache) == 0
@@ -0,0 +1,247 @@
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+
+import exchange_calendars as ec
+import exchange_calendars_extensions.core as ecx
+import numpy as np
+import pandas as pd
+import pytest
+
+from exchange_calendar_service.main.common.cache import ExchangeCalendarCache
+from exchange_calendar_service.main.common.engine import QueryEngine
+from exchange_calendar_service.main.common.model import DayTypeBusinessSpecial, SpecialOpenCloseDayClassification
+
+ecx.apply_extensions()
+
+
+@pytest.fixture(scope="module")
+def engine() -> QueryEngine:
+    return QueryEngine(ExchangeCalendarCache(["XLON", "XSWX", "XNYS"]))
+
+
+class TestQueryEngine:
+    def test_special_days(self, engine):
+        """Test that the special days contain special closes with times in the requested time zone."""
+        days = engine.special_days("XLON", 2021, tz="UTC")
+        assert (
+            SpecialOpenCloseDayClassification(
+                date=dt.date(2021, 12, 31),
+                type=DayTypeBusinessSpecial.SPECIAL_CLOSE,
+                is_business_day=True,
+                name="New Year's Eve",
+                time=dt.time(12, 30),
+                tz="UTC",
+            )
+            in days
+        )
+
+    def test_special_days_outside_index(self, engine):
+        """Test that special days are also available for years not covered by the calendar index."""
+        year = engine.cache.index("XLON").start.year - 1
+        days = engine.special_days("XLON", year)
+        assert days and all(x.date.year == year for x in days)
+        assert any(x.type == "holiday" and x.date == dt.date(year, 12, 25) for x in days)
+
+    @pytest.mark.parametrize("mic", ["XLON", "XSWX", "XNYS"])
+    def test_classify_days(self, engine, mic: str):
+        """Test that classifying many days at once gives the same result as classifying each day individually."""
+        days = pd.date_range("2021-01-01", "2022-12-31").date
+        types, is_business_day = engine.classify_days(mic, days)
+        expected = [engine.classify_day(d, mic) for d in days]
+        assert types.tolist() == [x.type.value for x in expected]
+        assert is_business_day.tolist() == [x.is_business_day for x in expected]
+
+    @pytest.mark.parametrize(
+        "mic, day, name",
+        [
+            # A holiday that coincides with an ad-hoc special close.
+            ("XKLS", dt.date(2022, 5, 2), "Labour Day"),
+            # Two holidays on the same day.
+            ("XDUB", dt.date(2021, 5, 3), "Labour Day"),
+        ],
+    )
+    def test_special_days_same_date(self, mic: str, day: dt.date, name: str):
+        """Test that the first of multiple special days on the same date takes precedence."""
+        engine = QueryEngine(ExchangeCalendarCache([mic]))
+        classification = engine.classify_day(day, mic)
+        assert (classification.type, classification.is_business_day, classification.name) == ("holiday", False, name)
+        assert next(x for x in engine.special_days(mic, day.year) if x.date == day) == classification
+
+        types, is_business_day = engine.classify_days(mic, [day])
+        assert (types.tolist(), is_business_day.tolist()) == (["holiday"], [False])
+        assert not engine.is_business_day(mic, [day])[0]
+
+    @pytest.mark.parametrize("mic", ["XLON", "XSWX", "XNYS"])
+    def test_business_days(self, engine, mic: str):
+        """Test that the business days match those of the underlying calendar."""
+        start, end = dt.date(2021, 3, 3), dt.date(2022, 11, 17)
+        expected = pd.bdate_range(start, end, freq=ec.get_calendar(mic).day).values.astype("datetime64[D]")
+        assert (engine.business_days(mic, start, end) == expected).all()
+
+        days = pd.date_range(start, end).values.astype("datetime64[D]")
+        assert (engine.is_business_day(mic, days) == np.isin(days, expected)).all()
+
+    def test_business_days_outside_index(self, engine):
+        """Test that business days are also available for days not covered by the calendar index."""
+        index = engine.cache.index("XLON")
+        start, end = index.start - dt.timedelta(days=10), index.start + dt.timedelta(days=10)
+        expected = pd.bdate_range(start, end, freq=ec.get_calendar("XLON").day).values.astype("datetime64[D]")
+        assert (engine.business_days("XLON", start, end) == expected).all()
+
+        days = pd.date_range(start, end).values.astype("datetime64[D]")
+        assert (engine.is_business_day("XLON", days) == np.isin(days, expected)).all()
+        assert engine.is_business_day("XLON", []).tolist() == []
+
+        assert engine.combined_business_days(["XLON"], "all", start, end) == expected.astype(dt.date).tolist()
+
+    def test_trading_minutes(self, engine):
+        """Test that trading minutes are computed per pair, in the given order."""
+        start, end = dt.datetime(2021, 12, 31, 0, 0), dt.datetime(2021, 12, 31, 23, 59)
+        minutes = engine.trading_minutes(["XLON", "XNYS", "XLON"], [start] * 3, [end] * 3)
+        assert minutes.tolist() == [270.0, 390.0, 270.0]
+
+    def test_is_open(self, engine):
+        """Test that the MICs in session are returned in the requested order."""
+        mics, is_open = engine.is_open([dt.datetime(2021, 12, 30, 15, 0, tzinfo=dt.timezone.utc)], ["XNYS", "XLON"])
+        assert mics == ("XNYS", "XLON")
+        assert is_open.tolist() == [[True, True]]
+
+    def test_breaks_end(self):
+        """Test queries on sessions of a calendar whose break schedule ends, i.e. with no break from some date on."""
+        engine = QueryEngine(ExchangeCalendarCache(["XKRX", "XLON"]))
+        c = ec.get_calendar("XKRX")
+
+        # A regular day, the first business day of the year and a CSAT day, with delayed sessions on the latter two.
+        for day in (dt.date(2024, 1, 3), dt.date(2024, 1, 2), dt.date(2023, 11, 16)):
+            sessions = engine.sessions("XKRX", day, day)
+            assert sessions.opens[0] == c.session_open(day).tz_localize(None)
+            assert sessions.closes[0] == c.session_close(day).tz_localize(None)
+            assert np.isnat(sessions.break_starts[0]) and np.isnat(sessions.break_ends[0])
+
+        instants = [dt.datetime(2024, 1, 3, 3, 0), dt.datetime(2024, 1, 3, 15, 0)]
+        mics, is_open = engine.is_open(instants)
+        assert mics == ("XKRX", "XLON")
+        assert is_open.tolist() == [[True, False], [False, True]]
+
+        next_open, _ = engine.next_open_close("XKRX", instants[1:])
+        assert next_open[0] == c.session_open(dt.date(2024, 1, 4)).tz_localize(None)
+
+        start, end = dt.datetime(2024, 1, 3), dt.datetime(2024, 1, 4)
+        assert engine.trading_minutes(["XKRX"], [start], [end]).tolist() == [len(c.session_minutes("2024-01-03"))]
+
+    def test_canonical_queries(self):
+        """Test that equivalent queries share cached results."""
+        engine = QueryEngine(ExchangeCalendarCache(["XLON", "XSWX"]))
+        day = dt.date(2021, 12, 24)
+
+        # XSWX is in Europe/Zurich, which is standardised to CET.
+        days = engine.special_days("XSWX", 2021)
+        assert engine.special_days("XSWX", 2021, tz="CET") is days
+        assert engine.special_days("XSWX", 2021, tz="foo") is days
+        assert engine.special_days("XSWX", None) == engine.special_days("XSWX", dt.date.today().year)
+
+        assert engine.classify_day(day, "XSWX") is engine.classify_day(day, "XSWX", tz="CET")
+
+        r = engine.next_special_days(day, mics=["XSWX"])
+        assert engine.next_special_days(day, mics=["XSWX"], tz="CET") is r
+
+        r = engine.next_business_days(day)
+        assert engine.next_business_days(day, mics=["XSWX", "XLON"]) is r
+        assert engine.next_business_days(day, mics=["XLON", "XSWX"], tz="foo") is r
+
+        # Explicit time zones that differ from the native one are not equivalent.
+        assert engine.special_days("XSWX", 2021, tz="Europe/Zurich") is not days
+
+    def test_lazy(self):
+        """Test that calendars are only built on first use, and that tags of calendars not built yet are found."""
+        day = dt.date(2021, 12, 23)
+
+        try:
+            ecx.update_calendar("XSWX", {"meta": {day.isoformat(): {"tags": ["foo"]}}})
+            engine = QueryEngine(ExchangeCalendarCache(["XLON", "XSWX"], warm_up=False))
+            assert len(engine.cache.get.cache) == 0
+
+            assert engine.classify_day(day, "XLON").type == "regular"
+            assert len(engine.cache.get.cache) == 1
+
+            assert [(m, d) for m, d, _ in engine.tagged_days("foo")] == [("XSWX", day)]
+            assert len(engine.cache.get.cache) == 2
+        finally:
+            ecx.reset_calendar("XSWX")
+
+    def test_lazy_concurrent(self, mocker):
+        """Test that concurrent lookups of a calendar not built yet build it only once."""
+        cache = ExchangeCalendarCache(["XLON", "XSWX"], warm_up=False)
+        spy = mocker.spy(ec, "get_calendar")
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            calendars = list(executor.map(cache.get, ["XLON", "XSWX"] * 8))
+
+        assert sorted(x.args[0] for x in spy.call_args_list) == ["XLON", "XSWX"]
+        assert all(c is calendars[i % 2] for i, c in enumerate(calendars))
+
+    def test_invalidation(self):
+        """Test that cached results are invalidated when a calendar is refreshed."""
+        engine = QueryEngine(ExchangeCalendarCache(["XLON"]))
+        day = dt.date(2021, 12, 23)
+
+        assert engine.classify_day(day, "XLON").type == "regular"
+
+        try:
+            ecx.update_calendar("XLON", {"add": {day.isoformat(): {"type": "holiday", "name": "Test Holiday"}}})
+            engine.cache.refresh("XLON")
+
+            assert engine.classify_day(day, "XLON").type == "holiday"
+            assert day not in engine.business_days("XLON", day, day).tolist()
+        finally:
+            ecx.reset_calendar("XLON")
+
+    def test_invalidation_concurrent(self, mocker):
+        """Test that results computed from a calendar that is refreshed concurrently are not returned afterwards."""
+        engine = QueryEngine(ExchangeCalendarCache(["XLON"]))
+        day = dt.date(2021, 12, 23)
+        index = engine.cache.index
+
+        def index_then_refresh(mic):
+            # Look up the index, then refresh the calendar and query the engine, as if done by other threads.
+            result = index(mic)
+            mocker.patch.object(engine.cache, "index", index)
+            ecx.update_calendar("XLON", {"add": {day.isoformat(): {"type": "holiday", "name": "Test Holiday"}}})
+            engine.cache.refresh("XLON")
+            engine.special_days("XLON", 2020)
+            return result
+
+        mocker.patch.object(engine.cache, "index", index_then_refresh)
+
+        try:
+            assert day not in [x.date for x in engine.special_days("XLON", 2021)]
+            assert day in [x.date for x in engine.special_days("XLON", 2021)]
+        finally:
+            ecx.reset_calendar("XLON")
+
+    def test_as_of(self):
+        """Test that previous versions share unchanged calendars and are only retained up to the given number."""
+        cache = ExchangeCalendarCache(["XLON", "XSWX"], history=2)
+        engine = QueryEngine(cache)
+        day = dt.date(2021, 12, 23)
+
+        try:
+            for name in ("Foo", "Bar"):
+                ecx.update_calendar("XLON", {"add": {day.isoformat(): {"type": "holiday", "name": name}}})
+                cache.refresh("XLON")
+            cache.refresh("XSWX")
+
+            assert [engine.as_of(v).classify_day(day, "XLON").name for v in (1, 2, 3)] == ["Foo", "Bar", "Bar"]
+            assert engine.as_of(3) is engine and engine.as_of(1) is engine.as_of(1)
+
+            # Only calendars that changed after a version are held by its snapshot.
+            assert cache.as_of(2).get("XLON") is cache.get("XLON")
+            assert cache.as_of(1).get("XLON") is not cache.get("XLON")
+            assert cache.as_of(1).get("XSWX") is cache.as_of(2).get("XSWX") is not cache.get("XSWX")
+
+            with pytest.raises(LookupError):
+                engine.as_of(0)
+            with pytest.raises(ValueError):
+                engine.as_of(4)
+        finally:
+            ecx.reset_calendar("XLON")
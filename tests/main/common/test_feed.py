@@ -0,0 +1,92 @@
+import asyncio
+import datetime as dt
+
+from exchange_calendar_service.main.common.feed import ChangeEvent, ChangeFeed, DateRange, get_ranges
+
+
+def event(mic: str) -> ChangeEvent:
+    return ChangeEvent(version="v", mics=[mic], ranges={mic: []})
+
+
+async def take(it, n: int) -> list:
+    return [await anext(it) for _ in range(n)]
+
+
+class TestGetRanges:
+    def test_months(self):
+        """Test that dates are expanded to whole months and adjacent months are merged."""
+        dates = [dt.date(2021, 12, 23), dt.date(2022, 1, 3), dt.date(2022, 2, 28), dt.date(2022, 5, 1)]
+        assert get_ranges(dates) == [
+            DateRange(start=dt.date(2021, 12, 1), end=dt.date(2022, 2, 28)),
+            DateRange(start=dt.date(2022, 5, 1), end=dt.date(2022, 5, 31)),
+        ]
+
+    def test_empty(self):
+        assert get_ranges([]) == []
+
+
+class TestChangeFeed:
+    def test_listen(self):
+        """Test that subscribers receive events published from other threads after they subscribed."""
+        feed = ChangeFeed()
+        feed.publish(event("XNYS"))
+
+        async def run():
+            it = feed.listen()
+            task = asyncio.ensure_future(take(it, 2))
+            await asyncio.sleep(0.01)
+            await asyncio.to_thread(feed.publish, event("XLON"))
+            await asyncio.to_thread(feed.publish, event("XSWX"))
+            return await asyncio.wait_for(task, 1.0)
+
+        assert asyncio.run(run()) == [(2, event("XLON")), (3, event("XSWX"))]
+
+    def test_many_subscribers(self):
+        """Test that a single publish wakes up all subscribers."""
+        feed = ChangeFeed()
+
+        async def run():
+            tasks = [asyncio.ensure_future(take(feed.listen(), 1)) for _ in range(1000)]
+            await asyncio.sleep(0.01)
+            feed.publish(event("XLON"))
+            return await asyncio.wait_for(asyncio.gather(*tasks), 1.0)
+
+        assert all(x == [(1, event("XLON"))] for x in asyncio.run(run()))
+
+    def test_resume(self):
+        """Test that subscribers catch up on events after the given event id."""
+        feed = ChangeFeed()
+        for mic in ("XLON", "XSWX", "XNYS"):
+            feed.publish(event(mic))
+
+        async def run():
+            return await take(feed.listen(feed.event_id(1)), 2)
+
+        assert asyncio.run(run()) == [(2, event("XSWX")), (3, event("XNYS"))]
+
+    def test_reset(self):
+        """Test that subscribers that cannot catch up are reset."""
+        feed = ChangeFeed(history=2)
+        for mic in ("XLON", "XSWX", "XNYS"):
+            feed.publish(event(mic))
+
+        async def run(last_event_id):
+            return await take(feed.listen(last_event_id), 1)
+
+        # Event 1 has been dropped.
+        assert asyncio.run(run(feed.event_id(0))) == [(3, None)]
+
+        # Event id from another instance.
+        assert asyncio.run(run(ChangeFeed().event_id(3))) == [(3, None)]
+
+        # Malformed event id.
+        assert asyncio.run(run("foo")) == [(3, None)]
+
+    def test_keepalive(self):
+        """Test that idle subscribers receive None after the keep-alive interval."""
+        feed = ChangeFeed()
+
+        async def run():
+            return await asyncio.wait_for(take(feed.listen(keepalive=0.01), 2), 1.0)
+
+        assert asyncio.run(run()) == [None, None]
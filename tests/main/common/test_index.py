@@ -0,0 +1,85 @@
+import datetime as dt
+
+import exchange_calendars as ec
+import exchange_calendars_extensions.core as ecx
+import numpy as np
+import pandas as pd
+import pytest
+
+from exchange_calendar_service.main.common.cache import ExtendedExchangeCalendarWrapper
+from exchange_calendar_service.main.common.index import CalendarIndex, SessionIntervalIndex
+
+ecx.apply_extensions()
+
+
+@pytest.fixture(scope="module")
+def indices() -> dict[str, CalendarIndex]:
+    return {
+        m: CalendarIndex(ExtendedExchangeCalendarWrapper(ec.get_calendar(m)))
+        for m in ("XLON", "XNYS", "CMES", "XHKG", "XKRX")
+    }
+
+
+class TestCalendarIndex:
+    @pytest.mark.parametrize("mic", ["XLON", "XNYS", "CMES", "XHKG", "XKRX"])
+    def test_sessions(self, indices, mic: str):
+        """Test that the precomputed sessions match the sessions of the original exchange calendar."""
+        c = ec.get_calendar(mic)
+        sessions = indices[mic].sessions.between(c.first_session.date(), c.last_session.date())
+        assert (sessions.dates == c.sessions.values.astype("datetime64[D]")).all()
+        assert (sessions.opens == c.opens.values).all()
+        assert (sessions.closes == c.closes.values).all()
+        assert np.array_equal(sessions.break_starts, c.break_starts.values.astype("datetime64[ns]"), equal_nan=True)
+        assert np.array_equal(sessions.break_ends, c.break_ends.values.astype("datetime64[ns]"), equal_nan=True)
+
+    def test_sessions_breaks_end(self, indices):
+        """Test that sessions have no break from the date on which the break schedule of a calendar ends."""
+        c = ec.get_calendar("XKRX", start="1999-01-01", end="2001-12-31")
+        sessions = indices["XKRX"].sessions.between(c.first_session.date(), c.last_session.date())
+        assert np.array_equal(sessions.break_starts, c.break_starts.values.astype("datetime64[ns]"), equal_nan=True)
+        assert np.array_equal(sessions.break_ends, c.break_ends.values.astype("datetime64[ns]"), equal_nan=True)
+
+        # Breaks until the day before the schedule ends, none afterwards.
+        has_break = ~np.isnat(sessions.break_starts)
+        assert has_break[sessions.dates < np.datetime64("2000-05-22")].any()
+        assert not has_break[sessions.dates >= np.datetime64("2000-05-22")].any()
+
+    def test_is_open_break(self, indices):
+        """Test that the exchange is not in session during a break, and that the break ends count as opens."""
+        c = ec.get_calendar("XHKG")
+        minutes = c.minutes_in_range(pd.Timestamp("2021-12-20"), pd.Timestamp("2021-12-25"))
+        instants = np.datetime64("2021-12-20", "ns") + np.arange(0, 5 * 24 * 60, 5) * np.timedelta64(1, "m")
+
+        # Trading minutes in exchange_calendars are the starts of minutes that are traded.
+        expected = np.isin(instants, minutes.tz_localize(None).values.astype("datetime64[ns]"))
+        assert (indices["XHKG"].is_open(instants) == expected).all()
+
+        # At 12:30 local time, during the break.
+        next_open, next_close = indices["XHKG"].next_open_close(np.array(["2021-12-20T04:30"], dtype="datetime64[ns]"))
+        assert next_open[0] == np.datetime64("2021-12-20T05:00", "ns")
+        assert next_close[0] == np.datetime64("2021-12-20T08:00", "ns")
+
+    def test_session_time_break(self, indices):
+        """Test that breaks do not count towards session time, also within a partial session."""
+        c = ec.get_calendar("XHKG")
+        starts = np.array(["2021-12-20T00:00", "2021-12-20T03:00", "2021-12-20T04:30", "2021-12-20T04:30"], "M8[ns]")
+        ends = np.array(["2021-12-25T00:00", "2021-12-20T06:00", "2021-12-20T04:45", "2021-12-20T05:30"], "M8[ns]")
+
+        minutes = indices["XHKG"].session_time_between(starts, ends) / np.timedelta64(1, "m")
+
+        expected = len(c.minutes_in_range(pd.Timestamp("2021-12-20"), pd.Timestamp("2021-12-25")))
+        assert minutes.tolist() == [expected, 120.0, 0.0, 30.0]
+
+
+class TestSessionIntervalIndex:
+    def test_is_open(self, indices):
+        """Test that looking up the calendars in session via the interval index gives the same result as checking each
+        calendar individually."""
+        start, end = dt.date(2021, 12, 1), dt.date(2022, 1, 31)
+        index = SessionIntervalIndex(indices, start, end)
+
+        instants = np.datetime64(start, "ns") + np.arange(0, 62 * 24 * 60, 7) * np.timedelta64(1, "m")
+        assert index.covers(instants).all()
+
+        expected = np.stack([indices[m].is_open(instants) for m in index.mics], axis=1)
+        assert (index.is_open(instants) == expected).all()
@@ -0,0 +1,64 @@
+import pytest
+from exchange_calendars_extensions.api.changes import ChangeSet
+
+from exchange_calendar_service.main.common.journal import ChangeSetJournal
+
+
+@pytest.fixture
+def journal(tmp_path) -> ChangeSetJournal:
+    return ChangeSetJournal(str(tmp_path / "journal.db"), compact_threshold=2)
+
+
+def changeset(name: str) -> ChangeSet:
+    return ChangeSet.model_validate({"add": {"2021-12-23": {"type": "holiday", "name": name}}})
+
+
+def count(journal: ChangeSetJournal) -> int:
+    with journal._connect() as conn:
+        return conn.execute("SELECT COUNT(*) FROM changes").fetchone()[0]
+
+
+class TestChangeSetJournal:
+    def test_load_empty(self, journal):
+        """Test that a new journal is empty."""
+        assert journal.load() == {}
+
+    def test_append_load(self, journal):
+        """Test that loading the journal returns the latest changeset per MIC and omits removed ones."""
+        journal.append({"XLON": changeset("a"), "XSWX": changeset("b")})
+        journal.append({"XLON": changeset("c")})
+        journal.append({"XSWX": None})
+
+        assert journal.load() == {"XLON": changeset("c")}
+
+    def test_compact(self, journal):
+        """Test that compaction only retains the latest entries and that appending compacts the journal once the
+        number of superseded entries exceeds the threshold."""
+        journal.append({"XLON": changeset("a")})
+        journal.append({"XLON": changeset("b")})
+        journal.append({"XLON": changeset("c")})
+        assert count(journal) == 3
+
+        journal.append({"XLON": changeset("d")})
+        assert count(journal) == 1
+
+        journal.append({"XLON": None})
+        journal.compact()
+        assert count(journal) == 0
+
+    def test_persistence(self, journal):
+        """Test that the journal is durable across instances."""
+        journal.append({"XLON": changeset("a")})
+
+        assert ChangeSetJournal(journal.path).load() == {"XLON": changeset("a")}
+
+    def test_directory(self, journal):
+        """Test that the changesets last applied from a directory are replaced as a whole and kept apart from the
+        journal entries."""
+        assert journal.load_directory() == {}
+
+        journal.save_directory({"XLON": changeset("a"), "XSWX": changeset("b")})
+        journal.save_directory({"XSWX": changeset("c")})
+
+        assert ChangeSetJournal(journal.path).load_directory() == {"XSWX": changeset("c")}
+        assert journal.load() == {}
@@ -0,0 +1,97 @@
+import io
+import json
+import logging
+
+import pytest
+
+from exchange_calendar_service.main.common.logs import JsonFormatter, QueueLogging
+
+
+@pytest.fixture
+def logger():
+    logger = logging.getLogger("test.logs")
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    yield logger, stream
+
+    logger.handlers = []
+
+
+class TestJsonFormatter:
+    def test_format(self):
+        """Test that records are formatted as JSON objects that include extra attributes."""
+        record = logging.LogRecord("test", logging.INFO, "", 0, "Hello %s.", ("world",), None)
+        record.changes = {"XLON": [1, 2]}
+
+        data = json.loads(JsonFormatter().format(record))
+
+        assert data["level"] == "INFO"
+        assert data["logger"] == "test"
+        assert data["message"] == "Hello world."
+        assert data["changes"] == {"XLON": [1, 2]}
+
+
+class TestQueueLogging:
+    def test_start_stop(self, logger):
+        """Test that records are passed on to the original handlers via a queue, and that the original handlers are
+        restored afterwards."""
+        logger, stream = logger
+        handlers = list(logger.handlers)
+
+        queue_logging = QueueLogging(loggers=[logger.name], json_format=True)
+        queue_logging.start()
+
+        assert logger.handlers != handlers
+
+        logger.info("Line 1\nLine 2", extra={"foo": "bar"})
+
+        queue_logging.stop()
+
+        assert logger.handlers == handlers
+        assert logger.handlers[0].formatter is None
+
+        # A single record, on a single line.
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 1
+        assert json.loads(lines[0])["message"] == "Line 1\nLine 2"
+        assert json.loads(lines[0])["foo"] == "bar"
+
+    def test_arguments(self, logger):
+        """Test that the original handlers receive records with their arguments, as some formatters rely on them."""
+        logger, stream = logger
+
+        class Formatter(logging.Formatter):
+            def format(self, record: logging.LogRecord) -> str:
+                host, port = record.args
+                return f"{host}:{port}"
+
+        logger.handlers[0].setFormatter(Formatter())
+
+        queue_logging = QueueLogging(loggers=[logger.name])
+        queue_logging.start()
+        logger.info("%s:%d", "localhost", 8080)
+        queue_logging.stop()
+
+        assert stream.getvalue() == "localhost:8080\n"
+
+    def test_exception(self, logger):
+        """Test that exceptions are formatted before records are enqueued, and are included in the JSON output."""
+        logger, stream = logger
+
+        queue_logging = QueueLogging(loggers=[logger.name], json_format=True)
+        queue_logging.start()
+
+        try:
+            raise ValueError("Foo")
+        except ValueError:
+            logger.exception("Failed.")
+
+        queue_logging.stop()
+
+        data = json.loads(stream.getvalue())
+        assert data["message"] == "Failed."
+        assert data["exc_info"].startswith("Traceback") and "ValueError: Foo" in data["exc_info"]
@@ -0,0 +1,57 @@
+from exchange_calendar_service.main.common.shards import (
+    merge_classifications,
+    merge_combined_business_days,
+    merge_day_maps,
+    merge_open_mics,
+    partition,
+)
+
+
+def test_partition():
+    """Test that MICs are partitioned into contiguous shards of nearly equal size."""
+    assert partition(["A", "B", "C", "D", "E"], 2) == [("A", "B", "C"), ("D", "E")]
+    assert partition(["A", "B", "C"], 3) == [("A",), ("B",), ("C",)]
+    assert partition(["A", "B"], 4) == [("A",), ("B",)]
+    assert partition(["A", "B"], 0) == [("A", "B")]
+
+
+def test_merge_classifications():
+    """Test that identical classifications from different shards are combined."""
+    holiday = {"date": "2021-12-24", "type": "holiday", "is_business_day": False, "name": "Christmas Eve"}
+    regular = {"date": "2021-12-24", "type": "regular", "is_business_day": True, "name": None}
+
+    a = [{**holiday, "mics": ["A"]}]
+    b = [{**regular, "mics": ["B"]}, {**holiday, "mics": ["C"]}]
+
+    assert merge_classifications([a, b]) == [{**holiday, "mics": ["A", "C"]}, {**regular, "mics": ["B"]}]
+
+
+def test_merge_day_maps():
+    """Test that the days nearest overall are retained and the classifications on each day are combined."""
+    regular = {"type": "regular", "is_business_day": True, "name": None}
+
+    def day(date: str, *mics: str) -> dict:
+        return {"date": date, "classifications": [{"date": date, **regular, "mics": list(mics)}]}
+
+    a = [day("2021-12-23", "A"), day("2021-12-24", "A")]
+    b = [day("2021-12-22", "B"), day("2021-12-23", "B")]
+
+    assert merge_day_maps([a, b], 2, True) == [day("2021-12-22", "B"), day("2021-12-23", "A", "B")]
+    assert merge_day_maps([a, b], 2, False) == [day("2021-12-24", "A"), day("2021-12-23", "A", "B")]
+
+
+def test_merge_combined_business_days():
+    """Test that combined business days are merged across shards for each operation."""
+    assert merge_combined_business_days("all", [["1", "2"], ["2", "3"]], []) == ["2"]
+    assert merge_combined_business_days("any", [["1", "2"], ["2", "3"]], []) == ["1", "2", "3"]
+
+    # Day 1 is exactly one in the first shard and none in the second, day 2 is also open in the second shard.
+    assert merge_combined_business_days("exactly_one", [["1", "2"], []], [["1", "2"], ["2", "3"]]) == ["1"]
+
+
+def test_merge_open_mics():
+    """Test that the MICs in session are merged per instant, in the given order."""
+    a = [{"at": "t1", "mics": ["A"]}, {"at": "t2", "mics": []}]
+    b = [{"at": "t1", "mics": ["C"]}, {"at": "t2", "mics": ["C"]}]
+
+    assert merge_open_mics([a, b], ["C", "A"]) == [{"at": "t1", "mics": ["C", "A"]}, {"at": "t2", "mics": ["C"]}]
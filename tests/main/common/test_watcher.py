@@ -0,0 +1,70 @@
+import os
+
+import pytest
+from exchange_calendars_extensions.api.changes import ChangeSet
+
+from exchange_calendar_service.main.common.watcher import ChangeSetDirectoryWatcher
+
+
+def changeset(name: str) -> ChangeSet:
+    return ChangeSet.model_validate({"add": {"2021-12-23": {"type": "holiday", "name": name}}})
+
+
+class TestChangeSetDirectoryWatcher:
+    @pytest.fixture
+    def applied(self) -> list:
+        return []
+
+    @pytest.fixture
+    def watcher(self, tmp_path, applied) -> ChangeSetDirectoryWatcher:
+        (tmp_path / "a.yaml").write_text("XLON:\n  add:\n    2021-12-23:\n      type: holiday\n      name: a\n")
+        (tmp_path / "b.json").write_text('{"XSWX": {"add": {"2021-12-23": {"type": "holiday", "name": "b"}}}}')
+        (tmp_path / "ignored.txt").write_text("foo")
+
+        watcher = ChangeSetDirectoryWatcher(str(tmp_path), apply=applied.append, debounce=0.0)
+        watcher.scan()
+        watcher.reload()
+
+        return watcher
+
+    def test_initial(self, watcher, applied):
+        """Test that all changeset files are applied initially."""
+        assert applied == [{"XLON": changeset("a"), "XSWX": changeset("b")}]
+
+    def test_modified(self, watcher, applied, tmp_path):
+        """Test that only the MICs in a modified file are applied again, once the directory is stable."""
+        (tmp_path / "a.yaml").write_text("XLON:\n  add:\n    2021-12-23:\n      type: holiday\n      name: modified\n")
+
+        assert watcher.poll() is None
+        assert watcher.poll() == {"XLON": changeset("modified")}
+        assert watcher.poll() is None
+        assert applied[1:] == [{"XLON": changeset("modified")}]
+
+    def test_debounce(self, watcher, applied, tmp_path):
+        """Test that successive changes to the directory are applied together."""
+        (tmp_path / "a.yaml").write_text("{}")
+        assert watcher.poll() is None
+
+        os.remove(tmp_path / "b.json")
+        assert watcher.poll() is None
+
+        assert watcher.poll() == {"XLON": None, "XSWX": None}
+
+    def test_invalid(self, watcher, applied, tmp_path):
+        """Test that an invalid file does not change the applied changesets."""
+        (tmp_path / "a.yaml").write_text("XLON: [")
+
+        assert watcher.poll() is None
+        assert watcher.poll() == {}
+        assert len(applied) == 1
+
+    def test_applied_before(self, tmp_path, applied):
+        """Test that only the delta to changesets applied before, e.g. before a restart, is applied initially."""
+        (tmp_path / "a.yaml").write_text("XLON:\n  add:\n    2021-12-23:\n      type: holiday\n      name: a\n")
+
+        before = {"XLON": changeset("a"), "XSWX": changeset("b")}
+        watcher = ChangeSetDirectoryWatcher(str(tmp_path), apply=applied.append, applied=before)
+        watcher.scan()
+
+        assert watcher.reload() == {"XSWX": None}
+        assert watcher.applied == {"XLON": changeset("a")}
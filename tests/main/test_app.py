@@ -0,0 +1,265 @@
+import asyncio
+import json
+import os
+from http import HTTPStatus
+
+import exchange_calendars_extensions.core as ecx_core
+import pytest
+from exchange_calendars_extensions.api.changes import ChangeSet
+from fastapi.testclient import TestClient
+
+from exchange_calendar_service.main.common.journal import ChangeSetJournal
+
+changes = {"XLON": {"add": {"2021-12-23": {"type": "holiday", "name": "Test Holiday"}}}}
+
+
+@pytest.fixture
+def journal_settings(settings, tmp_path, monkeypatch):
+    import exchange_calendar_service.main.app
+    from exchange_calendar_service.main.common.context import Context
+
+    # The app module may hold on to the settings object beyond this test.
+    monkeypatch.setattr(settings, "journal", str(tmp_path / "journal.db"))
+    monkeypatch.setattr(exchange_calendar_service.main.app, "settings", settings)
+
+    yield settings
+
+    # Resetting all calendars at once only drops the changesets, so restore each modified calendar individually first.
+    for mic in settings.exchanges.keys():
+        ecx_core.reset_calendar(mic)
+    ecx_core.reset_all_calendars()
+    if Context().cache is not None:
+        for mic in settings.exchanges.keys():
+            Context().cache.refresh(mic)
+
+
+class TestJournal:
+    def test_update_appends_to_journal(self, journal_settings):
+        """This test verifies that the POST /update endpoint persists changesets in the journal."""
+        from exchange_calendar_service.main.app import app
+
+        client = TestClient(app())
+
+        response = client.post("/update", json=changes, headers={"X-API-KEY": "test"})
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == {
+            "XLON": {
+                "add": {"added": ["2021-12-23"], "removed": [], "modified": []},
+                "remove": {"added": [], "removed": [], "modified": []},
+                "meta": {"added": [], "removed": [], "modified": []},
+            }
+        }
+        assert ChangeSetJournal(journal_settings.journal).load() == {"XLON": ChangeSet.model_validate(changes["XLON"])}
+
+        response = client.post("/update", json={}, headers={"X-API-KEY": "test"})
+        assert response.status_code == HTTPStatus.OK
+        assert ChangeSetJournal(journal_settings.journal).load() == {}
+
+    def test_replay_at_startup(self, journal_settings):
+        """This test verifies that journaled changesets are applied when the app is created."""
+        from exchange_calendar_service.main.app import app
+
+        ChangeSetJournal(journal_settings.journal).append({"XLON": ChangeSet.model_validate(changes["XLON"])})
+
+        client = TestClient(app())
+
+        assert ecx_core.get_changes_for_calendar("XLON") == ChangeSet.model_validate(changes["XLON"])
+
+        response = client.get("/v1/classify_day", params={"mic": "XLON", "day": "2021-12-23"})
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()["type"] == "holiday"
+
+    def test_changes_dir(self, journal_settings, tmp_path, monkeypatch):
+        """This test verifies that changes from the changeset directory are journaled, and that changesets removed from
+        the directory are not reset if they have been replaced via the POST /update endpoint since."""
+        import time
+
+        from exchange_calendar_service.main.app import app
+
+        monkeypatch.setattr(journal_settings, "changes_dir", str(tmp_path / "changes"))
+        monkeypatch.setattr(journal_settings, "changes_dir_interval", 0.05)
+        monkeypatch.setattr(journal_settings, "changes_dir_debounce", 0.05)
+
+        os.mkdir(journal_settings.changes_dir)
+        with open(os.path.join(journal_settings.changes_dir, "a.json"), "w") as f:
+            json.dump({"XSWX": changes["XLON"]}, f)
+
+        with TestClient(app()) as client:
+            assert ChangeSetJournal(journal_settings.journal).load() == {
+                "XSWX": ChangeSet.model_validate(changes["XLON"])
+            }
+
+            replaced = {"XSWX": {"add": {"2021-12-23": {"type": "holiday", "name": "Replaced"}}}}
+            client.post("/update", json=replaced, headers={"X-API-KEY": "test"})
+
+            os.remove(os.path.join(journal_settings.changes_dir, "a.json"))
+            with open(os.path.join(journal_settings.changes_dir, "b.json"), "w") as f:
+                json.dump(changes, f)
+
+            # Wait until the changes from the new file have been applied and journaled.
+            for _ in range(100):
+                if "XLON" in ChangeSetJournal(journal_settings.journal).load():
+                    break
+                time.sleep(0.05)
+
+            assert ecx_core.get_changes_for_calendar("XSWX") == ChangeSet.model_validate(replaced["XSWX"])
+            assert ChangeSetJournal(journal_settings.journal).load() == {
+                "XLON": ChangeSet.model_validate(changes["XLON"]),
+                "XSWX": ChangeSet.model_validate(replaced["XSWX"]),
+            }
+
+    def test_changes_dir_restart(self, journal_settings, tmp_path, monkeypatch):
+        """This test verifies that changesets removed from the changeset directory while the app was down are reset
+        after a restart, unless they have been replaced via the POST /update endpoint."""
+        from exchange_calendar_service.main.app import app
+
+        monkeypatch.setattr(journal_settings, "changes_dir", str(tmp_path / "changes"))
+
+        os.mkdir(journal_settings.changes_dir)
+        with open(os.path.join(journal_settings.changes_dir, "a.json"), "w") as f:
+            json.dump({"XLON": changes["XLON"], "XSWX": changes["XLON"]}, f)
+
+        replaced = {"XSWX": {"add": {"2021-12-23": {"type": "holiday", "name": "Replaced"}}}}
+
+        with TestClient(app()) as client:
+            client.post("/update", json={"XLON": changes["XLON"], **replaced}, headers={"X-API-KEY": "test"})
+
+        os.remove(os.path.join(journal_settings.changes_dir, "a.json"))
+
+        # Restart, with the changesets only replayed from the journal.
+        for mic in ("XLON", "XSWX"):
+            ecx_core.reset_calendar(mic)
+        ecx_core.reset_all_calendars()
+
+        with TestClient(app()) as client:
+            response = client.get("/v1/classify_day", params={"mic": "XLON", "day": "2021-12-23"})
+            assert response.json()["type"] == "regular"
+
+        assert ecx_core.get_changes_for_calendar("XSWX") == ChangeSet.model_validate(replaced["XSWX"])
+        assert ChangeSetJournal(journal_settings.journal).load() == {"XSWX": ChangeSet.model_validate(replaced["XSWX"])}
+        assert ChangeSetJournal(journal_settings.journal).load_directory() == {}
+
+
+class TestETag:
+    def test_conditional_request(self, client):
+        """This test verifies that GET responses carry an entity tag and that conditional requests with a matching tag
+        are answered with 304 Not Modified."""
+        response = client.get("/v1/special_days", params={"mic": "XLON", "year": 2021})
+        assert response.status_code == HTTPStatus.OK
+        etag = response.headers["etag"]
+
+        response = client.get("/v1/special_days", params={"mic": "XLON", "year": 2021}, headers={"If-None-Match": etag})
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert response.content == b""
+
+    def test_update_changes_etag(self, client):
+        """This test verifies that the entity tag changes when calendars are updated."""
+        etag = client.get("/v1/mics").headers["etag"]
+
+        try:
+            response = client.post("/update", json=changes, headers={"X-API-KEY": "test"})
+            assert response.status_code == HTTPStatus.OK
+
+            response = client.get("/v1/mics", headers={"If-None-Match": etag})
+            assert response.status_code == HTTPStatus.OK
+            assert response.headers["etag"] != etag
+        finally:
+            client.post("/update", json={}, headers={"X-API-KEY": "test"})
+
+    def test_volatile(self, client):
+        """This test verifies that responses that depend on the current time are only tagged if the time is given."""
+        assert "etag" not in client.get("/v1/open_at").headers
+        assert "etag" in client.get("/v1/open_at", params={"at": "2021-12-31T10:00:00Z"}).headers
+
+
+class TestChangeStream:
+    def test_update_publishes_event(self, client):
+        """This test verifies that applying changes publishes an event with the new version, the affected MICs and the
+        affected date ranges."""
+        from exchange_calendar_service.main.common.context import Context
+
+        feed = Context().feed
+        etag = client.get("/v1/mics").headers["etag"]
+
+        async def take(n):
+            it = feed.listen(feed.event_id(0))
+            return [await anext(it) for _ in range(n)]
+
+        try:
+            response = client.post("/update", json=changes, headers={"X-API-KEY": "test"})
+            assert response.status_code == HTTPStatus.OK
+            etag_new = client.get("/v1/mics").headers["etag"]
+
+            # Unchanged changesets publish nothing.
+            client.post("/update", json=changes, headers={"X-API-KEY": "test"})
+        finally:
+            client.post("/update", json={}, headers={"X-API-KEY": "test"})
+
+        (_, first), (_, second) = asyncio.run(take(2))
+
+        assert first.model_dump(mode="json", exclude={"version"}) == {
+            "mics": ["XLON"],
+            "ranges": {"XLON": [{"start": "2021-12-01", "end": "2021-12-31"}]},
+        }
+        assert etag_new.startswith(f'W/"{first.version}-') and not etag.startswith(f'W/"{first.version}-')
+        assert second.mics == ["XLON"] and second.version != first.version
+
+    def test_not_tagged(self, client):
+        """This test verifies that the stream is excluded from entity tags."""
+        from exchange_calendar_service.main.common.etag import ETagMiddleware
+
+        middleware = next(m for m in client.app.user_middleware if m.cls is ETagMiddleware)
+        assert "/v1/changes/stream" in middleware.kwargs["exclude"]
+
+
+class TestAsOf:
+    def test_as_of(self, client):
+        """This test verifies that queries can be run against previous versions of the calendars, given by version or
+        point in time."""
+        from exchange_calendar_service.main.common.context import Context
+
+        version = Context().cache.version
+        before = client.get("/v1/mics").headers["etag"].removeprefix('W/"').rsplit("-", 3)[0]
+        time = Context().cache.created.isoformat()
+        params = {"day": "2021-12-23", "mic": "XLON"}
+
+        try:
+            response = client.post("/update", json=changes, headers={"X-API-KEY": "test"})
+            assert response.status_code == HTTPStatus.OK
+
+            assert client.get("/v1/classify_day", params=params).json()["type"] == "holiday"
+
+            for p in ({"as_of_version": before}, {"as_of_version": str(version)}, {"as_of_time": time}):
+                response = client.get("/v1/classify_day", params={**params, **p})
+                assert response.status_code == HTTPStatus.OK
+                assert response.json()["type"] == "regular"
+
+            # All sub-queries of a batch see the requested version.
+            queries = [{"id": "day", "op": "classify_day", "params": params}]
+            response = client.post("/v1/batch", params={"as_of_version": before}, json=queries)
+            assert response.json()["day"]["result"]["type"] == "regular"
+
+            for p, status in (
+                ({"as_of_version": str(version + 2)}, HTTPStatus.NOT_FOUND),
+                ({"as_of_version": f"other-{version}"}, HTTPStatus.NOT_FOUND),
+                ({"as_of_version": "foo"}, HTTPStatus.UNPROCESSABLE_ENTITY),
+                ({"as_of_version": before, "as_of_time": time}, HTTPStatus.UNPROCESSABLE_ENTITY),
+                ({"as_of_time": "2000-01-01T00:00:00Z"}, HTTPStatus.GONE),
+            ):
+                assert client.get("/v1/classify_day", params={**params, **p}).status_code == status, p
+        finally:
+            client.post("/update", json={}, headers={"X-API-KEY": "test"})
+
+
+class TestOpenAPI:
+    def test_lazy(self, client):
+        """This test verifies that the OpenAPI document is only generated on demand, once, and does not enumerate all
+        supported MICs."""
+        assert client.app.openapi_schema is None
+
+        response = client.get("/openapi.json")
+        assert response.status_code == HTTPStatus.OK
+        assert client.app.openapi() is client.app.openapi_schema
+
+        mic = next(x for x in response.json()["paths"]["/v1/special_days"]["get"]["parameters"] if x["name"] == "mic")
+        assert "enum" not in mic["schema"]
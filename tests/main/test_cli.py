@@ -0,0 +1,90 @@
+import csv
+import datetime as dt
+import json
+
+import exchange_calendars as ec
+import exchange_calendars_extensions.core as ecx_core
+import pandas as pd
+import pytest
+
+from exchange_calendar_service.main.cli import main
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    yield
+    ecx_core.reset_all_calendars()
+
+
+class TestCli:
+    def test_sessions_csv(self, tmp_path):
+        """This test verifies that the sessions exported as CSV match the sessions of the underlying calendar."""
+        output = tmp_path / "sessions.csv"
+
+        main(["sessions", "--mic", "XLON", "--start-year", "2021", "--workers", "1", "--output", str(output)])
+
+        with open(output, newline="") as f:
+            rows = list(csv.DictReader(f))
+
+        cal = ec.get_calendar("XLON")
+        opens = cal.opens.loc["2021-01-01":"2021-12-31"]
+        closes = cal.closes.loc["2021-01-01":"2021-12-31"]
+
+        assert [(r["date"], r["mic"], r["open"], r["close"]) for r in rows] == [
+            (d.date().isoformat(), "XLON", o.strftime("%Y-%m-%dT%H:%M:%SZ"), c.strftime("%Y-%m-%dT%H:%M:%SZ"))
+            for d, o, c in zip(opens.index, opens, closes)
+        ]
+
+    def test_special_days_ndjson(self, tmp_path):
+        """This test verifies that the special days are exported as NDJSON."""
+        output = tmp_path / "special_days.ndjson"
+
+        main(
+            ["special_days", "--mic", "XLON", "--start-year", "2021", "--format", "ndjson", "--workers", "1"]
+            + ["--output", str(output)]
+        )
+
+        with open(output) as f:
+            rows = [json.loads(line) for line in f]
+
+        assert {
+            "date": "2021-12-31",
+            "mic": "XLON",
+            "type": "special close",
+            "is_business_day": True,
+            "name": "New Year's Eve",
+            "time": "12:30:00",
+            "tz": "Europe/London",
+        } in rows
+        assert all(r["date"].startswith("2021-") for r in rows)
+
+    def test_business_days_parquet_parallel(self, tmp_path):
+        """This test verifies that the business days are exported as Parquet when built in worker processes, with a
+        changeset file applied in each worker, and in the order of the given MICs."""
+        pq = pytest.importorskip("pyarrow.parquet")
+
+        changes = tmp_path / "changes.json"
+        changes.write_text(json.dumps({"XLON": {"add": {"2021-12-23": {"type": "holiday", "name": "Test Holiday"}}}}))
+        output = tmp_path / "business_days.parquet"
+
+        main(
+            ["business_days", "--mic", "XSWX", "--mic", "XLON", "--start-year", "2021", "--end-year", "2022"]
+            + ["--format", "parquet", "--workers", "2", "--changes", str(changes), "--output", str(output)]
+        )
+
+        assert pq.ParquetFile(output).num_row_groups == 2
+        rows = pq.read_table(output).to_pylist()
+
+        assert [r["mic"] for r in rows] == sorted((r["mic"] for r in rows), reverse=True)
+
+        for mic in ("XSWX", "XLON"):
+            expected = pd.bdate_range("2021-01-01", "2022-12-31", freq=ec.get_calendar(mic).day)
+            expected = [d.date() for d in expected if not (mic == "XLON" and d == pd.Timestamp("2021-12-23"))]
+            assert [r["date"] for r in rows if r["mic"] == mic] == expected
+
+        assert dt.date(2021, 12, 23) not in [r["date"] for r in rows if r["mic"] == "XLON"]
+
+    def test_invalid_year(self):
+        """This test verifies that years outside the supported range are rejected."""
+        with pytest.raises(SystemExit):
+            main(["sessions", "--mic", "XLON", "--start-year", "1800"])
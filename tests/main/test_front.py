@@ -0,0 +1,156 @@
+import asyncio
+from collections.abc import Callable
+from http import HTTPStatus
+
+import pyarrow as pa
+import pytest
+from fastapi.testclient import TestClient
+
+from exchange_calendar_service.main.front import Shard, ShardRouter, WorkerPool, front_app
+
+# Deliberately not in alphabetical order.
+_exchanges = {
+    "XSWX": "SIX Swiss Exchange",
+    "XAMS": "Euronext Amsterdam",
+    "XLON": "London Stock Exchange",
+}
+
+
+@pytest.fixture(scope="module")
+def pool() -> WorkerPool:
+    return WorkerPool(_exchanges, 2, env={"EXCHANGE_CALENDAR_SERVICE_CHANGES_API_KEY": "test"})
+
+
+@pytest.fixture(scope="module")
+def front(pool) -> TestClient:
+    with TestClient(front_app(pool, timeout=60)) as front:
+        yield front
+
+
+class TestFront:
+    def test_shards(self, front, pool):
+        """This test verifies that the exchanges are partitioned across worker processes in alphabetical order."""
+        assert [s.mics for s in pool.shards] == [("XAMS", "XLON"), ("XSWX",)]
+
+    def test_same_responses(self, front, client):
+        """This test verifies that the front returns the same responses as a single process, both for requests that
+        are passed through to a single shard and for requests that are merged across shards."""
+        gets = [
+            ("/v1/mics", {}),
+            ("/v1/mic2name", {}),
+            ("/v1/timezone", {}),
+            ("/v1/special_days", {"mic": "XSWX", "year": 2021}),
+            ("/v1/special_days", {"mic": "XNYS", "year": 2021}),
+            ("/v1/classify_day", {"day": "2021-12-24"}),
+            ("/v1/classify_day", {"day": "2021-12-27", "tz": "UTC"}),
+            ("/v1/next_special_days", {"day": "2021-12-01", "n": 5}),
+            ("/v1/next_special_days", {"day": "2021-12-01", "n": 5, "forward": False, "mic": ["XSWX", "XLON"]}),
+            ("/v1/next_business_days", {"day": "2021-12-20", "n": 6}),
+            *(
+                ("/v1/combined_business_days", {"mic": ["XAMS", "XLON", "XSWX"], "op": op, "start": "2021-01-01"})
+                for op in ("all", "any", "exactly_one")
+            ),
+            ("/v1/open_at", {"at": ["2021-12-24T10:00:00Z", "2021-12-27T16:00:00Z"]}),
+            ("/v1/next_open_close", {"at": "2021-12-24T10:00:00Z", "mic": ["XSWX", "XAMS"]}),
+        ]
+
+        for path, params in gets:
+            expected, actual = client.get(path, params=params), front.get(path, params=params)
+            assert (actual.status_code, actual.json()) == (expected.status_code, expected.json()), (path, params)
+
+        posts = [
+            ("/v1/classify_days", [{"day": "2021-12-24", "mic": "XSWX"}, {"day": "2021-12-24", "mic": "XLON"}]),
+            (
+                "/v1/trading_minutes",
+                [
+                    {"mic": m, "start": "2021-12-01T00:00:00Z", "end": "2022-01-01T00:00:00Z"}
+                    for m in ("XSWX", "XAMS", "XLON")
+                ],
+            ),
+            (
+                "/v1/batch",
+                [
+                    {"id": "all", "op": "classify_day", "params": {"day": "2021-12-24"}},
+                    {"id": "one", "op": "special_days", "params": {"mic": "XSWX", "year": 2021}},
+                    {"id": "bad", "op": "special_days", "params": {"mic": "XNYS"}},
+                ],
+            ),
+        ]
+
+        for path, body in posts:
+            expected, actual = client.post(path, json=body), front.post(path, json=body)
+            assert (actual.status_code, actual.json()) == (expected.status_code, expected.json()), path
+
+    def test_head(self, front, client):
+        """This test verifies that HEAD requests are passed on as such, to a single shard or to multiple shards."""
+        for params in ({"day": "2021-12-24", "mic": "XSWX"}, {"day": "2021-12-24"}):
+            expected = client.head("/v1/classify_day", params=params)
+            actual = front.head("/v1/classify_day", params=params)
+            assert actual.status_code == expected.status_code, params
+
+    def test_export(self, front, client):
+        """This test verifies that exports from multiple shards are merged into a single table."""
+        expected = pa.ipc.open_stream(client.get("/v1/export").content).read_all()
+        actual = pa.ipc.open_stream(front.get("/v1/export").content).read_all()
+        assert actual.equals(expected)
+
+    def test_etag(self, front):
+        """This test verifies that merged responses are tagged and conditional requests are answered."""
+        response = front.get("/v1/classify_day", params={"day": "2021-12-24"})
+        etag = response.headers["etag"]
+
+        response = front.get("/v1/classify_day", params={"day": "2021-12-24"}, headers={"If-None-Match": etag})
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    def test_volatile(self, front):
+        """This test verifies that merged responses that default to the current time are never tagged, so that
+        conditional requests are always answered with current data."""
+        etag = front.get("/v1/open_at", params={"at": "2021-12-24T10:00:00Z"}).headers["etag"]
+
+        response = front.get("/v1/open_at", headers={"If-None-Match": etag})
+        assert response.status_code == HTTPStatus.OK
+        assert "etag" not in response.headers
+
+        response = front.get("/v1/open_at", headers={"If-None-Match": "*"})
+        assert response.status_code == HTTPStatus.OK
+        assert "etag" not in response.headers
+
+    def test_update(self, front, pool):
+        """This test verifies that updates are applied by all shards and that change events are merged into a single
+        stream that clients can resume."""
+        changes = {"XSWX": {"add": {"2021-12-28": {"type": "holiday", "name": "Foo"}}}}
+
+        async def run():
+            router = ShardRouter([Shard(s.mics, s.uds) for s in pool.shards])
+
+            async def take(last_event_id: str | None, until: Callable[[str], bool]) -> str:
+                # Return the first event that satisfies the condition.
+                headers = [("last-event-id", last_event_id)] if last_event_id is not None else []
+                it = router._stream_changes([], headers).body_iterator
+                try:
+                    while not until(event := await asyncio.wait_for(anext(it), 30)):
+                        pass
+                finally:
+                    await it.aclose()
+                return event
+
+            # Wait for the event ids of both shards.
+            event = await take(None, lambda x: x.startswith("id: ") and all(x[4:].strip().split(",")))
+            last_event_id = event.removeprefix("id: ").strip()
+            assert len(last_event_id.split(",")) == 2
+
+            response = await asyncio.to_thread(front.post, "/update", json=changes, headers={"X-API-KEY": "test"})
+            assert response.status_code == HTTPStatus.OK
+            assert response.json()["XSWX"]["add"]["added"] == ["2021-12-28"]
+
+            # Catch up from the last event id.
+            event = await take(last_event_id, lambda x: "event: change" in x)
+            assert '"mics":["XSWX"]' in event
+
+        try:
+            asyncio.run(run())
+
+            response = front.get("/v1/classify_day", params={"day": "2021-12-28"})
+            assert next(x for x in response.json() if x["mics"] == ["XSWX"])["name"] == "Foo"
+        finally:
+            front.post("/update", json={}, headers={"X-API-KEY": "test"})